@@ -0,0 +1,10 @@
+"""
+    Бенчмарки приложения: генерация синтетических хранилищ (store), прогон замеров
+    на SQLite и PostgreSQL (run), микробенчмарк очистки путей (bench_path_sanitize)
+    и сравнение результатов двух прогонов (compare).
+
+    Запуск из корня репозитория:
+        python -m benchmarks.run --files 20000 --output before.json
+        python -m benchmarks.run --files 20000 --output after.json
+        python -m benchmarks.compare before.json after.json
+"""
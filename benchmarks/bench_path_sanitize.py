@@ -0,0 +1,127 @@
+"""
+    Микробенчмарк очистки путей (src/services/path_service).
+
+    Входные данные — имена файлов и пути каталогов трёх видов: только ASCII, только кириллица
+    и смесь (по умолчанию), как их присылают клиенты при загрузке и перемещении. Для каждой
+    функции замеряется пропускная способность:
+        - uncached: все значения уникальны, кэш самой функции не участвует (__wrapped__),
+          повторяются только отдельные компоненты путей;
+        - cached: повторяющиеся значения из пула --distinct штук (каталоги и имена при загрузке
+          пачки файлов повторяются), кэш прогрет.
+
+    Результат — JSON в формате benchmarks.run: два прогона сравнивает benchmarks.compare.
+
+    Пример:
+        python -m benchmarks.bench_path_sanitize --calls 200000 --output paths.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime, UTC
+
+from benchmarks.run import _git_commit
+
+ASCII_WORDS = ["report", "final", "v2", "IMG_2041", "backup", "data-set", "notes", "draft (copy)", "2024 Q3"]
+CYRILLIC_WORDS = ["отчёт", "итоговый", "фото", "резервная копия", "данные", "заметки", "черновик", "Квартал 3"]
+EXTENSIONS = [".pdf", ".txt", ".jpg", ".tar.gz", ".docx", ""]
+
+
+def make_inputs(kind: str, count: int, seed: int) -> tuple[list[str], list[str]]:
+    """
+        Генерирует count имён файлов и count путей каталогов (1–4 уровня) заданного вида.
+    """
+    rnd = random.Random(seed)
+    if kind == "ascii":
+        words = ASCII_WORDS
+    elif kind == "cyrillic":
+        words = CYRILLIC_WORDS
+    else:
+        words = ASCII_WORDS + CYRILLIC_WORDS
+
+    def word() -> str:
+        return f"{rnd.choice(words)} {rnd.randint(1, 999)}" if rnd.random() < 0.5 else rnd.choice(words)
+
+    names = [f"{word()}{rnd.choice(EXTENSIONS)}" for _ in range(count)]
+    paths = ["/".join(word() for _ in range(rnd.randint(1, 4))) for _ in range(count)]
+    return names, paths
+
+
+def measure(func, inputs: list, calls: int) -> float:
+    """
+        Returns:
+            float: Вызовов в секунду.
+    """
+    size = len(inputs)
+    started = time.perf_counter()
+    for i in range(calls):
+        func(*inputs[i % size])
+    return calls / (time.perf_counter() - started)
+
+
+def run(kinds: list[str], calls: int, distinct: int, seed: int) -> dict:
+    from src.services import path_service
+
+    base_dir = tempfile.gettempdir()
+    cached = {
+        "sanitize_filename": (path_service.sanitize_filename, lambda name, path: (name,)),
+        "clean_path": (path_service.clean_path, lambda name, path: (path,)),
+        "sanitize_and_resolve_path": (path_service.sanitize_and_resolve_path,
+                                      lambda name, path: (base_dir, path, name)),
+    }
+    results = {}
+    for kind in kinds:
+        # Уникальные значения для замера без кэша, пул повторяющихся — для замера с кэшем
+        names, paths = make_inputs(kind, calls, seed)
+        unique = [(f"{name} {i}", f"{path} {i}") for i, (name, path) in enumerate(zip(names, paths))]
+        pool = list(zip(*make_inputs(kind, distinct, seed + 1)))
+        kind_results = {}
+        for name, (func, arguments) in cached.items():
+            uncached_func = getattr(func, "__wrapped__", func)
+            path_service.sanitize_filename.cache_clear()
+            path_service.clean_path.cache_clear()
+            uncached = measure(uncached_func, [arguments(*row) for row in unique], calls)
+            pool_args = [arguments(*row) for row in pool]
+            measure(func, pool_args, len(pool_args))
+            kind_results[name] = {
+                "uncached_calls_per_s": round(uncached),
+                "cached_calls_per_s": round(measure(func, pool_args, calls)),
+            }
+        results[kind] = kind_results
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарк очистки путей")
+    parser.add_argument("--calls", type=int, default=100000, help="вызовов на каждый замер")
+    parser.add_argument("--distinct", type=int, default=2000,
+                        help="различных значений в замере с кэшем (не больше PATH_CACHE_SIZE)")
+    parser.add_argument("--kinds", default="ascii,cyrillic,mixed", help="виды входных данных через запятую")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для JSON-результатов (по умолчанию — stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            **_git_commit(),
+            "started_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": {"paths": run(args.kinds.split(","), args.calls, args.distinct, args.seed)},
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+    Сравнение двух прогонов benchmarks.run.
+
+    Сравниваются числовые показатели с известным направлением: *_ms, *_s и queries — чем меньше,
+    тем лучше; *_mb_s и *_per_s — чем больше, тем лучше. Изменение хуже порога (--threshold,
+    доля) считается регрессией, и скрипт завершается с кодом 1.
+
+    Пример:
+        python -m benchmarks.compare before.json after.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = ("mb_s", "_per_s")
+LOWER_IS_BETTER = ("_ms", "_s", "queries", "queries_per_request")
+
+
+def flatten(data, prefix: str = "") -> dict[str, float]:
+    """
+        Разворачивает вложенный словарь результатов в {"sqlite.sync.initial.wall_s": 1.23, ...}.
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(name: str) -> int:
+    """
+        1 — чем больше, тем лучше; -1 — чем меньше, тем лучше; 0 — показатель не сравнивается.
+    """
+    if ".store." in name:
+        # Генерация хранилища — подготовка, а не замер приложения
+        return 0
+    leaf = name.rsplit(".", 1)[-1]
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return 1
+    if leaf.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(base: dict, new: dict, threshold: float) -> tuple[list[tuple], list[tuple]]:
+    """
+        Returns:
+            tuple[list, list]: Все сравнимые показатели и регрессии — кортежи (имя, было, стало, изменение).
+    """
+    base_flat, new_flat = flatten(base["results"]), flatten(new["results"])
+    rows, regressions = [], []
+    for name in sorted(base_flat.keys() & new_flat.keys()):
+        sign = direction(name)
+        before, after = base_flat[name], new_flat[name]
+        if not sign or before == 0:
+            continue
+        change = (after - before) / before
+        row = (name, before, after, change)
+        rows.append(row)
+        # Изменение в худшую сторону: рост для "меньше — лучше", падение для "больше — лучше"
+        if -sign * change > threshold:
+            regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение результатов бенчмарков")
+    parser.add_argument("base", help="JSON базового прогона")
+    parser.add_argument("new", help="JSON нового прогона")
+    parser.add_argument("--threshold", type=float, default=0.1, help="допустимое ухудшение, доля (0.1 = 10%%)")
+    parser.add_argument("--all", action="store_true", help="показать все показатели, а не только изменившиеся")
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    if base["meta"].get("params") != new["meta"].get("params"):
+        print("Внимание: параметры прогонов различаются, сравнение может быть некорректным", file=sys.stderr)
+
+    rows, regressions = compare(base, new, args.threshold)
+    regressed = {row[0] for row in regressions}
+    for name, before, after, change in rows:
+        if not args.all and abs(change) <= args.threshold:
+            continue
+        mark = "РЕГРЕССИЯ" if name in regressed else ""
+        print(f"{name:<60} {before:>14.4f} {after:>14.4f} {change:>+8.1%} {mark}")
+
+    print(f"\nПоказателей: {len(rows)}, регрессий (порог {args.threshold:.0%}): {len(regressions)}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
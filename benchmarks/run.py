@@ -0,0 +1,345 @@
+"""
+    Прогон бенчмарков на синтетическом хранилище.
+
+    Для каждой СУБД (SQLite во временном каталоге и, если указан --postgres-url, локальный
+    PostgreSQL) запускается отдельный процесс: настройки приложения читаются из окружения при
+    импорте, поэтому у каждого прогона свои STORAGE_PATH и SQLALCHEMY_DATABASE_URI.
+
+    Замеры:
+        - sync: время и количество SQL-запросов sync_storage_to_db() — первичная синхронизация,
+          повторная без изменений и после изменения доли файлов;
+        - listing: задержка GET /files (первая и глубокая страница, фильтры, сортировка по размеру)
+          и время потоковой выдачи всего списка;
+        - upload/download: пропускная способность /files/upload/stream и /files/<id>/download
+          через тестовый клиент Flask и через настоящий WSGI-сервер (werkzeug, в потоке).
+
+    Результат — JSON (--output) с параметрами прогона и коммитом; два таких файла сравнивает
+    benchmarks.compare. PostgreSQL-база должна быть выделенной: таблицы создаются и удаляются.
+
+    Пример:
+        python -m benchmarks.run --files 20000 --depth 3 --fanout 8 --postgres-url postgresql://...
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, UTC
+from urllib.parse import quote
+
+from benchmarks.store import generate_store, mutate_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryCounter:
+    """
+        Считает SQL-запросы движка и время их выполнения (события before/after_cursor_execute).
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self.seconds = 0.0
+        self._started = threading.local()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started.value = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.seconds += time.perf_counter() - self._started.value
+
+    def snapshot(self) -> tuple[int, float]:
+        return self.count, self.seconds
+
+
+def _summary(samples: list[float]) -> dict:
+    """
+        Сводка по замерам в секундах: миллисекунды mean, p50, p95, min, max.
+    """
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": p95 * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _measure(func, counter: QueryCounter) -> dict:
+    queries, sql_seconds = counter.snapshot()
+    started = time.perf_counter()
+    result = func()
+    wall = time.perf_counter() - started
+    queries_after, sql_after = counter.snapshot()
+    return {"wall_s": wall, "queries": queries_after - queries, "sql_s": sql_after - sql_seconds, "result": result}
+
+
+def _request_series(client, url: str, repeat: int, counter: QueryCounter) -> dict:
+    samples = []
+    queries, _ = counter.snapshot()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url}: {response.status_code}")
+    summary = _summary(samples)
+    summary["queries_per_request"] = (counter.snapshot()[0] - queries) / repeat
+    return summary
+
+
+def bench_sync(file_service, storage: str, counter: QueryCounter, mutate_fraction: float) -> dict:
+    results = {
+        "initial": _measure(file_service.sync_storage_to_db, counter),
+        "noop": _measure(file_service.sync_storage_to_db, counter),
+    }
+    changes = mutate_store(storage, mutate_fraction)
+    results["incremental"] = _measure(file_service.sync_storage_to_db, counter)
+    results["incremental"]["changes"] = changes
+    return results
+
+
+def bench_listing(client, repeat: int, counter: QueryCounter) -> dict:
+    results = {
+        "first_page": _request_series(client, "/files?limit=100", repeat, counter),
+        "filtered": _request_series(client, "/files?limit=100&extension=.log,.csv&min_size=1024", repeat, counter),
+        "sorted_by_size_desc": _request_series(client, "/files?limit=100&sort=size&order=desc", repeat, counter),
+    }
+
+    # Глубокая страница: курсор после 50 страниц, затем повторные запросы по нему
+    cursor = None
+    for _ in range(50):
+        page = client.get("/files", query_string={"limit": 100, "cursor": cursor or ""}).get_json()
+        if not page["next_cursor"]:
+            break
+        cursor = page["next_cursor"]
+    if cursor:
+        results["deep_page"] = _request_series(client, f"/files?limit=100&cursor={quote(cursor)}", repeat, counter)
+
+    started = time.perf_counter()
+    response = client.get("/files?stream=ndjson&fields=id,name,extension,size,path")
+    rows = sum(chunk.count(b"\n") for chunk in response.iter_encoded())
+    elapsed = time.perf_counter() - started
+    results["stream_ndjson"] = {"rows": rows, "wall_s": elapsed, "rows_per_s": rows / elapsed if elapsed else 0.0}
+    return results
+
+
+def _payloads(count: int, size: int) -> list[bytes]:
+    # Случайное (несжимаемое) содержимое: сжатие при хранении не искажает замер
+    return [os.urandom(size) for _ in range(count)]
+
+
+def _throughput(total_bytes: int, samples: list[float]) -> dict:
+    wall = sum(samples)
+    summary = _summary(samples)
+    summary["bytes"] = total_bytes
+    summary["wall_s"] = wall
+    summary["mb_s"] = total_bytes / wall / (1 << 20) if wall else 0.0
+    return summary
+
+
+def bench_transfer_client(client, payloads: list[bytes], prefix: str) -> tuple[dict, dict]:
+    ids, upload_samples = [], []
+    for index, payload in enumerate(payloads):
+        started = time.perf_counter()
+        response = client.post(f"/files/upload/stream?filename={prefix}{index}.bin&path=bench-{prefix}", data=payload)
+        upload_samples.append(time.perf_counter() - started)
+        if response.status_code != 201:
+            raise RuntimeError(f"upload: {response.status_code} {response.get_data(as_text=True)}")
+        ids.append(response.get_json()["id"])
+
+    download_samples = []
+    for file_id in ids:
+        started = time.perf_counter()
+        response = client.get(f"/files/{file_id}/download")
+        for _ in response.iter_encoded():
+            pass
+        download_samples.append(time.perf_counter() - started)
+        response.close()
+    total = sum(len(payload) for payload in payloads)
+    return _throughput(total, upload_samples), _throughput(total, download_samples)
+
+
+def bench_transfer_server(app, payloads: list[bytes], prefix: str) -> tuple[dict, dict]:
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=300)
+        ids, upload_samples = [], []
+        for index, payload in enumerate(payloads):
+            started = time.perf_counter()
+            connection.request("POST", f"/files/upload/stream?filename={prefix}{index}.bin&path=bench-{prefix}",
+                               body=payload, headers={"Content-Type": "application/octet-stream"})
+            response = connection.getresponse()
+            body = response.read()
+            upload_samples.append(time.perf_counter() - started)
+            if response.status != 201:
+                raise RuntimeError(f"upload: {response.status} {body[:200]!r}")
+            ids.append(json.loads(body)["id"])
+
+        download_samples = []
+        for file_id in ids:
+            started = time.perf_counter()
+            connection.request("GET", f"/files/{file_id}/download")
+            response = connection.getresponse()
+            while response.read(1 << 20):
+                pass
+            download_samples.append(time.perf_counter() - started)
+        connection.close()
+    finally:
+        server.shutdown()
+        thread.join()
+    total = sum(len(payload) for payload in payloads)
+    return _throughput(total, upload_samples), _throughput(total, download_samples)
+
+
+def run_backend(args) -> dict:
+    """
+        Прогоняет все замеры на одной СУБД. Выполняется в отдельном процессе.
+    """
+    storage = os.path.join(args.workdir, "storage")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = args.backend_url
+    os.environ["STORAGE_PATH"] = storage
+    os.environ["CACHE_BACKEND"] = args.cache
+    os.environ["WATCHER_ENABLED"] = "false"
+    os.environ.setdefault("STORAGE_MODE", args.storage_mode)
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import inspect, func, select
+    from src import create_app, db
+    from src.models import FileRecord
+    from src.services.search_index import SearchIndex
+
+    app = create_app()
+    with app.app_context():
+        results = {"backend": db.engine.dialect.name}
+        if inspect(db.engine).has_table(FileRecord.__tablename__):
+            has_rows = db.session.execute(select(func.count()).select_from(FileRecord)).scalar_one()
+            if has_rows and not args.reset:
+                raise SystemExit(f"В базе {args.backend_url} уже есть файлы; для очистки укажите --reset")
+            db.drop_all()
+        db.create_all()
+        SearchIndex.ensure()
+        from src.views import file_service
+
+        counter = QueryCounter(db.engine)
+        started = time.perf_counter()
+        results["store"] = generate_store(storage, args.files, args.depth, args.fanout, args.sizes, args.seed)
+        results["store"]["generate_s"] = time.perf_counter() - started
+        results["sync"] = bench_sync(file_service, storage, counter, args.mutate_fraction)
+
+        client = app.test_client()
+        results["listing"] = bench_listing(client, args.repeat, counter)
+
+        payloads = _payloads(args.transfer_files, args.transfer_size)
+        upload, download = bench_transfer_client(client, payloads, "client")
+        results["upload"] = {"test_client": upload}
+        results["download"] = {"test_client": download}
+        upload, download = bench_transfer_server(app, payloads, "server")
+        results["upload"]["wsgi_server"] = upload
+        results["download"]["wsgi_server"] = download
+        db.session.remove()
+        if args.backend_url.startswith("postgresql"):
+            db.drop_all()
+    return results
+
+
+def _git_commit() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "src"))}
+
+
+def _child_args(args, backend_url: str, workdir: str) -> list[str]:
+    forwarded = ["--files", args.files, "--depth", args.depth, "--fanout", args.fanout, "--sizes", args.sizes,
+                 "--seed", args.seed, "--repeat", args.repeat, "--mutate-fraction", args.mutate_fraction,
+                 "--transfer-files", args.transfer_files, "--transfer-size", args.transfer_size,
+                 "--cache", args.cache, "--storage-mode", args.storage_mode]
+    if args.reset:
+        forwarded.append("--reset")
+    return [sys.executable, "-m", "benchmarks.run", "--backend-url", backend_url, "--workdir", workdir,
+            *map(str, forwarded)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки файлового хранилища")
+    parser.add_argument("--files", type=int, default=10000, help="количество файлов синтетического хранилища")
+    parser.add_argument("--depth", type=int, default=2, help="глубина дерева каталогов")
+    parser.add_argument("--fanout", type=int, default=10, help="подкаталогов у каждого каталога")
+    parser.add_argument("--sizes", default="lognormal:16384:1.5",
+                        help="распределение размеров: fixed:N | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=30, help="повторов каждого запроса списка")
+    parser.add_argument("--mutate-fraction", type=float, default=0.01,
+                        help="доля файлов, изменяемых перед инкрементальной синхронизацией")
+    parser.add_argument("--transfer-files", type=int, default=20, help="файлов для замера загрузки и скачивания")
+    parser.add_argument("--transfer-size", type=int, default=4 << 20, help="размер каждого из них, байт")
+    parser.add_argument("--cache", default="off", help="CACHE_BACKEND на время прогона (off — замер базы)")
+    parser.add_argument("--storage-mode", default="plain", help="STORAGE_MODE на время прогона")
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="URL выделенной базы PostgreSQL (таблицы будут пересозданы)")
+    parser.add_argument("--no-sqlite", action="store_true", help="не запускать прогон на SQLite")
+    parser.add_argument("--reset", action="store_true", help="очистить непустую базу PostgreSQL")
+    parser.add_argument("--output", help="файл для JSON-результатов (по умолчанию — stdout)")
+    parser.add_argument("--backend-url", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.backend_url:
+        json.dump(run_backend(args), sys.stdout)
+        return
+
+    report = {
+        "meta": {
+            **_git_commit(),
+            "started_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {key: value for key, value in vars(args).items()
+                       if key not in ("backend_url", "workdir", "output", "postgres_url")},
+        },
+        "results": {},
+    }
+    backends = []
+    if not args.no_sqlite:
+        backends.append("sqlite")
+    if args.postgres_url:
+        backends.append("postgresql")
+    for backend in backends:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{backend}-") as workdir:
+            url = args.postgres_url if backend == "postgresql" else f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            print(f"[{backend}] {args.files} файлов...", file=sys.stderr)
+            completed = subprocess.run(_child_args(args, url, workdir), cwd=ROOT, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                report["results"][backend] = {"error": completed.stderr.strip().splitlines()[-1:]}
+                continue
+            report["results"][backend] = json.loads(completed.stdout)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
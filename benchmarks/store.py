@@ -0,0 +1,122 @@
+import math
+import os
+import random
+from collections.abc import Callable
+
+# Расширения файлов синтетического хранилища: текстовые (сжимаемые) и двоичные
+EXTENSIONS = (".log", ".csv", ".txt", ".json", ".bin", ".jpg", ".pdf")
+
+
+def parse_size_distribution(spec: str) -> Callable[[random.Random], int]:
+    """
+        Разбирает распределение размеров файлов.
+
+        Форматы:
+            fixed:SIZE — все файлы одного размера;
+            uniform:MIN:MAX — равномерно от MIN до MAX байт;
+            lognormal:MEDIAN:SIGMA — логнормальное с медианой MEDIAN байт (много мелких, редкие крупные).
+
+        Returns:
+            Callable[[random.Random], int]: Функция, возвращающая размер следующего файла.
+        Raises:
+            ValueError: Если формат не распознан.
+    """
+    kind, _, params = spec.partition(":")
+    values = params.split(":") if params else []
+    try:
+        if kind == "fixed" and len(values) == 1:
+            size = int(values[0])
+            return lambda rng: size
+        if kind == "uniform" and len(values) == 2:
+            low, high = int(values[0]), int(values[1])
+            return lambda rng: rng.randint(low, high)
+        if kind == "lognormal" and len(values) == 2:
+            median, sigma = float(values[0]), float(values[1])
+            mu = math.log(median)
+            return lambda rng: max(0, int(rng.lognormvariate(mu, sigma)))
+    except ValueError:
+        pass
+    raise ValueError(f"Некорректное распределение размеров: {spec}")
+
+
+def directory_tree(depth: int, fanout: int) -> list[str]:
+    """
+        Возвращает относительные пути всех каталогов дерева глубины depth с fanout детьми
+        у каждого каталога, включая корень "".
+    """
+    level = [""]
+    directories = [""]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"d{index:03d}") for parent in level for index in range(fanout)]
+        directories.extend(level)
+    return directories
+
+
+def generate_store(root: str, files: int, depth: int = 2, fanout: int = 10, sizes: str = "lognormal:16384:1.5",
+                   seed: int = 1) -> dict:
+    """
+        Заполняет каталог root синтетическими файлами. При одинаковых параметрах и seed
+        получается одно и то же дерево с теми же размерами и содержимым.
+
+        Args:
+            root (str): Корень хранилища (Config.STORAGE_PATH).
+            files (int): Количество файлов.
+            depth (int): Глубина дерева каталогов.
+            fanout (int): Количество подкаталогов у каждого каталога.
+            sizes (str): Распределение размеров (см. parse_size_distribution).
+            seed (int): Зерно генератора.
+
+        Returns:
+            dict: {"files", "directories", "bytes"} — что было создано.
+    """
+    rng = random.Random(seed)
+    next_size = parse_size_distribution(sizes)
+    directories = directory_tree(depth, fanout)
+    for directory in directories:
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    # Содержимое — срезы одного случайного блока: генерация не упирается в ГПСЧ
+    block = rng.randbytes(1 << 20)
+    total = 0
+    for index in range(files):
+        size = next_size(rng)
+        path = os.path.join(root, rng.choice(directories), f"file{index:07d}{rng.choice(EXTENSIONS)}")
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                start = rng.randrange(len(block))
+                chunk = block[start:start + remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+        total += size
+    return {"files": files, "directories": len(directories), "bytes": total}
+
+
+def mutate_store(root: str, fraction: float = 0.01, seed: int = 2) -> dict:
+    """
+        Изменяет долю fraction файлов хранилища, чтобы замерить инкрементальную синхронизацию:
+        столько же файлов дописывается, удаляется и добавляется.
+
+        Returns:
+            dict: {"modified", "deleted", "added"}
+    """
+    rng = random.Random(seed)
+    paths = []
+    for directory, subdirectories, names in os.walk(root):
+        if directory == root:
+            # Служебные каталоги хранилища (.blobs, .objects, ...) не трогаем
+            subdirectories[:] = [name for name in subdirectories if not name.startswith(".")]
+        paths.extend(os.path.join(directory, name) for name in names if not name.startswith("."))
+    paths.sort()
+    count = max(1, int(len(paths) * fraction))
+    sample = rng.sample(paths, min(len(paths), 2 * count))
+    modified, deleted = sample[:count], sample[count:]
+    for path in modified:
+        with open(path, "ab") as f:
+            f.write(b"appended by benchmark\n")
+    for path in deleted:
+        os.unlink(path)
+    for index in range(count):
+        with open(os.path.join(root, f"added{index:07d}.log"), "wb") as f:
+            f.write(rng.randbytes(1024))
+    return {"modified": len(modified), "deleted": len(deleted), "added": count}
@@ -17,12 +17,24 @@ def create_app():
         """
     app = Flask(__name__)
 
+    # Даты в ISO 8601 и быстрый кодировщик (orjson), если он установлен
+    from .services.serialization import JSONProvider
+    app.json = JSONProvider(app)
+
     from .config import Config
     app.config.from_object(Config)
 
     # Инициализация БД
     db.init_app(app)
 
+    # Пул фоновых задач
+    from .services.job_manager import job_manager
+    job_manager.init_app(app)
+
+    # Метрики запросов, SQL и файловых операций
+    from .services.metrics import metrics
+    metrics.init_app(app)
+
     # Регистрация маршрутов
     from .views import file_routes
     app.register_blueprint(file_routes)
@@ -30,4 +42,12 @@ def create_app():
     # Убедимся, что папка хранения файлов существует
     os.makedirs(app.config['STORAGE_PATH'], exist_ok=True)
 
+    # Наблюдатель за хранилищем (в режиме отладки — только в дочернем процессе reloader'а;
+    # при нескольких воркерах — только в одном из них)
+    if app.config['WATCHER_ENABLED'] and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        from .services.storage_watcher import start_watcher
+        watcher = start_watcher(app)
+        if watcher is not None:
+            app.extensions['storage_watcher'] = watcher
+
     return app
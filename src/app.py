@@ -2,6 +2,8 @@ import os
 from src import create_app, db
 from dotenv import load_dotenv
 from src.config import Config
+from src.services.schema import SchemaUpgrade
+from src.services.search_index import SearchIndex
 
 load_dotenv()
 
@@ -9,6 +11,13 @@ app = create_app()
 
 with app.app_context():
     db.create_all()
+    # Колонки и индексы, добавленные в модели после создания базы
+    SchemaUpgrade.ensure()
+    SearchIndex.ensure()
+    # Доводим переносы каталогов и смену раскладки, прерванные сбоем предыдущего запуска
+    from src.views import file_service
+    file_service.recover_interrupted_operations()
+    file_service.ensure_directory_tree()
 
 if __name__ == "__main__":
     """
@@ -0,0 +1,21 @@
+import os
+from functools import partial
+
+from src.app import app as flask_app
+from src.config import Config
+from src.services.asgi_adapter import AsyncWSGIAdapter
+from src.services.storage_manager import StorageManager
+from src.views import open_upload_sink
+
+# ASGI-точка входа: приложение Flask за адаптером, который принимает и отдаёт тела запросов
+# в цикле событий, а блокирующую работу выполняет в ограниченном пуле потоков.
+# Потоковые загрузки пишутся сразу в файл хранилища (open_upload_sink), временные файлы остальных
+# больших тел лежат на той же файловой системе, что и хранилище
+app = AsyncWSGIAdapter(
+    flask_app,
+    threads=Config.SERVER_THREADS,
+    spool_memory=Config.SERVER_SPOOL_MEMORY,
+    spool_dir=os.path.join(Config.STORAGE_PATH, StorageManager.UPLOAD_SESSIONS_DIR),
+    chunk_size=Config.DOWNLOAD_CHUNK_SIZE,
+    upload_sink=partial(open_upload_sink, flask_app),
+)
@@ -18,7 +18,8 @@ def str_to_bool(value: str | None) -> bool:
 
 class Config:
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-    STORAGE_PATH: str = os.path.join(BASE_DIR, 'storage')
+    # Корень файлового хранилища (по умолчанию — src/storage)
+    STORAGE_PATH: str = os.getenv('STORAGE_PATH', os.path.join(BASE_DIR, 'storage'))
     OS = os.name.lower()
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -26,6 +27,95 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     WTF_CSRF_ENABLED = str_to_bool(os.getenv('WTF_CSRF_ENABLED'))
     DEBUG = str_to_bool(os.getenv('FLASK_DEBUG'))
+    # Размер страницы списка файлов по умолчанию и его верхняя граница
+    FILES_PAGE_SIZE = int(os.getenv('FILES_PAGE_SIZE', 100))
+    FILES_PAGE_SIZE_MAX = int(os.getenv('FILES_PAGE_SIZE_MAX', 1000))
+    # Количество строк в одном пакетном INSERT/UPDATE/DELETE при синхронизации
+    SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', 1000))
+    # Обход хранилища при синхронизации: потоки (поддеревья читаются параллельно — выигрыш на сетевых
+    # и медленных дисках), glob-шаблоны путей через запятую (SCAN_INCLUDE — только такие файлы,
+    # SCAN_EXCLUDE — пропускаемые файлы и каталоги) и максимальная глубина каталогов (0 — без ограничения).
+    # Записи о файлах вне области обхода синхронизация не трогает
+    SCAN_WORKERS = int(os.getenv('SCAN_WORKERS', 4))
+    SCAN_INCLUDE = os.getenv('SCAN_INCLUDE', '')
+    SCAN_EXCLUDE = os.getenv('SCAN_EXCLUDE', '')
+    SCAN_MAX_DEPTH = int(os.getenv('SCAN_MAX_DEPTH', 0))
+    # Кэш очистки пользовательских путей и имён файлов: записей на каждую функцию (0 — без кэша)
+    PATH_CACHE_SIZE = int(os.getenv('PATH_CACHE_SIZE', 4096))
+    # Пул фоновых задач и количество завершённых задач, которые хранятся в реестре
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_HISTORY_LIMIT = int(os.getenv('JOB_HISTORY_LIMIT', 100))
+    # Как часто прогресс задач записывается в базу для других процессов сервера, секунды,
+    # и каталог файлов блокировок задач, общих для процессов (пусто — .journal в STORAGE_PATH)
+    JOB_STATE_INTERVAL = float(os.getenv('JOB_STATE_INTERVAL', 1))
+    JOB_LOCK_DIR = os.getenv('JOB_LOCK_DIR', '')
+    # Режим хранения новых файлов: plain (по логическому пути) | cas (дедуплицированные блобы по SHA-256) |
+    # sharded (отдельные объекты в .objects/ab/cd/). Уже сохранённые файлы переводит POST /jobs/storage-layout
+    STORAGE_MODE = os.getenv('STORAGE_MODE', 'plain')
+    # Сжатие новых файлов на диске: "" (выключено) | gzip | zstd (нужен пакет zstandard, иначе gzip).
+    # Файлы с расширениями из COMPRESSION_EXTENSIONS сжимаются всегда, остальные — если начало содержимого
+    # сжимается хотя бы до COMPRESSION_MIN_RATIO (0 — только по расширению); файлы меньше
+    # COMPRESSION_MIN_SIZE байт не сжимаются. COMPRESSION_LEVEL 0 — уровень по умолчанию для кодировки
+    COMPRESSION = os.getenv('COMPRESSION', '')
+    COMPRESSION_EXTENSIONS = os.getenv('COMPRESSION_EXTENSIONS', '.log,.csv,.tsv,.txt,.json,.ndjson,.xml,.sql')
+    COMPRESSION_MIN_RATIO = float(os.getenv('COMPRESSION_MIN_RATIO', 0.8))
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 4096))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 0))
+    # Размер блока потоковой загрузки и сброс данных на диск перед атомарным переименованием
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+    UPLOAD_FSYNC = str_to_bool(os.getenv('UPLOAD_FSYNC'))
+    # Время жизни незавершённой сессии возобновляемой загрузки, секунды
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 60 * 60))
+    # Передача отдачи файлов фронтовому прокси: "" (отдаёт приложение) | x-accel (nginx) | x-sendfile.
+    # DOWNLOAD_ACCEL_PREFIX — internal-location nginx, под которым смонтирован корень хранилища
+    DOWNLOAD_ACCEL = os.getenv('DOWNLOAD_ACCEL', '')
+    DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/storage-internal/')
+    DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', 256 * 1024))
+    # Пакетные операции: потоки для файловых операций и максимальное число операций в запросе
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 8))
+    BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', 1000))
+    # Размер блока чтения файлов при потоковой сборке ZIP/TAR-архива
+    ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', 1024 * 1024))
+    # Кэш ответов списка и карточки файла: memory (LRU в процессе) | redis | off.
+    # С несколькими процессами приложения нужен redis: кэш в памяти не видит записи соседних процессов
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 30.0))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    # Хэширование содержимого (дозаполнение sha256 и проверка целостности): потоки, блок чтения, mmap
+    HASH_WORKERS = int(os.getenv('HASH_WORKERS', 4))
+    HASH_BUFFER_SIZE = int(os.getenv('HASH_BUFFER_SIZE', 1024 * 1024))
+    HASH_USE_MMAP = str_to_bool(os.getenv('HASH_USE_MMAP'))
+    # Ограничение скорости чтения фоновых задач хэширования, байт/с (0 — без ограничения),
+    # чтобы проверка не отнимала диск у основных запросов
+    SCRUB_RATE_LIMIT = int(os.getenv('SCRUB_RATE_LIMIT', 32 * 1024 * 1024))
+    # Поиск дубликатов: процессы пула (0 — по числу CPU) и размер блоков начала/конца файла для
+    # предварительного отпечатка
+    DUPLICATES_WORKERS = int(os.getenv('DUPLICATES_WORKERS', 0))
+    DUPLICATES_BLOCK_SIZE = int(os.getenv('DUPLICATES_BLOCK_SIZE', 64 * 1024))
+    # Асинхронный сервер (python -m src.serve — uvicorn + src.asgi): адрес, процессы, потоки пула на процесс
+    # для блокирующей работы приложения, объём тела запроса в памяти до перехода во временный файл
+    # (потоковые загрузки больше этого объёма пишутся сразу в файл хранилища),
+    # предел одновременных соединений (0 — без предела) и keep-alive, секунды
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', 5000))
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 1))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 32))
+    SERVER_SPOOL_MEMORY = int(os.getenv('SERVER_SPOOL_MEMORY', 1024 * 1024))
+    SERVER_LIMIT_CONCURRENCY = int(os.getenv('SERVER_LIMIT_CONCURRENCY', 0))
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', 5))
+    # Метрики процесса (GET /metrics в формате Prometheus). Запросы дольше METRICS_SLOW_REQUEST_MS
+    # пишутся в лог (0 — не отслеживать); доля METRICS_PROFILE_RATE запросов выполняется под cProfile,
+    # профили медленных из них сохраняются в METRICS_PROFILE_DIR
+    METRICS_ENABLED = str_to_bool(os.getenv('METRICS_ENABLED', 'true'))
+    METRICS_SLOW_REQUEST_MS = float(os.getenv('METRICS_SLOW_REQUEST_MS', 1000))
+    METRICS_PROFILE_RATE = float(os.getenv('METRICS_PROFILE_RATE', 0.0))
+    METRICS_PROFILE_DIR = os.getenv('METRICS_PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+    # Наблюдатель за хранилищем: auto (inotify, если доступен) | inotify | polling
+    WATCHER_ENABLED = str_to_bool(os.getenv('WATCHER_ENABLED'))
+    WATCHER_BACKEND = os.getenv('WATCHER_BACKEND', 'auto')
+    WATCHER_DEBOUNCE = float(os.getenv('WATCHER_DEBOUNCE', 1.0))
+    WATCHER_POLL_INTERVAL = float(os.getenv('WATCHER_POLL_INTERVAL', 5.0))
 
     @staticmethod
     def normalize_path(path: str) -> str:
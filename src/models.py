@@ -15,27 +15,55 @@ class FileRecord(db.Model):
             created_at (datetime): Дата создания файла.
             updated_at (datetime | None): Дата последнего изменения информации о файле.
             comment (str | None): Пользовательский комментарий к файлу.
+            mtime (float | None): Время модификации файла на диске (st_mtime) на момент последней синхронизации.
+            sha256 (str | None): SHA-256 содержимого (hex), если известен.
+            storage_key (str | None): Путь к содержимому относительно корня хранилища, если оно
+                хранится не по логическому пути (например, блоб .blobs/ab/cd/<sha256>).
+            verified_at (datetime | None): Когда содержимое последний раз сверялось с sha256.
+            integrity (str | None): Результат последней проверки: ok | mismatch | missing
+                (None — ещё не проверялся).
+            encoding (str | None): Кодировка, в которой содержимое хранится на диске: gzip | zstd
+                (None — без сжатия). size — всегда размер исходного содержимого.
+            stored_size (int | None): Размер сжатого содержимого на диске (None — без сжатия, равен size).
         """
     __tablename__ = 'files'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     extension = db.Column(db.String(20), nullable=False)
-    size = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
     path = db.Column(db.String(512), nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=lambda: datetime.now(UTC), nullable=True)
     comment = db.Column(db.String(1024), nullable=True)
+    mtime = db.Column(db.Float, nullable=True)
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
+    storage_key = db.Column(db.String(512), nullable=True, index=True)
+    verified_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    integrity = db.Column(db.String(16), nullable=True, index=True)
+    encoding = db.Column(db.String(16), nullable=True)
+    stored_size = db.Column(db.BigInteger, nullable=True)
     __table_args__ = (
         db.UniqueConstraint('name', 'extension', 'path', name='uix_file_identity'),
+        # Индексы под keyset-пагинацию и фильтры списка файлов
+        db.Index('ix_files_path_name_id', 'path', 'name', 'id'),
+        db.Index('ix_files_size_id', 'size', 'id'),
+        db.Index('ix_files_created_at_id', 'created_at', 'id'),
+        db.Index('ix_files_updated_at', 'updated_at'),
+        db.Index('ix_files_extension', 'extension'),
     )
 
+    # Поля, доступные для выборки через параметр fields= списка файлов
+    PUBLIC_FIELDS = ('id', 'name', 'extension', 'size', 'path', 'created_at', 'updated_at', 'comment', 'sha256',
+                     'integrity', 'encoding', 'stored_size')
+
     def to_dict(self):
         """
                 Конвертирует объект записи файла в словарь для JSON-сериализации.
 
                 Returns:
-                    dict: словарь с ключами id, name, extension, size, path, created_at, updated_at, comment.
+                    dict: словарь с ключами id, name, extension, size, path, created_at, updated_at, comment, sha256,
+                        integrity, encoding, stored_size.
                 """
         return {
             "id": self.id,
@@ -43,7 +71,156 @@ class FileRecord(db.Model):
             "extension": self.extension,
             "size": self.size,
             "path": self.path,
-            "created_at": self.created_at,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
             "comment": self.comment,
+            "sha256": self.sha256,
+            "integrity": self.integrity,
+            "encoding": self.encoding,
+            "stored_size": self.stored_size,
         }
+
+
+class Blob(db.Model):
+    """
+        Блоб дедуплицированного хранилища (режим cas) со счётчиком ссылок.
+
+        Атрибуты:
+            key (str): storage_key блоба (.blobs/ab/cd/<sha256>).
+            size (int): Размер содержимого в байтах.
+            refcount (int): Количество записей FileRecord, ссылающихся на блоб.
+    """
+    __tablename__ = 'blobs'
+
+    key = db.Column(db.String(512), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Directory(db.Model):
+    """
+        Каталог хранилища с агрегатами по всему поддереву.
+
+        Каталоги неявно задаются полем FileRecord.path; таблица поддерживается репозиторием
+        файлов при каждом изменении записей и хранит строку для каждого каталога, в поддереве
+        которого есть хотя бы один файл (корень хранилища — path "").
+
+        Атрибуты:
+            path (str): Относительный путь каталога.
+            parent (str | None): Путь родительского каталога (None у корня).
+            name (str): Имя каталога (последний компонент пути).
+            file_count (int): Количество файлов в каталоге и всех вложенных.
+            total_size (int): Суммарный размер этих файлов в байтах.
+    """
+    __tablename__ = 'directories'
+
+    path = db.Column(db.String(512), primary_key=True)
+    parent = db.Column(db.String(512), nullable=True, index=True)
+    name = db.Column(db.String(255), nullable=False)
+    file_count = db.Column(db.BigInteger, nullable=False, default=0)
+    total_size = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        """
+            Конвертирует каталог в словарь для JSON-сериализации.
+        """
+        return {
+            "path": self.path,
+            "name": self.name,
+            "file_count": self.file_count,
+            "total_size": self.total_size,
+        }
+
+
+class FileChange(db.Model):
+    """
+        Запись журнала изменений файлов для инкрементального обновления клиентов.
+
+        Журнал компактный: для каждого файла хранится только последнее изменение, поэтому
+        его размер ограничен числом файлов (включая удалённые), а не числом операций.
+        Каждое изменение получает новый seq, больший всех выданных ранее.
+
+        Атрибуты:
+            seq (int): Монотонный номер изменения.
+            file_id (int): ID изменённого файла (связи с files нет — запись переживает удаление).
+            deleted (bool): Файл удалён (tombstone).
+            changed_at (datetime): Момент изменения.
+    """
+    __tablename__ = 'file_changes'
+
+    # В SQLite автоинкремент есть только у INTEGER PRIMARY KEY (псевдоним rowid). Без AUTOINCREMENT
+    # SQLite выдаёт max(rowid) + 1 и повторно использует номер удалённой последней строки, а запись
+    # файла при каждом изменении удаляется и вставляется заново
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    file_id = db.Column(db.Integer, nullable=False, unique=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+class UploadSession(db.Model):
+    """
+        Сессия возобновляемой загрузки файла по частям.
+
+        Атрибуты:
+            id (str): Идентификатор сессии (uuid4 hex).
+            name (str): Очищенное имя будущего файла без расширения.
+            extension (str): Расширение будущего файла (включая точку).
+            path (str): Очищенный относительный путь каталога.
+            comment (str | None): Комментарий к будущему файлу.
+            length (int): Полный размер файла в байтах.
+            created_at (datetime): Дата создания сессии.
+            expires_at (datetime): Момент, после которого незавершённая сессия удаляется.
+    """
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    extension = db.Column(db.String(20), nullable=False)
+    path = db.Column(db.String(512), nullable=False)
+    comment = db.Column(db.String(1024), nullable=True)
+    length = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    parts = db.relationship('UploadPart', cascade='all, delete-orphan', passive_deletes=True, lazy='select')
+
+
+class UploadPart(db.Model):
+    """
+        Принятый диапазон байт сессии загрузки [start, end).
+
+        Части только добавляются, поэтому параллельные PATCH-запросы не конкурируют
+        за одну строку; итоговое покрытие вычисляется слиянием диапазонов.
+    """
+    __tablename__ = 'upload_parts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(32), db.ForeignKey('upload_sessions.id', ondelete='CASCADE'),
+                           nullable=False, index=True)
+    start = db.Column(db.BigInteger, nullable=False)
+    end = db.Column(db.BigInteger, nullable=False)
+
+
+class JobRecord(db.Model):
+    """
+        Состояние фоновой задачи, общее для всех процессов сервера.
+
+        Задача выполняется в процессе, который её принял (host, pid), и пишет сюда своё состояние:
+        при запуске, при завершении и не реже раза в JOB_STATE_INTERVAL секунд. Другие процессы
+        читают строку, чтобы ответить на GET /jobs/<id>, и выставляют cancel_requested, чтобы отменить задачу.
+    """
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    counters = db.Column(db.JSON, nullable=False, default=dict)
+    total = db.Column(db.BigInteger, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    host = db.Column(db.String(255), nullable=False)
+    pid = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
@@ -0,0 +1,24 @@
+"""
+    Запуск приложения в production: uvicorn обслуживает src.asgi:app.
+
+    Медленные загрузки и скачивания ждут клиента в цикле событий, не занимая потоков;
+    SERVER_WORKERS процессов, по SERVER_THREADS потоков пула в каждом. Наблюдатель за хранилищем
+    (WATCHER_ENABLED) работает только в одном из воркеров, восстановление прерванных операций
+    при старте каждого воркера не трогает операции, выполняющиеся в соседних. Блокировки фоновых
+    задач общие для воркеров (flock), состояние задач читается из таблицы jobs любым воркером.
+"""
+import uvicorn
+
+from src.config import Config
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "src.asgi:app",
+        host=Config.SERVER_HOST,
+        port=Config.SERVER_PORT,
+        workers=Config.SERVER_WORKERS,
+        limit_concurrency=Config.SERVER_LIMIT_CONCURRENCY or None,
+        timeout_keep_alive=Config.SERVER_KEEPALIVE,
+        lifespan="on",
+        proxy_headers=True,
+    )
@@ -0,0 +1,149 @@
+import os
+import tarfile
+import time
+import zipfile
+from collections.abc import Iterator, Sequence
+
+from src.services.compression import open_reader
+from src.services.storage_manager import StorageManager
+
+
+class _StreamSink:
+    """
+        Несдвигаемый приёмник для zipfile: копит записанные байты до следующего drain().
+        Без tell()/seek() zipfile пишет дескрипторы данных после содержимого и не
+        возвращается к уже отданным заголовкам.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ArchiveService:
+    """
+        Потоковая сборка ZIP/TAR-архива из файлов хранилища.
+
+        Архив генерируется на лету блоками по chunk_size: память не зависит от размера архива,
+        временные файлы не создаются. Сжатые на диске файлы распаковываются на лету.
+        Файлы, исчезнувшие с диска к моменту чтения, пропускаются.
+
+        Атрибуты:
+            storage (StorageManager): Менеджер файлового хранилища.
+            chunk_size (int): Размер блока чтения файлов.
+    """
+    FORMATS = {
+        "zip": ("application/zip", ".zip"),
+        "tar": ("application/x-tar", ".tar"),
+    }
+
+    def __init__(self, storage: StorageManager, chunk_size: int = 1024 * 1024):
+        self.storage = storage
+        self.chunk_size = chunk_size
+
+    def stream(self, entries: Sequence, archive_format: str = "zip", base_path: str = "",
+               compress: bool = False) -> Iterator[bytes]:
+        """
+            Возвращает генератор байт архива.
+
+            Args:
+                entries (Sequence): Записи файлов (id, name, extension, path, storage_key, size, encoding).
+                archive_format (str): zip | tar.
+                base_path (str): Путь, относительно которого строятся имена внутри архива.
+                compress (bool): Сжимать содержимое ZIP (deflate); по умолчанию — без сжатия (stored).
+
+            Raises:
+                ValueError: Если формат не поддерживается.
+        """
+        if archive_format not in self.FORMATS:
+            raise ValueError(f"Неподдерживаемый формат архива. Доступны: {', '.join(self.FORMATS)}")
+        if archive_format == "tar":
+            return self._stream_tar(entries, base_path)
+        return self._stream_zip(entries, base_path, compress)
+
+    def _arcname(self, entry, base_path: str) -> str:
+        relative = os.path.join(entry.path, entry.name + entry.extension)
+        if base_path:
+            # Имена строятся от родителя base_path, чтобы сам каталог остался в архиве
+            relative = os.path.relpath(relative, os.path.dirname(base_path))
+        return relative.replace(os.sep, "/")
+
+    def _open(self, entry) -> tuple | None:
+        """
+            Открывает содержимое записи на чтение.
+
+            Returns:
+                tuple | None: (файл, размер содержимого, mtime) или None, если файла на диске нет.
+        """
+        abs_path = self.storage.physical_path(entry)
+        try:
+            if entry.encoding:
+                return open_reader(entry.encoding, abs_path), entry.size, os.stat(abs_path).st_mtime
+            f = open(abs_path, "rb")
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+        file_stat = os.fstat(f.fileno())
+        return f, file_stat.st_size, file_stat.st_mtime
+
+    def _stream_zip(self, entries: Sequence, base_path: str, compress: bool) -> Iterator[bytes]:
+        sink = _StreamSink()
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with zipfile.ZipFile(sink, mode="w", compression=compression, allowZip64=True) as archive:
+            for entry in entries:
+                opened = self._open(entry)
+                if opened is None:
+                    continue
+                f, size, mtime = opened
+                with f:
+                    # Формат ZIP не хранит даты раньше 1980 года
+                    date_time = time.localtime(max(mtime, 315532800))[:6]
+                    info = zipfile.ZipInfo(self._arcname(entry, base_path), date_time=date_time)
+                    info.compress_type = compression
+                    info.file_size = size
+                    with archive.open(info, mode="w") as dest:
+                        while chunk := f.read(self.chunk_size):
+                            dest.write(chunk)
+                            if data := sink.drain():
+                                yield data
+                if data := sink.drain():
+                    yield data
+        # Центральный каталог записывается при закрытии архива
+        yield sink.drain()
+
+    def _stream_tar(self, entries: Sequence, base_path: str) -> Iterator[bytes]:
+        for entry in entries:
+            opened = self._open(entry)
+            if opened is None:
+                continue
+            f, size, mtime = opened
+            with f:
+                info = tarfile.TarInfo(self._arcname(entry, base_path))
+                info.size = size
+                info.mtime = int(mtime)
+                info.mode = 0o644
+                yield info.tobuf(format=tarfile.PAX_FORMAT)
+
+                remaining = info.size
+                while remaining > 0:
+                    chunk = f.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        # Файл укоротился во время чтения: размер в заголовке уже отдан, добиваем нулями
+                        chunk = bytes(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    yield chunk
+                padding = -info.size % tarfile.BLOCKSIZE
+                if padding:
+                    yield bytes(padding)
+        # Конец архива — два пустых блока
+        yield bytes(tarfile.BLOCKSIZE * 2)
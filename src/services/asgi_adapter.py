@@ -0,0 +1,355 @@
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.wsgi import FileWrapper
+
+logger = logging.getLogger(__name__)
+
+# Маркер конца тела ответа при чтении итератора в пуле потоков
+_END = object()
+# Ключ environ, под которым приложение получает приёмник уже принятого тела (upload_sink)
+UPLOAD_SINK = "upload.sink"
+
+
+class _RequestBody:
+    """
+        Тело запроса, накопленное до вызова приложения: в памяти до spool_memory байт,
+        дальше — во временном безымянном файле. Запись в файл выполняется в пуле потоков.
+    """
+
+    def __init__(self, adapter: "AsyncWSGIAdapter"):
+        self.adapter = adapter
+        self.stream = io.BytesIO()
+        self.size = 0
+        self._on_disk = False
+
+    async def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if not self._on_disk and self.size > self.adapter.spool_memory:
+            buffered = self.stream.getvalue()
+            self.stream = await self.adapter.run(partial(tempfile.TemporaryFile, dir=self.adapter.spool_dir))
+            self._on_disk = True
+            await self.adapter.run(self.stream.write, buffered)
+        if self._on_disk:
+            await self.adapter.run(self.stream.write, chunk)
+        else:
+            self.stream.write(chunk)
+
+    async def rewind(self):
+        if self._on_disk:
+            await self.adapter.run(self.stream.seek, 0)
+        else:
+            self.stream.seek(0)
+
+    async def close(self):
+        if self._on_disk:
+            await self.adapter.run(self.stream.close)
+        else:
+            self.stream.close()
+
+
+class _Exchange:
+    """
+        Один HTTP-запрос ASGI, обслуживаемый WSGI-приложением.
+    """
+
+    def __init__(self, adapter: "AsyncWSGIAdapter", scope: dict, receive, send):
+        self.adapter = adapter
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.status: int | None = None
+        self.headers: list[tuple[bytes, bytes]] = []
+        self.headers_sent = False
+        self.pending: list[bytes] = []
+        self.disconnected = asyncio.Event()
+        # Все вызовы приложения по одному запросу выполняются в одном контексте: Flask хранит
+        # контексты запроса в contextvars, а потоковый ответ может читаться разными потоками пула
+        self.context = contextvars.copy_context()
+
+    async def run(self):
+        if self.adapter.upload_sink is not None and self._large_body():
+            try:
+                sink = await self._call(self.adapter.upload_sink, self._environ(io.BytesIO(), True))
+            except Exception:
+                logger.exception("Не удалось открыть приёмник тела: %s %s", self.scope["method"], self.scope["path"])
+                sink = None
+            if sink is not None:
+                await self._run_sink(sink)
+                return
+
+        body = _RequestBody(self.adapter)
+        try:
+            complete = await self._read_body(body)
+            declared_length = any(name == b"content-length" for name, _ in self.scope["headers"])
+            if not complete and not declared_length:
+                # Тело без длины оборвалось: отличить его от полного нельзя — приложение не вызывается
+                return
+            await body.rewind()
+            await self._respond(self._environ(body.stream, complete), complete)
+        finally:
+            await body.close()
+
+    def _large_body(self) -> bool:
+        # Тело, которое целиком помещается в память, проще принять до вызова приложения
+        for name, value in self.scope["headers"]:
+            if name == b"content-length":
+                return not value.isdigit() or int(value) > self.adapter.spool_memory
+        return True
+
+    async def _run_sink(self, sink):
+        """
+            Передаёт тело в приёмник по мере приёма, затем вызывает приложение с приёмником
+            в environ[UPLOAD_SINK] и пустым wsgi.input. Блоки собираются до chunk_size и пишутся
+            в пуле потоков; пока блок пишется, принимается следующий, но не больше одного
+            блока впереди записи, поэтому медленный диск притормаживает клиента.
+        """
+        error = None
+        writing = None
+        buffer = []
+        buffered = 0
+        try:
+            while True:
+                message = await self.receive()
+                if message["type"] == "http.disconnect":
+                    # Принятое до обрыва дописывается: возобновляемая загрузка сохранит этот префикс
+                    self.disconnected.set()
+                    error = ClientDisconnected()
+                    more = False
+                else:
+                    chunk = message.get("body", b"")
+                    more = message.get("more_body", False)
+                    if chunk:
+                        buffer.append(chunk)
+                        buffered += len(chunk)
+                if buffered >= self.adapter.chunk_size or (buffered and not more):
+                    if writing is not None:
+                        await writing
+                    writing = self._call(sink.write, b"".join(buffer))
+                    buffer.clear()
+                    buffered = 0
+                if not more:
+                    break
+            if writing is not None:
+                await writing
+        except BaseException as e:
+            # Ошибка записи (например, часть больше файла) дойдёт до приложения через приёмник;
+            # при отмене задачи сервером тело считается оборванным
+            error = e if isinstance(e, Exception) else ClientDisconnected()
+            if writing is not None and not writing.done():
+                await asyncio.wait([writing])
+            if not isinstance(e, Exception):
+                await self._call(sink.close, error)
+                raise
+        await self._call(sink.close, error)
+        environ = self._environ(io.BytesIO(), True)
+        environ[UPLOAD_SINK] = sink
+        await self._respond(environ, not self.disconnected.is_set())
+
+    async def _read_body(self, body: _RequestBody) -> bool:
+        """
+            Принимает тело запроса целиком, не занимая поток: медленный клиент ждёт в цикле событий.
+
+            Returns:
+                bool: False, если клиент отключился до конца тела.
+        """
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected.set()
+                return False
+            chunk = message.get("body", b"")
+            if chunk:
+                await body.write(chunk)
+            if not message.get("more_body", False):
+                return True
+
+    async def _respond(self, environ: dict, complete: bool):
+        watcher = asyncio.ensure_future(self._watch_disconnect()) if complete else None
+        try:
+            try:
+                app_iter = await self._call(self.adapter.wsgi_app, environ, self._start_response)
+            except Exception:
+                logger.exception("Ошибка WSGI-приложения: %s %s", environ["REQUEST_METHOD"], environ["PATH_INFO"])
+                if complete:
+                    await self._send_error()
+                return
+            try:
+                if complete:
+                    await self._send_body(app_iter)
+            finally:
+                close = getattr(app_iter, "close", None)
+                if close is not None:
+                    await self._call(close)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    async def _send_body(self, app_iter):
+        iterator = iter(app_iter)
+        while True:
+            if self.disconnected.is_set():
+                return
+            # Блок ответа готовится в пуле (чтение файла, запрос к базе), а ожидание медленного
+            # клиента (send ждёт освобождения буфера сокета) поток не занимает
+            chunk = await self._call(next, iterator, _END)
+            if chunk is _END:
+                break
+            if self.pending:
+                chunk = b"".join(self.pending) + chunk
+                self.pending.clear()
+            if chunk:
+                await self._send_start()
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await self._send_start()
+        await self.send({"type": "http.response.body", "body": b"".join(self.pending), "more_body": False})
+
+    async def _send_start(self):
+        if not self.headers_sent:
+            if self.status is None:
+                raise RuntimeError("WSGI-приложение не вызвало start_response")
+            self.headers_sent = True
+            await self.send({"type": "http.response.start", "status": self.status, "headers": self.headers})
+
+    async def _send_error(self):
+        if self.headers_sent:
+            return
+        self.status, self.headers = 500, [(b"content-type", b"text/plain; charset=utf-8")]
+        await self._send_start()
+        await self.send({"type": "http.response.body", "body": b"Internal Server Error"})
+
+    async def _watch_disconnect(self):
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected.set()
+                return
+
+    def _call(self, func, *args):
+        return self.adapter.run(self.context.run, func, *args)
+
+    def _start_response(self, status: str, headers: list[tuple[str, str]], exc_info=None):
+        if exc_info is not None and self.headers_sent:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return self.pending.append
+
+    def _environ(self, body, complete: bool) -> dict:
+        scope = self.scope
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1] or 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": self.adapter.file_wrapper,
+        }
+        if complete:
+            # Тело принято целиком: его можно читать до конца потока. Если клиент отключился посреди
+            # тела с Content-Length, ключа нет — Werkzeug ограничивает поток заявленной длиной (он
+            # проверяет наличие ключа, а не значение) и на обрыве выбрасывает ClientDisconnected:
+            # обычная загрузка не примет усечённый файл за целый, а возобновляемая сохранит принятый
+            # префикс части
+            environ["wsgi.input_terminated"] = True
+        if scope.get("client"):
+            environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+        for raw_name, raw_value in scope["headers"]:
+            name, value = raw_name.decode("latin-1").upper().replace("-", "_"), raw_value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = name
+            else:
+                key = f"HTTP_{name}"
+            if key in environ:
+                value = environ[key] + (";" if key == "HTTP_COOKIE" else ",") + value
+            environ[key] = value
+        return environ
+
+
+class AsyncWSGIAdapter:
+    """
+        ASGI-приложение поверх WSGI-приложения Flask для отдачи и приёма больших файлов.
+
+        Поток на запрос занимается только на время работы приложения, а не на время передачи:
+            - тело запроса принимается в цикле событий (в памяти до spool_memory байт, дальше —
+              во временный файл в spool_dir) и передаётся приложению целиком, поэтому медленная
+              загрузка не держит поток, пока клиент присылает байты;
+            - тело больше spool_memory, для которого upload_sink(environ) вернул приёмник, не копируется
+              во временный файл: блоки по мере приёма передаются в sink.write (в пуле потоков), конец
+              тела — sink.close(None), обрыв или ошибка записи — sink.close(error), после чего
+              приложение вызывается с приёмником в environ[UPLOAD_SINK];
+            - тело ответа читается блоками в пуле потоков и отправляется клиенту из цикла событий
+              с учётом обратного давления, поэтому медленное скачивание не держит поток, пока
+              клиент забирает байты.
+
+        Все блокирующие вызовы (приложение, чтение файлов и базы, запись временных файлов)
+        выполняются в ограниченном пуле из threads потоков: тысячи медленных соединений
+        обслуживаются этим пулом, а не тысячей потоков.
+
+        Атрибуты:
+            wsgi_app: WSGI-приложение.
+            spool_memory (int): Сколько байт тела запроса держать в памяти до перехода на диск.
+            spool_dir (str | None): Каталог временных файлов тела (на той же ФС, что и хранилище).
+            chunk_size (int): Размер блока чтения файлов ответа (wsgi.file_wrapper) и записи в приёмник.
+            upload_sink (Callable[[dict], object | None] | None): Открывает приёмник тела по environ
+                запроса (вызывается в пуле до приёма тела); None — тело накапливается как обычно.
+    """
+
+    def __init__(self, wsgi_app, threads: int = 32, spool_memory: int = 1 << 20, spool_dir: str | None = None,
+                 chunk_size: int = 256 * 1024, upload_sink=None):
+        self.wsgi_app = wsgi_app
+        self.upload_sink = upload_sink
+        self.spool_memory = spool_memory
+        self.spool_dir = spool_dir
+        self.chunk_size = chunk_size
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope: dict, receive, send):
+        if scope["type"] == "http":
+            await _Exchange(self, scope, receive, send).run()
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Неподдерживаемый тип соединения: {scope['type']}")
+
+    def run(self, func, *args):
+        """
+            Выполняет блокирующий вызов в пуле потоков адаптера.
+        """
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def file_wrapper(self, file, block_size: int = 8192) -> FileWrapper:
+        """
+            wsgi.file_wrapper: отдача файла блоками chunk_size — меньше переходов в пул на файл.
+        """
+        return FileWrapper(file, max(block_size, self.chunk_size))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,196 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.file_service import FileService
+
+
+class BatchService:
+    """
+        Пакетные операции над файлами: move, rename, delete и comment за один запрос.
+
+        Все записи загружаются одним запросом IN, операции с файловой системой выполняются
+        в пуле потоков, изменения в БД фиксируются одной транзакцией. Ошибка отдельной операции
+        (нет записи, конфликт имён, сбой на диске) не мешает остальным. Если не удалась сама
+        фиксация транзакции, все файловые операции пакета откатываются: перемещённые файлы
+        возвращаются на место, удаляемые — восстанавливаются.
+
+        Атрибуты:
+            workers (int): Размер пула потоков для файловых операций.
+    """
+    OPERATIONS = ("move", "rename", "delete", "comment")
+
+    def __init__(self, file_service: FileService, workers: int = 8):
+        self.storage = file_service.storage
+        self.repo = file_service.repo
+        self.blobs = file_service.blobs
+        self.file_service = file_service
+        self.workers = workers
+
+    def execute(self, operations: list) -> dict:
+        """
+            Выполняет пакет операций.
+
+            Args:
+                operations (list): Элементы вида {"op": "move", "id": 1, "name": "...", "path": "..."},
+                    {"op": "rename", "id": 2, "name": "..."}, {"op": "delete", "id": 3},
+                    {"op": "comment", "id": 4, "comment": "..."}.
+
+            Returns:
+                dict: {"results": [{"index", "op", "id", "status": "ok" | "error", "message" | "file"}],
+                    "succeeded": int, "failed": int}
+        """
+        results: list[dict] = [{} for _ in operations]
+        planned = self._plan(operations, results)
+        applied = self._run_fs(planned, results)
+        if applied:
+            self._commit(applied, results)
+
+        succeeded = sum(1 for r in results if r["status"] == "ok")
+        return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+    @staticmethod
+    def _fail(results: list[dict], index: int, message: str):
+        results[index].update(status="error", message=message)
+
+    def _plan(self, operations: list, results: list[dict]) -> list[dict]:
+        valid = []
+        seen_ids = set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                results[index].update(index=index, op=None, id=None)
+                self._fail(results, index, "Операция должна быть объектом.")
+                continue
+            op, file_id = operation.get("op"), operation.get("id")
+            results[index].update(index=index, op=op, id=file_id)
+            if op not in self.OPERATIONS:
+                self._fail(results, index, f"Неизвестная операция. Доступны: {', '.join(self.OPERATIONS)}")
+            elif not isinstance(file_id, int) or isinstance(file_id, bool):
+                self._fail(results, index, "Поле id должно быть целым числом.")
+            elif file_id in seen_ids:
+                self._fail(results, index, "Файл уже встречается в этом пакете.")
+            else:
+                seen_ids.add(file_id)
+                valid.append((index, operation))
+
+        records = self.repo.get_by_ids([operation["id"] for _, operation in valid])
+        planned = []
+        targets: dict[tuple[str, str, str], int] = {}
+        for index, operation in valid:
+            file = records.get(operation["id"])
+            if file is None:
+                self._fail(results, index, "Файл не найден.")
+                continue
+            item = {"index": index, "op": operation["op"], "file": file}
+            try:
+                if item["op"] == "rename" and not operation.get("name"):
+                    raise ValueError("Для переименования нужно указать name.")
+                if item["op"] in ("move", "rename"):
+                    new_path = operation.get("path") if item["op"] == "move" else None
+                    item["name"], item["path"] = self.storage.resolve_move(
+                        operation.get("name") or file.name,
+                        file.path if new_path is None else new_path,
+                    )
+                    target = (item["name"], file.extension, item["path"])
+                    if target != (file.name, file.extension, file.path):
+                        if target in targets:
+                            raise ValueError("Несколько файлов пакета перемещаются по одному пути.")
+                        targets[target] = index
+                elif item["op"] == "comment":
+                    comment = operation.get("comment")
+                    if comment is not None and not isinstance(comment, str):
+                        raise ValueError("Поле comment должно быть строкой.")
+                    item["comment"] = comment
+            except ValueError as e:
+                self._fail(results, index, str(e))
+                continue
+            if item["op"] == "move" and operation.get("comment") is not None:
+                item["comment"] = operation["comment"]
+            planned.append(item)
+
+        # Цели, уже занятые другими записями, — конфликт (в том числе с файлами, которые этот же пакет удаляет)
+        conflicts = {targets[key] for key in self.repo.find_existing(list(targets))}
+        for item in planned:
+            if item["index"] in conflicts:
+                self._fail(results, item["index"], "Файл с таким именем уже существует по данному пути.")
+        return [item for item in planned if item["index"] not in conflicts]
+
+    # Функции файловых операций выполняются в потоках пула без контекста приложения,
+    # поэтому работают только с путями, подготовленными в _run_fs, а не с ORM-объектами
+    def _fs_apply(self, item: dict):
+        # Содержимое не по логическому пути (блоб, объект): перемещение — только метаданные;
+        # общий блоб удаляется через счётчик ссылок, собственный объект записи — как обычный файл
+        if item["op"] in ("move", "rename") and item["on_disk"]:
+            self.storage.rename_file(item["old_path"], item["old_name"] + item["extension"],
+                                     item["path"], item["name"] + item["extension"])
+        elif item["op"] == "delete" and item["owned"]:
+            item["stash"] = self.storage.stash_file(item["abs_path"])
+
+    def _fs_revert(self, item: dict):
+        if item["op"] in ("move", "rename") and item["on_disk"]:
+            self.storage.rename_file(item["path"], item["name"] + item["extension"],
+                                     item["old_path"], item["old_name"] + item["extension"])
+        elif item["op"] == "delete" and item["owned"]:
+            self.storage.restore_stash(item.get("stash"), item["abs_path"])
+
+    def _map(self, func, items: list[dict]) -> list[Exception | None]:
+        def call(item):
+            try:
+                func(item)
+            except Exception as e:
+                return e
+            return None
+
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as pool:
+            return list(pool.map(call, items))
+
+    def _run_fs(self, planned: list[dict], results: list[dict]) -> list[dict]:
+        for item in planned:
+            file = item["file"]
+            item.update(old_name=file.name, old_path=file.path, extension=file.extension,
+                        on_disk=not file.storage_key, owned=not self.storage.is_blob_key(file.storage_key),
+                        abs_path=self.storage.physical_path(file))
+        errors = self._map(self._fs_apply, planned)
+        applied = []
+        for item, error in zip(planned, errors):
+            if error is None:
+                applied.append(item)
+            else:
+                self._fail(results, item["index"], str(error) if isinstance(error, ValueError)
+                           else "Ошибка файловой системы.")
+        return applied
+
+    def _commit(self, applied: list[dict], results: list[dict]):
+        blobs_to_remove = []
+        try:
+            for item in applied:
+                file = item["file"]
+                if item["op"] in ("move", "rename"):
+                    fields = {"name": item["name"], "path": item["path"]}
+                    if item.get("comment") is not None:
+                        fields["comment"] = item["comment"]
+                    self.repo.update(file, commit=False, **fields)
+                elif item["op"] == "comment":
+                    self.repo.update(file, commit=False, comment=item["comment"])
+                else:
+                    if self.storage.is_blob_key(file.storage_key) and self.blobs.release(file.storage_key) == 0:
+                        blobs_to_remove.append(file.storage_key)
+                    self.repo.delete(file, commit=False)
+                # Снимок до фиксации: после commit атрибуты устаревают и перечитывались бы по одной записи
+                item["result"] = file.to_dict() if item["op"] != "delete" else None
+            self.repo.commit()
+        except Exception:
+            self.repo.rollback()
+            # Изменения в БД не применены — возвращаем файловую систему в исходное состояние
+            self._map(self._fs_revert, applied)
+            for item in applied:
+                self._fail(results, item["index"], "Не удалось сохранить изменения в базе данных.")
+            return
+
+        for item in applied:
+            results[item["index"]]["status"] = "ok"
+            if item["result"] is not None:
+                results[item["index"]]["file"] = item["result"]
+        self._map(lambda item: self.storage.drop_stash(item.get("stash")),
+                  [item for item in applied if item.get("stash")])
+        self.file_service.remove_unreferenced_blobs(blobs_to_remove)
@@ -0,0 +1,84 @@
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src import db
+from src.models import Blob
+
+
+class BlobRepository:
+    """
+        Репозиторий счётчиков ссылок блобов дедуплицированного хранилища.
+
+        Методы не фиксируют транзакцию: изменение счётчика должно попасть в одну транзакцию
+        с созданием или удалением записи о файле. Обновление строки блоба блокирует её
+        до конца транзакции, что упорядочивает параллельные загрузки и удаления одного блоба.
+    """
+    @staticmethod
+    def acquire(key: str, size: int):
+        """
+            Увеличивает счётчик ссылок блоба, создавая строку при первой ссылке.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(Blob).values(key=key, size=size, refcount=1)
+            stmt = stmt.on_conflict_do_update(index_elements=[Blob.key], set_={"refcount": Blob.refcount + 1})
+            db.session.execute(stmt)
+            return
+
+        blob = db.session.execute(select(Blob).where(Blob.key == key).with_for_update()).scalar_one_or_none()
+        if blob is None:
+            db.session.add(Blob(key=key, size=size, refcount=1))
+            db.session.flush()
+        else:
+            blob.refcount += 1
+
+    @staticmethod
+    def release(key: str) -> int:
+        """
+            Уменьшает счётчик ссылок блоба и удаляет строку, когда ссылок не осталось.
+
+            Returns:
+                int: Оставшееся количество ссылок.
+        """
+        db.session.execute(update(Blob).where(Blob.key == key).values(refcount=Blob.refcount - 1))
+        remaining = db.session.execute(select(Blob.refcount).where(Blob.key == key)).scalar_one_or_none()
+        if remaining is not None and remaining <= 0:
+            db.session.execute(delete(Blob).where(Blob.key == key))
+        return max(remaining or 0, 0)
+
+    @staticmethod
+    def lock_unreferenced(key: str) -> bool:
+        """
+            Блокирует строку блоба до конца транзакции (создавая её, если строки уже нет) и проверяет,
+            что на блоб никто не ссылается; в этом случае строка удаляется.
+
+            Вызывается после фиксации удаления последней ссылки, перед удалением содержимого с диска:
+            параллельная загрузка того же содержимого либо уже зафиксировала новую ссылку (блоб
+            остаётся), либо ждёт блокировки и разместит блоб заново после фиксации этой транзакции.
+
+            Returns:
+                bool: True, если ссылок нет и содержимое можно удалить.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(Blob).values(key=key, size=0, refcount=0)
+            stmt = stmt.on_conflict_do_update(index_elements=[Blob.key], set_={"refcount": Blob.refcount})
+            db.session.execute(stmt)
+            refcount = db.session.execute(select(Blob.refcount).where(Blob.key == key)).scalar_one()
+        else:
+            refcount = db.session.execute(
+                select(Blob.refcount).where(Blob.key == key).with_for_update()
+            ).scalar_one_or_none() or 0
+        if refcount > 0:
+            return False
+        db.session.execute(delete(Blob).where(Blob.key == key))
+        return True
+
+    @staticmethod
+    def get_refcount(key: str) -> int:
+        """
+            Возвращает текущее количество ссылок на блоб (0, если строки нет).
+        """
+        return db.session.execute(select(Blob.refcount).where(Blob.key == key)).scalar_one_or_none() or 0
@@ -0,0 +1,95 @@
+from datetime import datetime, UTC
+
+from sqlalchemy import select, delete, insert, func, literal
+
+from src import db
+from src.models import FileChange, FileRecord
+
+# Ключ транзакционной advisory-блокировки PostgreSQL, под которой выдаются номера изменений
+PG_CHANGES_LOCK = 0x66696c6573
+
+# Флаг в Session.info: транзакция изменила записи о файлах (по нему сбрасываются кэши после фиксации)
+FILES_CHANGED = "files_changed"
+
+
+class ChangeRepository:
+    """
+        Репозиторий журнала изменений файлов (file_changes).
+
+        Методы записи вызываются репозиторием файлов в той же транзакции, что и само изменение,
+        и не фиксируют её. Запись заменяет прежнюю строку файла новой, с большим seq.
+
+        В PostgreSQL номера последовательности выдаются до фиксации, и транзакция с меньшим seq
+        может стать видимой позже транзакции с большим — клиент, уже продвинувший курсор,
+        пропустил бы её. Поэтому пишущие транзакции сериализуются advisory-блокировкой,
+        которая держится до фиксации. В SQLite запись и так сериализована.
+    """
+    @staticmethod
+    def lock(mark_changed: bool = True):
+        """
+            Берёт блокировку журнала до конца транзакции (только PostgreSQL). Вызывается до первой
+            записи в files, чтобы блокировки строк всегда брались после неё, а не наоборот.
+
+            Args:
+                mark_changed (bool): Отметить транзакцию как изменяющую файлы (сброс кэша ответов
+                    после фиксации). False — если заранее неизвестно, изменится ли хоть одна запись;
+                    тогда отметку ставит последующий record.
+        """
+        if mark_changed:
+            db.session.info[FILES_CHANGED] = True
+        if db.session.get_bind().dialect.name == "postgresql":
+            with db.session.no_autoflush:
+                db.session.execute(select(func.pg_advisory_xact_lock(PG_CHANGES_LOCK)))
+
+    @staticmethod
+    def record(ids: list[int], deleted: bool = False, chunk_size: int = 500):
+        """
+            Отмечает файлы изменёнными (или удалёнными, если deleted=True).
+        """
+        if not ids:
+            return
+        ChangeRepository.lock()
+        table = FileChange.__table__
+        now = datetime.now(UTC)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            db.session.execute(delete(table).where(table.c.file_id.in_(chunk)))
+            db.session.execute(insert(table), [
+                {"file_id": file_id, "deleted": deleted, "changed_at": now} for file_id in chunk
+            ])
+
+    @staticmethod
+    def record_where(*conditions):
+        """
+            Отмечает изменёнными все файлы, подходящие под условия на FileRecord,
+            двумя запросами (DELETE и INSERT ... SELECT) без выборки ID в приложение.
+        """
+        ChangeRepository.lock()
+        table = FileChange.__table__
+        ids = select(FileRecord.id).where(*conditions)
+        db.session.execute(delete(table).where(table.c.file_id.in_(ids)))
+        db.session.execute(insert(table).from_select(
+            ["file_id", "deleted", "changed_at"],
+            select(FileRecord.id, literal(False), literal(datetime.now(UTC), FileChange.changed_at.type))
+            .where(*conditions).order_by(FileRecord.id),
+        ))
+
+    @staticmethod
+    def last_seq() -> int:
+        """
+            Возвращает номер последнего изменения (0, если журнал пуст).
+        """
+        return db.session.execute(select(func.coalesce(func.max(FileChange.seq), 0))).scalar_one()
+
+    @staticmethod
+    def since(seq: int, limit: int) -> tuple[list, bool]:
+        """
+            Возвращает изменения с номером больше seq в порядке возрастания.
+
+            Returns:
+                tuple[list[Row], bool]: Строки (seq, file_id, deleted) и признак, что есть ещё.
+        """
+        stmt = select(FileChange.seq, FileChange.file_id, FileChange.deleted) \
+            .where(FileChange.seq > seq).order_by(FileChange.seq).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+        return rows[:limit], len(rows) > limit
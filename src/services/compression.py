@@ -0,0 +1,117 @@
+import gzip
+import logging
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Необязательная зависимость: без неё файлы сжимаются только gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Кодировки содержимого на диске; имена совпадают со значениями Content-Encoding
+ENCODINGS = ("gzip", "zstd")
+# Суффиксы ключей сжатого содержимого в хранилище
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# Уровни сжатия по умолчанию: быстрые, сжатие должно стоить дешевле сэкономленного ввода-вывода
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3}
+
+# Ошибки чтения повреждённого сжатого содержимого
+DECODE_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class CorruptContentError(OSError):
+    """
+        Выбрасывается, когда сжатое содержимое на диске не удаётся распаковать.
+    """
+
+
+def open_writer(encoding: str, fileobj, level: int | None = None):
+    """
+        Оборачивает бинарный файл сжимающим потоком. write() возвращает количество принятых
+        (несжатых) байт; close() дописывает хвост сжатого потока, не закрывая fileobj.
+    """
+    level = level or DEFAULT_LEVELS[encoding]
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=level, mtime=0)
+    # Контрольная сумма кадра: повреждение обнаруживается при распаковке, как у gzip (CRC32)
+    compressor = zstandard.ZstdCompressor(level=level, write_checksum=True)
+    return compressor.stream_writer(fileobj, closefd=False, write_return_read=True)
+
+
+def open_reader(encoding: str, path):
+    """
+        Открывает сжатый файл на чтение распакованного содержимого.
+    """
+    if encoding == "gzip":
+        return gzip.open(path, "rb")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+
+class CompressionPolicy:
+    """
+        Решает, хранить ли загружаемый файл сжатым.
+
+        Файлы с расширениями из extensions сжимаются всегда; для остальных сжимается начало
+        содержимого (zlib, уровень 1 — дёшево) и файл сжимается, если образец уменьшился хотя бы
+        до min_ratio исходного размера. Файлы меньше min_size не сжимаются.
+
+        Атрибуты:
+            encoding (str): gzip | zstd.
+            extensions (frozenset[str]): Расширения (с точкой, в нижнем регистре), которые сжимаются всегда.
+            min_ratio (float): Порог отношения сжатого образца к исходному; 0 — только по расширению.
+            min_size (int): Минимальный размер сжимаемого файла, байт.
+            level (int | None): Уровень сжатия (None — по умолчанию для кодировки).
+            sample_size (int): Размер образца для оценки сжимаемости.
+    """
+
+    def __init__(self, encoding: str, extensions=(), min_ratio: float = 0.8, min_size: int = 4096,
+                 level: int | None = None, sample_size: int = 64 * 1024):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Неизвестная кодировка сжатия: {encoding}")
+        self.encoding = encoding
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        self.min_ratio = min_ratio
+        self.min_size = min_size
+        self.level = level
+        self.sample_size = sample_size
+
+    def choose(self, extension: str, head: bytes, complete: bool) -> str | None:
+        """
+            Выбирает кодировку для файла по расширению и началу содержимого.
+
+            Args:
+                extension (str): Расширение файла с точкой.
+                head (bytes): Начало содержимого.
+                complete (bool): head — всё содержимое файла.
+
+            Returns:
+                str | None: Кодировка или None — хранить без сжатия.
+        """
+        if complete and len(head) < self.min_size:
+            return None
+        if extension.lower() in self.extensions:
+            return self.encoding
+        if self.min_ratio <= 0 or not head:
+            return None
+        sample = head[:self.sample_size]
+        return self.encoding if len(zlib.compress(sample, 1)) <= len(sample) * self.min_ratio else None
+
+
+def create_compression_policy(encoding: str, extensions: str, min_ratio: float, min_size: int,
+                              level: int = 0) -> CompressionPolicy | None:
+    """
+        Создаёт политику сжатия по настройкам COMPRESSION* ("" — сжатие выключено).
+        Если для zstd не установлен пакет zstandard, используется gzip.
+
+        Args:
+            extensions (str): Расширения через запятую.
+    """
+    if not encoding:
+        return None
+    if encoding == "zstd" and zstandard is None:
+        logger.warning("Пакет zstandard не установлен, файлы сжимаются gzip")
+        encoding = "gzip"
+    extensions = [ext.strip() for ext in extensions.split(",") if ext.strip()]
+    extensions = [ext if ext.startswith(".") else f".{ext}" for ext in extensions]
+    return CompressionPolicy(encoding, extensions, min_ratio, min_size, level or None)
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import select, update, delete, func, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src import db
+from src.models import Directory, FileRecord
+from src.services.path_service import PATH_SEP
+
+
+class DirectoryRepository:
+    """
+        Репозиторий дерева каталогов с агрегатами (количество файлов и байт по поддереву).
+
+        Изменения передаются как приращения по каталогам, где лежат файлы, и распространяются
+        на всех предков одним executemany-upsert. Методы не фиксируют транзакцию: приращения
+        попадают в ту же транзакцию, что и изменение записей о файлах. Строки обновляются
+        в порядке пути, поэтому параллельные транзакции блокируют общих предков в одном порядке.
+    """
+    @staticmethod
+    def add_delta(deltas: dict, path: str, count: int, size: int):
+        """
+            Накапливает приращение (count, size) для каталога path в словаре deltas.
+        """
+        delta = deltas.setdefault(path, [0, 0])
+        delta[0] += count
+        delta[1] += size
+
+    @staticmethod
+    def split(path: str) -> tuple[str | None, str]:
+        """
+            Возвращает (родитель, имя) каталога; у корня родителя нет.
+        """
+        if not path:
+            return None, ""
+        parent, _, name = path.rpartition(PATH_SEP)
+        return parent, name
+
+    @staticmethod
+    def ancestors(path: str) -> Iterable[str]:
+        """
+            Перечисляет сам каталог и всех его предков вплоть до корня "".
+        """
+        while path is not None:
+            yield path
+            path = DirectoryRepository.split(path)[0]
+
+    @staticmethod
+    def apply(deltas: dict):
+        """
+            Применяет приращения к каталогам и всем их предкам. Каталоги, в поддереве которых
+            не осталось файлов, удаляются.
+
+            Args:
+                deltas (dict): path -> [count, size] для каталогов, где лежат изменённые файлы.
+        """
+        totals = defaultdict(lambda: [0, 0])
+        for path, (count, size) in deltas.items():
+            if not count and not size:
+                continue
+            for ancestor in DirectoryRepository.ancestors(path):
+                totals[ancestor][0] += count
+                totals[ancestor][1] += size
+
+        rows = []
+        for path in sorted(totals):
+            count, size = totals[path]
+            if count or size:
+                parent, name = DirectoryRepository.split(path)
+                rows.append({"path": path, "parent": parent, "name": name, "file_count": count, "total_size": size})
+        if not rows:
+            return
+
+        table = Directory.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.path], set_={
+                "file_count": table.c.file_count + stmt.excluded.file_count,
+                "total_size": table.c.total_size + stmt.excluded.total_size,
+            })
+            db.session.execute(stmt, rows)
+        else:
+            existing = set(db.session.scalars(
+                select(table.c.path).where(table.c.path.in_([row["path"] for row in rows])).with_for_update()
+            ))
+            new_rows = [row for row in rows if row["path"] not in existing]
+            changed_rows = [{"b_path": row["path"], "b_count": row["file_count"], "b_size": row["total_size"]}
+                            for row in rows if row["path"] in existing]
+            if new_rows:
+                db.session.execute(table.insert(), new_rows)
+            if changed_rows:
+                db.session.execute(update(table).where(table.c.path == bindparam("b_path")).values(
+                    file_count=table.c.file_count + bindparam("b_count"),
+                    total_size=table.c.total_size + bindparam("b_size"),
+                ), changed_rows)
+
+        touched = [row["path"] for row in rows]
+        for start in range(0, len(touched), 500):
+            db.session.execute(delete(table).where(table.c.path.in_(touched[start:start + 500]),
+                                                   table.c.file_count <= 0))
+
+    @staticmethod
+    def get(path: str) -> Directory | None:
+        """
+            Возвращает каталог по пути или None, если в его поддереве нет файлов.
+        """
+        return db.session.get(Directory, path)
+
+    @staticmethod
+    def get_children(path: str) -> list[Directory]:
+        """
+            Возвращает непосредственные подкаталоги, упорядоченные по имени.
+        """
+        return list(db.session.scalars(select(Directory).where(Directory.parent == path).order_by(Directory.name)))
+
+    @staticmethod
+    def is_empty() -> bool:
+        """
+            Проверяет, пуста ли таблица каталогов.
+        """
+        return db.session.execute(select(Directory.path).limit(1)).first() is None
+
+    @staticmethod
+    def rebuild():
+        """
+            Пересчитывает всю таблицу каталогов по таблице файлов (один GROUP BY path).
+            Не фиксирует транзакцию.
+        """
+        db.session.execute(delete(Directory.__table__))
+        stmt = select(FileRecord.path, func.count(), func.coalesce(func.sum(FileRecord.size), 0)) \
+            .group_by(FileRecord.path)
+        DirectoryRepository.apply({path: [count, size] for path, count, size in db.session.execute(stmt)})
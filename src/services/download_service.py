@@ -0,0 +1,254 @@
+import mimetypes
+import os
+import unicodedata
+import uuid
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+from flask import request, send_file, abort, Response
+from werkzeug.http import is_resource_modified
+
+from src.models import FileRecord
+from src.services.compression import open_reader
+from src.services.storage_manager import StorageManager
+
+
+def set_attachment_disposition(rv: Response, download_name: str):
+    """
+        Выставляет Content-Disposition: attachment так же, как send_file:
+        ASCII-имя в filename и полное имя в filename* (RFC 5987).
+    """
+    try:
+        download_name.encode("ascii")
+        rv.headers.set("Content-Disposition", "attachment", filename=download_name)
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+^`|~")
+        rv.headers.set("Content-Disposition", "attachment", filename=simple, **{"filename*": f"UTF-8''{quoted}"})
+
+
+class DownloadService:
+    """
+        Отдача файлов хранилища по HTTP.
+
+        Формирует валидаторы кэша (сильный ETag из SHA-256 содержимого и Last-Modified),
+        отвечает 304 на условные запросы, обслуживает одиночные и множественные Range-запросы
+        (multipart/byteranges) и при необходимости передаёт отдачу байт фронтовому прокси
+        через X-Accel-Redirect (nginx) или X-Sendfile (Apache, lighttpd).
+
+        Сжатые на диске файлы отдаются как есть с Content-Encoding клиентам, которые принимают
+        эту кодировку (Accept-Encoding); остальным содержимое распаковывается на лету.
+
+        Атрибуты:
+            storage (StorageManager): Менеджер файлового хранилища.
+            accel (str): Режим передачи прокси: "" | "x-accel" | "x-sendfile".
+            accel_prefix (str): Internal-location nginx, под которым доступен корень хранилища.
+            chunk_size (int): Размер блока чтения при отдаче диапазонов.
+    """
+    ACCEL_MODES = ("", "x-accel", "x-sendfile")
+
+    def __init__(self, storage: StorageManager, accel: str = "", accel_prefix: str = "/storage-internal/",
+                 chunk_size: int = 256 * 1024):
+        if accel not in self.ACCEL_MODES:
+            raise ValueError(f"Неизвестный режим передачи файлов прокси: {accel}")
+        self.storage = storage
+        self.accel = accel
+        self.accel_prefix = accel_prefix.rstrip("/") + "/"
+        self.chunk_size = chunk_size
+
+    def send(self, file: FileRecord) -> Response:
+        """
+            Формирует ответ на запрос скачивания файла с учётом заголовков текущего запроса.
+
+            Args:
+                file (FileRecord): Запись скачиваемого файла.
+
+            Returns:
+                Response: 200, 206, 304 или 416.
+        """
+        abs_path = self.storage.physical_path(file)
+        try:
+            file_stat = os.stat(abs_path)
+        except (FileNotFoundError, NotADirectoryError):
+            abort(404, description="Файл не найден")
+
+        download_name = file.name + file.extension
+        etag = self._etag(file, file_stat)
+        last_modified = datetime.fromtimestamp(int(file_stat.st_mtime), tz=timezone.utc)
+
+        if file.encoding:
+            if not request.accept_encodings[file.encoding]:
+                return self._decoded_response(file, abs_path, download_name, etag, last_modified)
+            # Сжатое представление — другие байты, поэтому и сильный ETag у него свой
+            etag = f"{etag}.{file.encoding}" if etag else ""
+            # Прокси не передаёт клиенту Content-Encoding из ответа приложения — отдаём сами
+            rv = self._send_stored(abs_path, download_name, file_stat, etag, last_modified, accel=False)
+            if rv.status_code != 304:
+                rv.headers["Content-Encoding"] = file.encoding
+            rv.vary.add("Accept-Encoding")
+            return rv
+        return self._send_stored(abs_path, download_name, file_stat, etag, last_modified)
+
+    def _send_stored(self, abs_path: Path, download_name: str, file_stat: os.stat_result, etag: str,
+                     last_modified: datetime, accel: bool = True) -> Response:
+        """
+            Отдаёт байты файла так, как они лежат на диске.
+        """
+        if self.accel and accel:
+            return self._accel_response(abs_path, download_name, etag, last_modified)
+
+        ranges = self._requested_ranges(file_stat.st_size, etag, last_modified)
+        if ranges is not None and not is_resource_modified(request.environ, etag=etag or None,
+                                                           last_modified=last_modified):
+            ranges = None
+        if ranges is not None:
+            return self._range_response(abs_path, download_name, file_stat.st_size, ranges, etag, last_modified)
+
+        # Полный ответ, одиночный диапазон и 304 — средствами werkzeug (wsgi.file_wrapper, если он есть)
+        return send_file(abs_path, as_attachment=True, download_name=download_name,
+                         etag=etag or True, last_modified=last_modified, conditional=True)
+
+    def _decoded_response(self, file: FileRecord, abs_path: Path, download_name: str, etag: str,
+                          last_modified: datetime) -> Response:
+        """
+            Отдаёт сжатый файл распакованным на лету. Range не поддерживается: чтобы попасть
+            в смещение распакованного содержимого, пришлось бы распаковывать всё до него.
+        """
+        rv = Response(self._read_decoded(file.encoding, abs_path),
+                      mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream",
+                      direct_passthrough=True)
+        rv.content_length = file.size
+        rv.headers["Accept-Ranges"] = "none"
+        rv.vary.add("Accept-Encoding")
+        self._set_validators(rv, etag, last_modified)
+        set_attachment_disposition(rv, download_name)
+        return rv.make_conditional(request)
+
+    def _read_decoded(self, encoding: str, abs_path: Path) -> Iterator[bytes]:
+        # Файл открывается при первом чтении тела: на 304 и HEAD он не нужен
+        with open_reader(encoding, abs_path) as f:
+            while chunk := f.read(self.chunk_size):
+                yield chunk
+
+    @staticmethod
+    def _etag(file: FileRecord, file_stat: os.stat_result) -> str:
+        # SHA-256 годится как сильный ETag, только если файл на диске не менялся после записи хэша
+        if not file.sha256 or (file.stored_size if file.encoding else file.size) != file_stat.st_size:
+            return ""
+        if file.mtime is not None and file.mtime != file_stat.st_mtime:
+            return ""
+        return file.sha256
+
+    def _requested_ranges(self, size: int, etag: str, last_modified: datetime) -> list[tuple[int, int]] | None:
+        """
+            Возвращает диапазоны [start, end) множественного Range-запроса, которые отдаются здесь.
+
+            None — запрос обслуживается send_file: диапазона нет, он одиночный, не в байтах
+            или не прошёл проверку If-Range. Если ни один диапазон не попадает в файл, отвечает 416.
+        """
+        header = request.headers.get("Range", "")
+        units, _, specs = header.partition("=")
+        specs = [spec.strip() for spec in specs.split(",") if spec.strip()]
+        if units.strip().lower() != "bytes" or len(specs) < 2:
+            return None
+        if_range = request.if_range
+        if if_range.etag is not None and (not etag or if_range.etag != etag):
+            return None
+        if if_range.date is not None and last_modified > if_range.date:
+            return None
+
+        # Разбор вручную: werkzeug отвергает пересекающиеся и неупорядоченные диапазоны, RFC 7233 их допускает
+        ranges = []
+        for spec in specs:
+            first, dash, last = spec.partition("-")
+            if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+                return None
+            if not first:
+                start, stop = max(size - int(last), 0), size
+            else:
+                start = int(first)
+                stop = size if not last else min(int(last) + 1, size)
+                if last and int(last) < start:
+                    return None
+            if start < stop:
+                ranges.append((start, stop))
+        if not ranges:
+            abort(Response(status=416, headers={"Content-Range": f"bytes */{size}"}))
+
+        # Пересекающиеся и смежные диапазоны сливаются, чтобы не отдавать одни байты дважды
+        merged: list[tuple[int, int]] = []
+        for start, stop in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def _range_response(self, abs_path: Path, download_name: str, size: int, ranges: list[tuple[int, int]],
+                        etag: str, last_modified: datetime) -> Response:
+        mimetype = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            rv = Response(self._read_ranges(abs_path, [(b"", start, stop)]), status=206, mimetype=mimetype,
+                          direct_passthrough=True)
+            rv.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+            rv.content_length = stop - start
+        else:
+            boundary = uuid.uuid4().hex
+            parts = [
+                ((f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n"
+                  f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode("ascii"), start, stop)
+                for start, stop in ranges
+            ]
+            closing = f"\r\n--{boundary}--\r\n".encode("ascii")
+            rv = Response(self._read_ranges(abs_path, parts, closing), status=206,
+                          mimetype=f"multipart/byteranges; boundary={boundary}", direct_passthrough=True)
+            rv.content_length = sum(len(head) + stop - start for head, start, stop in parts) + len(closing)
+
+        rv.headers["Accept-Ranges"] = "bytes"
+        self._set_validators(rv, etag, last_modified)
+        set_attachment_disposition(rv, download_name)
+        return rv
+
+    def _read_ranges(self, abs_path: Path, parts: list[tuple[bytes, int, int]],
+                     closing: bytes = b"") -> Iterator[bytes]:
+        with open(abs_path, "rb") as f:
+            for head, start, stop in parts:
+                if head:
+                    yield head
+                f.seek(start)
+                position = start
+                while position < stop:
+                    chunk = f.read(min(self.chunk_size, stop - position))
+                    if not chunk:
+                        # Файл укоротился во время отдачи: длина ответа уже объявлена, обрываем его
+                        raise OSError(f"Файл {abs_path} изменился во время отдачи")
+                    position += len(chunk)
+                    yield chunk
+        if closing:
+            yield closing
+
+    def _accel_response(self, abs_path: Path, download_name: str, etag: str, last_modified: datetime) -> Response:
+        rv = Response(mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+        self._set_validators(rv, etag, last_modified)
+        set_attachment_disposition(rv, download_name)
+        rv.make_conditional(request)
+        if rv.status_code == 304:
+            return rv
+
+        # Тело ответа и Range отдаёт прокси; Python только проверяет доступ и валидаторы
+        if self.accel == "x-accel":
+            relative = abs_path.relative_to(self.storage.base_dir).as_posix()
+            rv.headers["X-Accel-Redirect"] = self.accel_prefix + quote(relative)
+        else:
+            rv.headers["X-Sendfile"] = str(abs_path)
+        return rv
+
+    @staticmethod
+    def _set_validators(rv: Response, etag: str, last_modified: datetime):
+        if etag:
+            rv.set_etag(etag)
+        rv.last_modified = last_modified
+        rv.cache_control.no_cache = True
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, UTC
+from functools import partial
+from pathlib import Path
+
+from src.services.file_service import FileService
+from src.services.hashing import probe_file, full_hash
+from src.services.job_manager import job_manager, Job
+
+
+class DuplicateService:
+    """
+        Поиск файлов с одинаковым содержимым и, по запросу, их объединение в жёсткие ссылки.
+
+        Конвейер отсекает кандидатов от дешёвых проверок к дорогим:
+        1. размер — по данным FileRecord, без обращения к диску;
+        2. отпечаток первого и последнего блоков (для файлов не длиннее двух блоков он уже
+           покрывает всё содержимое);
+        3. полный SHA-256 — только для совпавших отпечатков.
+        Чтение и хэширование выполняются в пуле процессов. Пути, которые уже являются жёсткими
+        ссылками на один inode (а также записи режима cas с общим блобом), считаются одной копией.
+
+        Атрибуты:
+            workers (int | None): Размер пула процессов (None — по числу CPU).
+            block_size (int): Размер блоков отпечатка.
+            buffer_size (int): Размер блока чтения при полном хэшировании.
+    """
+
+    def __init__(self, file_service: FileService, workers: int | None = None, block_size: int = 64 * 1024,
+                 buffer_size: int = 1024 * 1024):
+        self.storage = file_service.storage
+        self.repo = file_service.repo
+        self.workers = workers or None
+        self.block_size = block_size
+        self.buffer_size = buffer_size
+
+    def start_job(self, hardlink: bool = False, min_size: int = 1, limit: int = 1000) -> Job:
+        """
+            Запускает поиск дубликатов фоновой задачей.
+
+            Args:
+                hardlink (bool): Заменить копии жёсткими ссылками на одну из них. Изменяет файлы
+                    хранилища, поэтому выполняется под блокировкой синхронизации.
+                min_size (int): Не рассматривать файлы меньше этого размера.
+                limit (int): Сколько групп (с наибольшим объёмом лишних копий) вернуть в отчёте.
+
+            Raises:
+                JobConflictError: Если уже выполняется поиск дубликатов или (для hardlink) синхронизация.
+        """
+        lock_key = self.storage.sync_lock_key if hardlink else f"duplicates:{self.storage.base_dir}"
+        return job_manager.submit("duplicates", lambda job: self._run(job, hardlink, max(min_size, 1), limit),
+                                  lock_key=lock_key)
+
+    @staticmethod
+    def _mp_context():
+        # spawn/forkserver заново импортируют главный модуль, а в app.py создание приложения
+        # выполняется на уровне модуля; fork этого не делает, а дочерние процессы только читают
+        # файлы и не трогают унаследованные соединения и блокировки
+        if "fork" in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context("fork")
+        return multiprocessing.get_context()
+
+    @staticmethod
+    def _map(job: Job, pool: ProcessPoolExecutor, func, paths: list[str], stage: str) -> dict:
+        futures = {path: pool.submit(func, path) for path in paths}
+        results = {}
+        for done, (path, future) in enumerate(futures.items(), 1):
+            try:
+                results[path] = future.result()
+            except OSError:
+                # Файл исчез или недоступен — просто не участвует в сравнении
+                results[path] = None
+            if done % 100 == 0:
+                job.report(stage=stage, processed=done, stage_total=len(paths))
+        job.report(stage=stage, processed=len(paths), stage_total=len(paths))
+        return results
+
+    def _run(self, job: Job, hardlink: bool, min_size: int, limit: int) -> dict:
+        records = defaultdict(list)
+        for row in self.repo.get_same_size_candidates(min_size):
+            records[str(self.storage.physical_path(row))].append(row)
+
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._mp_context())
+        try:
+            # Копия — один inode; у неё может быть несколько путей, а у пути — несколько записей (cas)
+            copies = {}
+            probes = self._map(job, pool, partial(probe_file, block_size=self.block_size), list(records), "probe")
+            for path, probe in probes.items():
+                if probe is None:
+                    continue
+                dev, ino, size, mtime, digest, complete = probe
+                copy = copies.setdefault((dev, ino), {"dev": dev, "size": size, "mtime": mtime, "digest": digest,
+                                                      "complete": complete, "paths": []})
+                copy["paths"].append(path)
+
+            candidates = defaultdict(list)
+            for copy in copies.values():
+                candidates[(copy["size"], copy["digest"])].append(copy)
+            to_hash = [copy for group in candidates.values() if len(group) > 1
+                       for copy in group if not copy["complete"]]
+
+            digests = self._map(job, pool, partial(full_hash, buffer_size=self.buffer_size),
+                                [copy["paths"][0] for copy in to_hash], "hash")
+            for copy in to_hash:
+                copy["digest"], copy["complete"] = digests[copy["paths"][0]], True
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        groups = defaultdict(list)
+        for key, group in candidates.items():
+            if len(group) > 1:
+                for copy in group:
+                    if copy["digest"] is not None:
+                        groups[(copy["size"], copy["digest"])].append(copy)
+        groups = {key: group for key, group in groups.items() if len(group) > 1}
+
+        linked = reclaimed = 0
+        if hardlink:
+            linked, reclaimed = self._collapse(groups.values(), records)
+
+        report = []
+        for (size, digest), group in groups.items():
+            files = sorted(
+                ({"id": row.id, "name": row.name, "extension": row.extension, "path": row.path}
+                 for copy in group for path in copy["paths"] for row in records[path]),
+                key=lambda item: item["id"],
+            )
+            report.append({"size": size, "sha256": digest, "copies": len(group), "files": files,
+                           "wasted_bytes": size * (len(group) - 1)})
+        report.sort(key=lambda item: (-item["wasted_bytes"], item["files"][0]["id"]))
+
+        return {
+            "group_count": len(report),
+            "duplicate_files": sum(len(item["files"]) - 1 for item in report),
+            "wasted_bytes": sum(item["wasted_bytes"] for item in report),
+            "linked": linked,
+            "reclaimed_bytes": reclaimed,
+            "groups": report[:limit],
+        }
+
+    def _collapse(self, groups, records: dict) -> tuple[int, int]:
+        """
+            Заменяет копии группы жёсткими ссылками на копию с наименьшим id записи.
+            Каждый путь заменяется атомарно (ссылка под временным именем + os.replace); путь,
+            изменившийся после хэширования, пропускается.
+
+            Returns:
+                tuple[int, int]: (заменено путей, освобождено байт)
+        """
+        linked = reclaimed = 0
+        stats = []
+        now = datetime.now(UTC)
+        for group in groups:
+            group = sorted(group, key=lambda copy: min(row.id for path in copy["paths"] for row in records[path]))
+            canonical = group[0]
+            source = canonical["paths"][0]
+            for copy in group[1:]:
+                # Блобы режима cas уже дедуплицированы хранилищем; ссылка между томами невозможна
+                if copy["dev"] != canonical["dev"] or any(row.storage_key for path in copy["paths"]
+                                                         for row in records[path]):
+                    continue
+                replaced = 0
+                for path in copy["paths"]:
+                    try:
+                        current = os.stat(path)
+                    except OSError:
+                        continue
+                    if (current.st_size, current.st_mtime) != (copy["size"], copy["mtime"]):
+                        continue
+                    tmp = Path(path).with_name(f"{self.storage.TEMP_PREFIX}link-{uuid.uuid4().hex}")
+                    try:
+                        os.link(source, tmp)
+                        os.replace(tmp, path)
+                    except OSError:
+                        tmp.unlink(missing_ok=True)
+                        continue
+                    replaced += 1
+                    mtime = os.stat(path).st_mtime
+                    stats.extend({"b_id": row.id, "b_mtime": mtime, "b_updated_at": now} for row in records[path])
+                linked += replaced
+                if replaced == len(copy["paths"]):
+                    reclaimed += copy["size"]
+
+        # У заменённых путей теперь mtime канонической копии — обновляем записи, чтобы
+        # синхронизация не приняла их за изменённые. Содержимое побайтно то же, поэтому
+        # сохранённый sha256 и результат проверки остаются в силе
+        self.repo.bulk_update_mtime(stats)
+        self.repo.commit()
+        return linked, reclaimed
@@ -1,6 +1,23 @@
 from src.models import FileRecord
 from src import db
-from datetime import datetime
+from collections.abc import Iterator
+from datetime import datetime, UTC
+from sqlalchemy import select, tuple_, or_, and_, insert, update, delete, bindparam, func, literal
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.services.change_repository import ChangeRepository
+from src.services.directory_repository import DirectoryRepository
+from src.services.path_service import PATH_SEP
+from src.services.serialization import format_row
+
+# Ключи keyset-пагинации: колонки сортировки, последней всегда идёт id (тай-брейкер)
+SORT_KEYS = {
+    "path": ("path", "name", "id"),
+    "name": ("name", "id"),
+    "size": ("size", "id"),
+    "created_at": ("created_at", "id"),
+}
 
 
 class FileRepository:
@@ -28,6 +45,51 @@ class FileRepository:
         """
         return FileRecord.query.get_or_404(file_id)
 
+    @staticmethod
+    def get_by_ids(ids: list[int], chunk_size: int = 500) -> dict[int, FileRecord]:
+        """
+            Загружает записи по списку ID запросами IN (по chunk_size ID на запрос).
+
+            Returns:
+                dict[int, FileRecord]: Найденные записи по ID.
+        """
+        ids = list(dict.fromkeys(ids))
+        result = {}
+        for start in range(0, len(ids), chunk_size):
+            stmt = select(FileRecord).where(FileRecord.id.in_(ids[start:start + chunk_size]))
+            result.update((file.id, file) for file in db.session.scalars(stmt))
+        return result
+
+    @staticmethod
+    def get_rows(ids: list[int], fields: tuple[str, ...], chunk_size: int = 500) -> dict[int, dict]:
+        """
+            Выбирает указанные колонки записей по списку ID Core-запросами IN, без ORM-объектов.
+
+            Returns:
+                dict[int, dict]: Найденные строки по ID.
+        """
+        columns = [getattr(FileRecord, name) for name in dict.fromkeys(("id", *fields))]
+        result = {}
+        for start in range(0, len(ids), chunk_size):
+            stmt = select(*columns).where(FileRecord.id.in_(ids[start:start + chunk_size]))
+            for row in db.session.execute(stmt):
+                mapping = row._mapping
+                result[mapping["id"]] = format_row(mapping, fields)
+        return result
+
+    @staticmethod
+    def find_existing(keys: list[tuple[str, str, str]], chunk_size: int = 300) -> set[tuple[str, str, str]]:
+        """
+            Возвращает те ключи (name, extension, path), для которых уже есть записи.
+        """
+        found = set()
+        identity = tuple_(FileRecord.name, FileRecord.extension, FileRecord.path)
+        for start in range(0, len(keys), chunk_size):
+            stmt = select(FileRecord.name, FileRecord.extension, FileRecord.path) \
+                .where(identity.in_(keys[start:start + chunk_size]))
+            found.update(tuple(row) for row in db.session.execute(stmt))
+        return found
+
     @staticmethod
     def get_all() -> list[FileRecord]:
         """
@@ -38,45 +100,558 @@ class FileRepository:
         """
         return FileRecord.query.all()
 
+    @staticmethod
+    def count() -> int:
+        """
+            Возвращает количество записей о файлах.
+        """
+        return db.session.execute(select(func.count()).select_from(FileRecord)).scalar_one()
+
+    @staticmethod
+    def list_page(fields: tuple[str, ...], filters: dict, sort: str = "path", descending: bool = False,
+                  limit: int = 100, after: list | None = None) -> tuple[list[dict], list | None]:
+        """
+            Возвращает одну страницу списка файлов с keyset-пагинацией.
+
+            Выбирает только запрошенные колонки через Core-запрос, без создания ORM-объектов.
+
+            Args:
+                fields (tuple[str, ...]): Колонки, которые попадут в ответ.
+                filters (dict): Фильтры: path, recursive, extensions, min_size, max_size,
+                    created_after, created_before, updated_after, updated_before.
+                sort (str): Ключ сортировки из SORT_KEYS.
+                descending (bool): Сортировка по убыванию.
+                limit (int): Размер страницы.
+                after (list | None): Значения ключа сортировки последней строки предыдущей страницы.
+
+            Returns:
+                tuple[list[dict], list | None]: Строки страницы и ключ для следующей страницы
+                (None, если страница последняя).
+        """
+        key_names = SORT_KEYS[sort]
+        key_cols = [getattr(FileRecord, name) for name in key_names]
+        stmt = FileRepository._list_select(fields, filters, sort)
+
+        if after is not None:
+            key = tuple_(*key_cols)
+            stmt = stmt.where(key < tuple_(*after) if descending else key > tuple_(*after))
+
+        stmt = stmt.order_by(*(col.desc() if descending else col.asc() for col in key_cols)).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]._mapping
+            next_key = [last[name] for name in key_names]
+
+        items = [format_row(row._mapping, fields) for row in rows]
+        return items, next_key
+
+    @staticmethod
+    def iter_rows(fields: tuple[str, ...], filters: dict, sort: str = "path", descending: bool = False,
+                  batch_size: int = 1000) -> Iterator[dict]:
+        """
+            Перебирает все строки списка файлов в порядке сортировки, без пагинации.
+            Результат читается порциями по batch_size (серверный курсор там, где СУБД его поддерживает).
+
+            Returns:
+                Iterator[dict]: Строки с запрошенными полями (даты в ISO 8601).
+        """
+        key_cols = [getattr(FileRecord, name) for name in SORT_KEYS[sort]]
+        stmt = FileRepository._list_select(fields, filters, sort) \
+            .order_by(*(col.desc() if descending else col.asc() for col in key_cols)) \
+            .execution_options(yield_per=batch_size)
+        for row in db.session.execute(stmt):
+            yield format_row(row._mapping, fields)
+
+    @staticmethod
+    def _list_select(fields: tuple[str, ...], filters: dict, sort: str):
+        # Запрошенные колонки плюс колонки ключа сортировки и условия фильтров
+        select_names = list(dict.fromkeys((*fields, *SORT_KEYS[sort])))
+        stmt = select(*(getattr(FileRecord, name) for name in select_names))
+        for condition in FileRepository._list_conditions(filters):
+            stmt = stmt.where(condition)
+        return stmt
+
+    @staticmethod
+    def _list_conditions(filters: dict) -> list:
+        """
+            Строит условия WHERE для фильтров списка файлов.
+
+            Returns:
+                list: Список SQL-выражений.
+        """
+        conditions = []
+        path = filters.get("path")
+        if path is not None:
+            if filters.get("recursive", True) and path:
+                conditions.append(FileRepository._in_directory(FileRecord, path))
+            elif path or not filters.get("recursive", True):
+                conditions.append(FileRecord.path == path)
+        if filters.get("extensions"):
+            conditions.append(FileRecord.extension.in_(filters["extensions"]))
+        if filters.get("min_size") is not None:
+            conditions.append(FileRecord.size >= filters["min_size"])
+        if filters.get("max_size") is not None:
+            conditions.append(FileRecord.size <= filters["max_size"])
+        if filters.get("created_after") is not None:
+            conditions.append(FileRecord.created_at >= filters["created_after"])
+        if filters.get("created_before") is not None:
+            conditions.append(FileRecord.created_at < filters["created_before"])
+        if filters.get("updated_after") is not None:
+            conditions.append(FileRecord.updated_at >= filters["updated_after"])
+        if filters.get("updated_before") is not None:
+            conditions.append(FileRecord.updated_at < filters["updated_before"])
+        return conditions
+
     @staticmethod
     def create(name: str, extension: str, size: int, path: str, created_at: datetime,
-               comment: str = None) -> FileRecord:
+               comment: str = None, mtime: float = None, sha256: str = None,
+               storage_key: str = None, encoding: str = None, stored_size: int = None) -> FileRecord:
         """
             Создаёт новую запись о файле в базе данных.
 
             Returns:
                 FileRecord: Созданный объект.
         """
-        file = FileRecord(name=name, extension=extension, size=size, path=path, created_at=created_at, comment=comment)
+        ChangeRepository.lock()
+        # Хэш посчитан по тем же байтам, что записаны на диск, — содержимое считается проверенным
+        file = FileRecord(name=name, extension=extension, size=size, path=path, created_at=created_at,
+                          comment=comment, mtime=mtime, sha256=sha256, storage_key=storage_key,
+                          encoding=encoding, stored_size=stored_size,
+                          verified_at=datetime.now(UTC) if sha256 else None, integrity="ok" if sha256 else None)
         db.session.add(file)
+        db.session.flush()
+        ChangeRepository.record([file.id])
+        DirectoryRepository.apply({path: [1, size]})
         db.session.commit()
         return file
 
     @staticmethod
-    def delete(file: FileRecord):
+    def delete(file: FileRecord, commit: bool = True):
         """
             Удаляет запись из базы.
 
             Args:
                 file (FileRecord): Объект для удаления.
+                commit (bool): Зафиксировать транзакцию сразу (False — в составе пакета).
         """
+        ChangeRepository.record([file.id], deleted=True)
+        DirectoryRepository.apply({file.path: [-1, -file.size]})
         db.session.delete(file)
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
     @staticmethod
-    def update(file: FileRecord, **fields):
+    def update(file: FileRecord, commit: bool = True, **fields):
         """
             Обновляет поля записи о файле.
 
             Args:
                 file (FileRecord): Запись в БД.
+                commit (bool): Зафиксировать транзакцию сразу (False — в составе пакета).
                 **fields: Произвольные поля (name, path, comment и т.д.).
 
             Returns:
                 FileRecord: Обновлённая запись.
         """
+        old_path, old_size = file.path, file.size
         for attr, value in fields.items():
             setattr(file, attr, value)
         file.updated_at = datetime.now()
-        db.session.commit()
+        ChangeRepository.record([file.id])
+        if (file.path, file.size) != (old_path, old_size):
+            deltas = {}
+            DirectoryRepository.add_delta(deltas, old_path, -1, -old_size)
+            DirectoryRepository.add_delta(deltas, file.path, 1, file.size)
+            DirectoryRepository.apply(deltas)
+        if commit:
+            db.session.commit()
         return file
+
+    @staticmethod
+    def _in_directory(model, path: str):
+        # Каталог и всё его поддерево; LIKE-шаблон экранируется (autoescape)
+        return or_(model.path == path, model.path.startswith(path + PATH_SEP, autoescape=True))
+
+    @staticmethod
+    def count_in_directory(path: str) -> int:
+        """
+            Считает записи в каталоге и всех вложенных.
+        """
+        stmt = select(func.count()).select_from(FileRecord).where(FileRepository._in_directory(FileRecord, path))
+        return db.session.execute(stmt).scalar_one()
+
+    @staticmethod
+    def count_directory_move_conflicts(old_path: str, new_path: str) -> int:
+        """
+            Считает записи поддерева old_path, которые после переноса в new_path совпали бы
+            по (name, extension, path) с уже существующими записями (uix_file_identity).
+        """
+        moved = aliased(FileRecord)
+        existing = aliased(FileRecord)
+        target_path = literal(new_path) + func.substr(moved.path, len(old_path) + 1)
+        stmt = select(func.count()).select_from(moved).join(existing, and_(
+            existing.name == moved.name,
+            existing.extension == moved.extension,
+            existing.path == target_path,
+        )).where(FileRepository._in_directory(moved, old_path))
+        return db.session.execute(stmt).scalar_one()
+
+    @staticmethod
+    def move_directory(old_path: str, new_path: str, updated_at: datetime) -> int:
+        """
+            Переписывает префикс path у всех записей поддерева одним UPDATE, без фиксации транзакции.
+            Агрегаты каталогов переносятся по GROUP BY path поддерева — O(подкаталогов), а не O(файлов).
+
+            Returns:
+                int: Количество изменённых записей.
+        """
+        deltas = {}
+        grouped = select(FileRecord.path, func.count(), func.coalesce(func.sum(FileRecord.size), 0)) \
+            .where(FileRepository._in_directory(FileRecord, old_path)).group_by(FileRecord.path)
+        for path, count, size in db.session.execute(grouped):
+            DirectoryRepository.add_delta(deltas, path, -count, -size)
+            DirectoryRepository.add_delta(deltas, new_path + path[len(old_path):], count, size)
+        ChangeRepository.record_where(FileRepository._in_directory(FileRecord, old_path))
+        stmt = update(FileRecord) \
+            .where(FileRepository._in_directory(FileRecord, old_path)) \
+            .values(path=literal(new_path) + func.substr(FileRecord.path, len(old_path) + 1), updated_at=updated_at) \
+            .execution_options(synchronize_session=False)
+        moved = db.session.execute(stmt).rowcount
+        DirectoryRepository.apply(deltas)
+        return moved
+
+    @staticmethod
+    def get_sync_index(prefix: str | None = None) -> dict[tuple[str, str, str], tuple[int, int, float | None]]:
+        """
+            Возвращает лёгкую проекцию таблицы для синхронизации, без создания ORM-объектов.
+            Записи со storage_key (содержимое хранится не по логическому пути) не синхронизируются.
+
+            Args:
+                prefix (str | None): Ограничить проекцию поддеревом (сам каталог и вложенные).
+
+            Returns:
+                dict: (name, extension, path) -> (id, size, mtime).
+        """
+        stmt = select(FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path,
+                      FileRecord.size, FileRecord.mtime).where(FileRecord.storage_key.is_(None))
+        if prefix:
+            stmt = stmt.where(*FileRepository._list_conditions({"path": prefix}))
+        return {
+            (name, extension, path): (file_id, size, mtime)
+            for file_id, name, extension, path, size, mtime in db.session.execute(stmt)
+        }
+
+    @staticmethod
+    def get_sync_entries(keys: list[tuple[str, str, str]], chunk_size: int = 300) \
+            -> dict[tuple[str, str, str], tuple[int, int, float | None]]:
+        """
+            Возвращает проекцию для синхронизации только по указанным ключам (name, extension, path).
+
+            Returns:
+                dict: (name, extension, path) -> (id, size, mtime) для найденных записей.
+        """
+        result = {}
+        identity = tuple_(FileRecord.name, FileRecord.extension, FileRecord.path)
+        for start in range(0, len(keys), chunk_size):
+            stmt = select(FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path,
+                          FileRecord.size, FileRecord.mtime) \
+                .where(FileRecord.storage_key.is_(None), identity.in_(keys[start:start + chunk_size]))
+            for file_id, name, extension, path, size, mtime in db.session.execute(stmt):
+                result[(name, extension, path)] = (file_id, size, mtime)
+        return result
+
+    @staticmethod
+    def get_archive_entries(ids: list[int] | None = None, path: str | None = None, chunk_size: int = 500) -> list:
+        """
+            Возвращает лёгкую проекцию файлов для архива: по списку ID и/или поддереву пути,
+            упорядоченную по пути и имени.
+
+            Returns:
+                list[Row]: Строки с полями id, name, extension, path, storage_key, size, encoding.
+        """
+        columns = (FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path, FileRecord.storage_key,
+                   FileRecord.size, FileRecord.encoding)
+        rows = {}
+        if path is not None:
+            stmt = select(*columns).where(*FileRepository._list_conditions({"path": path, "recursive": True}))
+            rows.update((row.id, row) for row in db.session.execute(stmt))
+        for start in range(0, len(ids or ()), chunk_size):
+            stmt = select(*columns).where(FileRecord.id.in_(ids[start:start + chunk_size]))
+            rows.update((row.id, row) for row in db.session.execute(stmt))
+        return sorted(rows.values(), key=lambda row: (row.path, row.name, row.extension, row.id))
+
+    @staticmethod
+    def count_storage_key_refs(storage_key: str) -> int:
+        """
+            Считает записи, ссылающиеся на одно и то же содержимое (счётчик ссылок блоба).
+        """
+        stmt = select(func.count()).select_from(FileRecord).where(FileRecord.storage_key == storage_key)
+        return db.session.execute(stmt).scalar_one()
+
+    @staticmethod
+    def bulk_insert(rows: list[dict]):
+        """
+            Пакетно вставляет записи одним executemany, пропуская конфликты по uix_file_identity.
+            Не фиксирует транзакцию.
+
+            Args:
+                rows (list[dict]): Словари с колонками name, extension, size, path, created_at, mtime.
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(table).on_conflict_do_nothing(constraint="uix_file_identity")
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(table).on_conflict_do_nothing(index_elements=["name", "extension", "path"])
+        else:
+            stmt = insert(table)
+        # RETURNING отдаёт только реально вставленные строки (без пропущенных конфликтов)
+        ChangeRepository.lock()
+        deltas = {}
+        inserted = []
+        for file_id, path, size in db.session.execute(stmt.returning(table.c.id, table.c.path, table.c.size), rows):
+            inserted.append(file_id)
+            DirectoryRepository.add_delta(deltas, path, 1, size)
+        ChangeRepository.record(inserted)
+        DirectoryRepository.apply(deltas)
+
+    @staticmethod
+    def bulk_update_stats(rows: list[dict]):
+        """
+            Пакетно обновляет размер и mtime записей по id. Сохранённый хэш содержимого
+            и результат проверки целостности сбрасываются, так как файл изменился.
+            Не фиксирует транзакцию.
+
+            Args:
+                rows (list[dict]): Словари с ключами b_id, b_size, b_mtime, b_updated_at.
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(size=bindparam("b_size"), mtime=bindparam("b_mtime"), updated_at=bindparam("b_updated_at"),
+                    sha256=None, verified_at=None, integrity=None)
+        )
+        deltas = {}
+        new_sizes = {row["b_id"]: row["b_size"] for row in rows}
+        ids = list(new_sizes)
+        for start in range(0, len(ids), 500):
+            old_stmt = select(table.c.id, table.c.path, table.c.size).where(table.c.id.in_(ids[start:start + 500]))
+            for file_id, path, size in db.session.execute(old_stmt):
+                DirectoryRepository.add_delta(deltas, path, 0, new_sizes[file_id] - size)
+        db.session.execute(stmt, rows)
+        ChangeRepository.record(ids)
+        DirectoryRepository.apply(deltas)
+
+    @staticmethod
+    def bulk_update_mtime(rows: list[dict]):
+        """
+            Пакетно обновляет mtime записей по id, когда содержимое файла на диске не изменилось
+            (например, путь заменён жёсткой ссылкой на побайтно совпадающую копию): размер,
+            хэш содержимого и результат проверки целостности сохраняются. Не фиксирует транзакцию.
+
+            Args:
+                rows (list[dict]): Словари с ключами b_id, b_mtime, b_updated_at.
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(mtime=bindparam("b_mtime"), updated_at=bindparam("b_updated_at"))
+        )
+        db.session.execute(stmt, rows)
+        ChangeRepository.record([row["b_id"] for row in rows])
+
+    @staticmethod
+    def bulk_delete(ids: list[int], chunk_size: int = 500):
+        """
+            Удаляет записи по списку id пачками (ограничение числа параметров в SQLite).
+            Не фиксирует транзакцию.
+        """
+        table = FileRecord.__table__
+        ChangeRepository.record(ids, deleted=True)
+        deltas = {}
+        for start in range(0, len(ids), chunk_size):
+            condition = table.c.id.in_(ids[start:start + chunk_size])
+            for path, size in db.session.execute(select(table.c.path, table.c.size).where(condition)):
+                DirectoryRepository.add_delta(deltas, path, -1, -size)
+            db.session.execute(delete(table).where(condition))
+        DirectoryRepository.apply(deltas)
+
+    @staticmethod
+    def get_hash_batch(after_id: int, limit: int, hashed: bool) -> list:
+        """
+            Возвращает следующую по id пачку записей для хэширования: без sha256 (hashed=False,
+            дозаполнение) или с ним (hashed=True, проверка целостности).
+
+            Returns:
+                list[Row]: Строки с полями id, name, extension, path, storage_key, size, mtime, sha256, integrity,
+                    encoding, stored_size.
+        """
+        condition = FileRecord.sha256.isnot(None) if hashed else FileRecord.sha256.is_(None)
+        stmt = select(FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path, FileRecord.storage_key,
+                      FileRecord.size, FileRecord.mtime, FileRecord.sha256, FileRecord.integrity,
+                      FileRecord.encoding, FileRecord.stored_size) \
+            .where(condition, FileRecord.id > after_id).order_by(FileRecord.id).limit(limit)
+        return db.session.execute(stmt).all()
+
+    @staticmethod
+    def count_hashed(hashed: bool) -> int:
+        """
+            Считает записи с sha256 (hashed=True) или без него.
+        """
+        condition = FileRecord.sha256.isnot(None) if hashed else FileRecord.sha256.is_(None)
+        return db.session.execute(select(func.count()).select_from(FileRecord).where(condition)).scalar_one()
+
+    @staticmethod
+    def get_same_size_candidates(min_size: int = 1) -> list:
+        """
+            Возвращает записи, размер которых совпадает хотя бы с одной другой записью
+            (кандидаты в дубликаты), упорядоченные по размеру и id. Сжатые файлы не участвуют:
+            их байты на диске не совпадают с содержимым.
+
+            Returns:
+                list[Row]: Строки с полями id, name, extension, path, storage_key, size.
+        """
+        uncompressed = FileRecord.encoding.is_(None)
+        sizes = select(FileRecord.size).where(FileRecord.size >= min_size, uncompressed) \
+            .group_by(FileRecord.size).having(func.count() > 1)
+        stmt = select(FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path,
+                      FileRecord.storage_key, FileRecord.size) \
+            .where(FileRecord.size.in_(sizes), uncompressed).order_by(FileRecord.size, FileRecord.id)
+        return db.session.execute(stmt).all()
+
+    @staticmethod
+    def bulk_set_hashes(rows: list[dict]):
+        """
+            Пакетно сохраняет посчитанные хэши. Запись обновляется, только если хэша у неё
+            всё ещё нет и размер не изменился с момента выборки; в журнал изменений попадают
+            только обновлённые записи. Не фиксирует транзакцию.
+
+            Args:
+                rows (list[dict]): Словари с ключами b_id, b_size, b_sha256, b_verified_at.
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        stmt = update(table) \
+            .where(table.c.id == bindparam("b_id"), table.c.sha256.is_(None), table.c.size == bindparam("b_size")) \
+            .values(sha256=bindparam("b_sha256"), verified_at=bindparam("b_verified_at"), integrity="ok")
+        ChangeRepository.lock(mark_changed=False)
+        # UPDATE ... RETURNING не поддерживается в executemany, поэтому rowcount проверяется построчно:
+        # запись, изменённая параллельной загрузкой или синхронизацией, пропускается условием
+        updated = [row["b_id"] for row in rows if db.session.execute(stmt, row).rowcount]
+        ChangeRepository.record(updated)
+
+    @staticmethod
+    def bulk_set_integrity(rows: list[dict], changed_ids: list[int]):
+        """
+            Пакетно сохраняет результаты проверки целостности. Запись обновляется, только если
+            её sha256 не изменился с момента выборки. Не фиксирует транзакцию.
+
+            Args:
+                rows (list[dict]): Словари с ключами b_id, b_sha256, b_integrity, b_verified_at.
+                changed_ids (list[int]): Записи, у которых изменился результат проверки
+                    (только они попадают в журнал изменений).
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        stmt = update(table) \
+            .where(table.c.id == bindparam("b_id"), table.c.sha256 == bindparam("b_sha256")) \
+            .values(integrity=bindparam("b_integrity"), verified_at=bindparam("b_verified_at"))
+        ChangeRepository.record(changed_ids)
+        db.session.execute(stmt, rows)
+
+    @staticmethod
+    def integrity_summary() -> dict[str | None, int]:
+        """
+            Считает записи по результату проверки целостности (None — не проверялись).
+        """
+        stmt = select(FileRecord.integrity, func.count()).group_by(FileRecord.integrity)
+        return {integrity: count for integrity, count in db.session.execute(stmt)}
+
+    @staticmethod
+    def list_integrity_problems(limit: int) -> list[dict]:
+        """
+            Возвращает записи, не прошедшие проверку целостности (mismatch, missing).
+        """
+        fields = (*FileRecord.PUBLIC_FIELDS, "verified_at")
+        stmt = select(*(getattr(FileRecord, name) for name in fields)) \
+            .where(FileRecord.integrity.in_(("mismatch", "missing"))) \
+            .order_by(FileRecord.path, FileRecord.name, FileRecord.id).limit(limit)
+        return [format_row(row._mapping, fields) for row in db.session.execute(stmt)]
+
+    @staticmethod
+    def _storage_condition(key_prefix: str | None):
+        if key_prefix is None:
+            return FileRecord.storage_key.is_(None)
+        # Сжатое содержимое нельзя положить по логическому пути — оно остаётся под своим ключом
+        return and_(FileRecord.storage_key.startswith(key_prefix, autoescape=True), FileRecord.encoding.is_(None))
+
+    @staticmethod
+    def get_storage_batch(after_id: int, limit: int, key_prefix: str | None) -> list:
+        """
+            Возвращает следующую по id пачку записей, чьё содержимое лежит по логическому пути
+            (key_prefix=None) или под storage_key с префиксом key_prefix. На PostgreSQL строки
+            блокируются до конца транзакции.
+
+            Returns:
+                list[Row]: Строки с полями id, name, extension, path, storage_key.
+        """
+        stmt = select(FileRecord.id, FileRecord.name, FileRecord.extension, FileRecord.path, FileRecord.storage_key) \
+            .where(FileRepository._storage_condition(key_prefix), FileRecord.id > after_id) \
+            .order_by(FileRecord.id).limit(limit)
+        if db.session.get_bind().dialect.name == "postgresql":
+            stmt = stmt.with_for_update()
+        return db.session.execute(stmt).all()
+
+    @staticmethod
+    def count_storage(key_prefix: str | None) -> int:
+        """
+            Считает записи, чьё содержимое лежит по логическому пути (key_prefix=None)
+            или под storage_key с префиксом key_prefix.
+        """
+        stmt = select(func.count()).select_from(FileRecord).where(FileRepository._storage_condition(key_prefix))
+        return db.session.execute(stmt).scalar_one()
+
+    @staticmethod
+    def bulk_set_storage_keys(rows: list[dict]):
+        """
+            Пакетно переносит записи на новый storage_key. Запись обновляется, только если её
+            storage_key не изменился с момента выборки. Не фиксирует транзакцию; пользовательские
+            поля не меняются, поэтому в журнал изменений ничего не пишется.
+
+            Args:
+                rows (list[dict]): Словари с ключами b_id, b_old_key, b_new_key.
+        """
+        if not rows:
+            return
+        table = FileRecord.__table__
+        stmt = update(table) \
+            .where(table.c.id == bindparam("b_id"), table.c.storage_key.is_not_distinct_from(bindparam("b_old_key"))) \
+            .values(storage_key=bindparam("b_new_key"))
+        db.session.execute(stmt, rows)
+
+    @staticmethod
+    def commit():
+        """
+            Фиксирует текущую транзакцию.
+        """
+        db.session.commit()
+
+    @staticmethod
+    def rollback():
+        """
+            Откатывает текущую транзакцию.
+        """
+        db.session.rollback()
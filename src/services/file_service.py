@@ -1,18 +1,46 @@
+import logging
+import os
+from collections.abc import Iterator
 from datetime import datetime, UTC
 from pathlib import Path
-from src.services.storage_manager import StorageManager
-from src.services.file_repository import FileRepository
+from src.services.storage_manager import StorageManager, StagedWriter
+from src.services.compression import create_compression_policy
+from src.services.file_repository import FileRepository, SORT_KEYS
+from src.services.blob_repository import BlobRepository
+from src.services.change_repository import ChangeRepository
+from src.services.directory_repository import DirectoryRepository
+from src.services.pagination import encode_cursor, decode_cursor
+from src.services.search_index import SearchIndex
+from src.services.response_cache import ResponseCache
+from src.services.sync_engine import StorageSyncEngine
+from src.services.scanner import create_scanner
+from src.services.job_manager import job_manager, Job
+from src.services.metrics import metrics
+from src.services.path_service import PATH_SEP
+from src.config import Config
 from src.models import FileRecord
 
+logger = logging.getLogger(__name__)
+
 
 class FileService:
     """
         Сервисный слой, объединяющий файловую систему и базу данных.
         Отвечает за обработку файлов: загрузку, перемещение, удаление и синхронизацию.
     """
-    def __init__(self, storage_dir: str):
-        self.storage = StorageManager(storage_dir)  # Файловая система
+    # Раскладки, между которыми переводит start_layout_job
+    LAYOUTS = ("plain", "sharded")
+
+    def __init__(self, storage_dir: str, cache: ResponseCache | None = None):
+        compression = create_compression_policy(Config.COMPRESSION, Config.COMPRESSION_EXTENSIONS,
+                                                Config.COMPRESSION_MIN_RATIO, Config.COMPRESSION_MIN_SIZE,
+                                                Config.COMPRESSION_LEVEL)
+        self.storage = StorageManager(storage_dir, mode=Config.STORAGE_MODE, compression=compression)  # Файловая система
         self.repo = FileRepository()  # Общается с базой
+        self.blobs = BlobRepository()  # Счётчики ссылок блобов (режим cas)
+        self.dirs = DirectoryRepository()  # Дерево каталогов с агрегатами
+        self.changes = ChangeRepository()  # Журнал изменений для инкрементального обновления
+        self.cache = cache or ResponseCache(None)  # Кэш ответов чтения
 
     def upload_file(self, file_storage, name_input: str, path: str, comment: str = "") -> FileRecord:
         """
@@ -24,21 +52,131 @@ class FileService:
             Raises:
                 ValueError: Если файл с таким именем уже существует в указанной директории.
         """
-        meta = self.storage.save_uploaded_file(file_storage, name_input, path)
+        return self.upload_stream(file_storage.stream, file_storage.filename, name_input, path, comment)
+
+    def upload_stream(self, stream, original_filename: str, name_input: str, path: str,
+                      comment: str = "", expected_size: int | None = None) -> FileRecord:
+        """
+            Загружает файл из бинарного потока за один проход: запись, SHA-256 и подсчёт размера
+            выполняются одновременно, файл появляется в хранилище атомарным переименованием.
+
+            Args:
+                expected_size (int | None): Заявленный размер (Content-Length); поток другой длины
+                    (например, оборванный клиентом) не публикуется.
+
+            Returns:
+                FileRecord: Сохранённый файл.
+            Raises:
+                ValueError: Если файл с таким именем уже существует в указанной директории
+                    или размер потока не совпал с expected_size.
+        """
+        meta = self._upload_meta(original_filename, name_input, path)
+        staged = self.storage.stage_stream(stream, meta, chunk_size=Config.UPLOAD_CHUNK_SIZE,
+                                           fsync=Config.UPLOAD_FSYNC)
+        return self._store_upload(staged, comment, expected_size)
+
+    def open_upload(self, original_filename: str, name_input: str, path: str) -> StagedWriter:
+        """
+            Проверяет имя и путь будущего файла и открывает загрузку, тело которой передаётся
+            блоками по мере приёма (асинхронный сервер, см. views.open_upload_sink), а не потоком,
+            как в upload_stream. Файл публикует store_upload.
+
+            Raises:
+                ValueError: Если файл с таким именем уже существует в указанной директории.
+        """
+        meta = self._upload_meta(original_filename, name_input, path)
+        return self.storage.open_stage(meta, fsync=Config.UPLOAD_FSYNC)
+
+    def store_upload(self, upload: StagedWriter, comment: str = "", expected_size: int | None = None) -> FileRecord:
+        """
+            Публикует загрузку, открытую open_upload и принятую целиком.
+
+            Returns:
+                FileRecord: Сохранённый файл.
+            Raises:
+                ValueError: Если размер не совпал с expected_size или файл с таким именем уже появился.
+                ClientDisconnected: Если клиент отключился посреди тела (временный файл уже удалён).
+        """
+        if upload.error is not None:
+            metrics.count_bytes("in", upload.size)
+        return self._store_upload(upload.result(), comment, expected_size)
+
+    def _upload_meta(self, original_filename: str, name_input: str, path: str) -> dict:
+        meta = self.storage.prepare_upload(original_filename, name_input, path)
+        if not meta["name"]:
+            raise ValueError("Некорректное имя файла.")
         if self.repo.exists(meta["name"], meta["extension"], meta["path"]):
             raise ValueError("Файл с таким именем уже существует по данному пути.")
-        return self.repo.create(**meta, created_at=datetime.now(UTC), comment=comment)
+        return meta
+
+    def _store_upload(self, staged: dict, comment: str, expected_size: int | None) -> FileRecord:
+        metrics.count_bytes("in", staged["size"])
+        if expected_size is not None and staged["size"] != expected_size:
+            self.storage.discard(staged)
+            raise ValueError(f"Получено {staged['size']} байт из {expected_size}, заявленных в Content-Length.")
+        return self.store_staged(staged, comment)
+
+    def store_staged(self, staged: dict, comment: str = "") -> FileRecord:
+        """
+            Публикует подготовленный файл (StorageManager.stage_*) и создаёт запись о нём.
+
+            В режиме cas счётчик ссылок блоба увеличивается в той же транзакции, что и создание
+            записи; блокировка строки блоба не даёт параллельному удалению стереть его.
+
+            Returns:
+                FileRecord: Созданная запись.
+        """
+        try:
+            if self.storage.is_blob_key(staged["storage_key"]):
+                self.blobs.acquire(staged["storage_key"], staged["size"])
+            saved = self.storage.place(staged)
+        except BaseException:
+            self.repo.rollback()
+            self.storage.discard(staged)
+            raise
+
+        try:
+            return self.repo.create(**saved, created_at=datetime.now(UTC), comment=comment)
+        except Exception:
+            # Запись не создана (например, гонка за uix_file_identity) — убираем содержимое
+            self.repo.rollback()
+            if not saved["storage_key"]:
+                self.storage.remove_path(saved["path"], saved["name"] + saved["extension"])
+            elif self.storage.is_blob_key(saved["storage_key"]):
+                self.remove_unreferenced_blobs([saved["storage_key"]])
+            else:
+                self.storage.remove_blob(saved["storage_key"])
+            raise
 
-    def move_file(self, file_id: int, new_name: str, new_path: str, new_comment: str = None):
+    def move_file(self, file_id: int, new_name: str | None, new_path: str | None, new_comment: str = None):
         """
             Перемещает и переименовывает файл, обновляя запись в базе.
+            Не указанные имя или путь остаются прежними. Если запись обновить не удалось,
+            файл возвращается на прежнее место.
 
             Returns:
                 FileRecord: Обновлённая запись.
+            Raises:
+                ValueError: Если имя некорректно или файл с таким именем уже существует по новому пути.
         """
         file = self.repo.get_by_id(file_id)
-        new_rel_path = self.storage.move_file(file, new_name, new_path)
-        return self.repo.update(file, name=new_name, path=new_rel_path, comment=new_comment or file.comment)
+        old_name, old_path, extension = file.name, file.path, file.extension
+        name, path = self.storage.resolve_move(
+            file.name if new_name is None else new_name,
+            file.path if new_path is None else new_path,
+        )
+        if (name, path) != (old_name, old_path) and self.repo.exists(name, extension, path):
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+
+        moved_on_disk = not file.storage_key
+        self.storage.move_file(file, name, path)
+        try:
+            return self.repo.update(file, name=name, path=path, comment=new_comment or file.comment)
+        except Exception:
+            self.repo.rollback()
+            if moved_on_disk:
+                self.storage.rename_file(path, name + extension, old_path, old_name + extension)
+            raise
 
     def delete_file(self, file_id: int):
         """
@@ -48,50 +186,297 @@ class FileService:
                 file_id (int): Идентификатор файла.
         """
         file = self.repo.get_by_id(file_id)
-        self.storage.delete_file(file)
-        self.repo.delete(file)
+        if self.storage.is_blob_key(file.storage_key):
+            # Сначала фиксируются удаление записи и уменьшение счётчика; содержимое стирается
+            # только если на блоб после этого никто не ссылается
+            key = file.storage_key
+            try:
+                self.blobs.release(key)
+                self.repo.delete(file)
+            except Exception:
+                self.repo.rollback()
+                raise
+            self.remove_unreferenced_blobs([key])
+            return
+
+        # Файл убирается обратимо и стирается только после фиксации удаления записи
+        file_path = self.storage.physical_path(file)
+        stash = self.storage.stash_file(file_path)
+        try:
+            self.repo.delete(file)
+        except Exception:
+            self.repo.rollback()
+            self.storage.restore_stash(stash, file_path)
+            raise
+        self.storage.drop_stash(stash)
+
+    def remove_unreferenced_blobs(self, keys: list[str]):
+        """
+            Удаляет с диска блобы, на которые после зафиксированных удалений не осталось ссылок.
+            Каждый блоб проверяется под блокировкой строки его счётчика, поэтому параллельная
+            загрузка того же содержимого не теряет байты.
+        """
+        for key in keys:
+            try:
+                if self.blobs.lock_unreferenced(key):
+                    self.storage.remove_blob(key)
+                self.repo.commit()
+            except Exception:
+                # Удаление записей уже зафиксировано; блоб без ссылок лишь занимает место
+                self.repo.rollback()
+                logger.warning("Не удалось удалить блоб %s", key, exc_info=True)
+
+    def move_directory(self, old_path: str, new_path: str) -> dict:
+        """
+            Перемещает или переименовывает каталог целиком: один os.rename на диске
+            и один UPDATE префикса path у всех записей поддерева.
+
+            Порядок шагов переживает сбой процесса: намерение записывается в журнал хранилища,
+            UPDATE выполняется до переименования, а фиксируется после него. Если процесс упал
+            между переименованием и фиксацией, recover_interrupted_operations доводит перенос в БД.
+
+            Returns:
+                dict: {"path": str, "moved": int} — новый путь и количество перенесённых записей.
+            Raises:
+                ValueError: Если пути некорректны, каталог не найден, назначение занято
+                    или перенос нарушил бы уникальность (name, extension, path).
+                JobConflictError: Если в это время выполняется синхронизация хранилища.
+        """
+        old_path = self.storage.resolve_directory(old_path)
+        new_path = self.storage.resolve_directory(new_path)
+        if not old_path or not new_path:
+            raise ValueError("Корневой каталог хранилища нельзя перемещать.")
+        if new_path == old_path:
+            return {"path": new_path, "moved": 0}
+        if new_path.startswith(old_path + PATH_SEP):
+            raise ValueError("Нельзя переместить каталог внутрь самого себя.")
+
+        with job_manager.exclusive(self.storage.sync_lock_key):
+            on_disk = self.storage.is_directory(old_path)
+            if not on_disk and not self.repo.count_in_directory(old_path):
+                raise ValueError("Каталог не найден.")
+            if self.storage.is_directory(new_path):
+                raise ValueError("Каталог назначения уже существует.")
+            conflicts = self.repo.count_directory_move_conflicts(old_path, new_path)
+            if conflicts:
+                raise ValueError(f"В каталоге назначения уже есть файлы с такими именами: {conflicts}.")
+
+            journal = self.storage.write_journal({"op": "move_directory", "old": old_path, "new": new_path})
+            renamed = False
+            try:
+                moved = self.repo.move_directory(old_path, new_path, datetime.now(UTC))
+                if on_disk:
+                    self.storage.move_directory(old_path, new_path)
+                    renamed = True
+                self.repo.commit()
+            except BaseException:
+                self.repo.rollback()
+                if renamed:
+                    self.storage.move_directory(new_path, old_path)
+                self.storage.remove_journal(journal)
+                raise
+            self.storage.remove_journal(journal)
+        return {"path": new_path, "moved": moved}
+
+    def recover_interrupted_operations(self) -> int:
+        """
+            Приводит диск и БД в согласие после операций, прерванных сбоем процесса.
+
+            Перенос каталога: если каталог уже переименован на диске, а старого пути нет, префикс в БД
+            переписывается (повторно — безопасно); иначе переименования не было
+            и незафиксированный UPDATE уже откачен базой, запись журнала просто удаляется.
+            Смена раскладки: файлы пачки, перенос которой не успел зафиксироваться в БД,
+            возвращаются на прежнее место.
+
+            Операции, которые в это время выполняются в других процессах (их записи журнала
+            заблокированы), не затрагиваются, поэтому вызов безопасен при запуске каждого воркера.
+
+            Returns:
+                int: Количество обработанных операций.
+        """
+        recovered = 0
+        journals = self.storage.read_journals()
+        try:
+            for journal, entry in journals:
+                if entry.get("op") == "move_directory":
+                    old_path, new_path = entry["old"], entry["new"]
+                    if self.storage.is_directory(new_path) and not self.storage.is_directory(old_path):
+                        self.repo.move_directory(old_path, new_path, datetime.now(UTC))
+                        self.repo.commit()
+                        recovered += 1
+                elif entry.get("op") == "storage_layout":
+                    records = self.repo.get_by_ids([move[0] for move in entry["moves"]])
+                    for file_id, new_key, source, target in entry["moves"]:
+                        file = records.get(file_id)
+                        if file is None or file.storage_key == new_key:
+                            continue
+                        try:
+                            self.storage.relocate(target, source)
+                        except (ValueError, FileNotFoundError):
+                            pass
+                    recovered += 1
+                self.storage.remove_journal(journal)
+        finally:
+            # Необработанные из-за ошибки записи остаются для следующего запуска
+            for journal, _ in journals:
+                self.storage.release_journal(journal)
+        return recovered
 
     def sync_storage_to_db(self) -> dict:
         """
             Сравнивает хранилище с базой данных:
             - добавляет записи о новых файлах;
-            - удаляет записи об отсутствующих на диске.
+            - удаляет записи об отсутствующих на диске;
+            - обновляет размер и mtime изменившихся файлов.
+
+            Все изменения применяются пакетами в одной транзакции.
 
             Returns:
-                dict: {"added": int, "removed": int}
+                dict: {"added": int, "removed": int, "updated": int}
+            Raises:
+                JobConflictError: Если синхронизация этого хранилища уже выполняется.
         """
-        # Файлы, записи о которых есть в базе
-        db_files = self.repo.get_all()
-        # Список словарей, с инфой о файлах, которые физически находятся в файловом хранилище
-        storage_files = self.storage.scan_storage()
+        with job_manager.exclusive(self.storage.sync_lock_key):
+            return self._run_sync()
 
-        db_key_set = {
-            (f.name, f.extension, f.path) for f in db_files
-        }
-        storage_key_set = {
-            (f["name"], f["extension"], f["path"]) for f in storage_files
+    def start_sync_job(self) -> Job:
+        """
+            Запускает синхронизацию фоновой задачей.
+
+            Returns:
+                Job: Задача; прогресс доступен через job_manager.
+            Raises:
+                JobConflictError: Если синхронизация этого хранилища уже выполняется.
+        """
+        return job_manager.submit(
+            "actualize",
+            lambda job: self._run_sync(on_progress=job.report),
+            lock_key=self.storage.sync_lock_key,
+            total=self.repo.count(),
+        )
+
+    def _run_sync(self, on_progress=None) -> dict:
+        # Иначе незавершённый перенос каталога выглядел бы как удаление и добавление файлов
+        self.recover_interrupted_operations()
+        scanner = create_scanner(self.storage, Config.SCAN_WORKERS, Config.SCAN_INCLUDE, Config.SCAN_EXCLUDE,
+                                 Config.SCAN_MAX_DEPTH, batch_size=Config.SYNC_BATCH_SIZE)
+        engine = StorageSyncEngine(self.storage, self.repo, batch_size=Config.SYNC_BATCH_SIZE, scanner=scanner)
+        return engine.run(on_progress=on_progress)
+
+    def start_layout_job(self, layout: str) -> Job:
+        """
+            Запускает фоновую задачу, которая на месте переводит уже сохранённые файлы в раскладку
+            layout: sharded — файлы, лежащие по логическому пути, переезжают в объекты .objects/ab/cd/;
+            plain — объекты возвращаются на логические пути. Блобы режима cas не затрагиваются.
+            Куда сохраняются новые файлы, определяет STORAGE_MODE.
+
+            Файлы переносятся пачками: намерение пачки пишется в журнал, файлы переименовываются,
+            storage_key записей обновляются одной транзакцией. Если фиксация не удалась, файлы
+            возвращаются на место; после сбоя процесса это делает recover_interrupted_operations.
+
+            Returns:
+                Job: Задача; счётчики processed, moved, missing, conflicts.
+            Raises:
+                ValueError: Если раскладка неизвестна.
+                JobConflictError: Если в это время выполняется синхронизация хранилища.
+        """
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Неизвестная раскладка. Доступны: {', '.join(self.LAYOUTS)}")
+        source_prefix = None if layout == "sharded" else self.storage.OBJECTS_DIR + "/"
+        return job_manager.submit(
+            "storage-layout",
+            lambda job: self._run_layout(job, source_prefix),
+            lock_key=self.storage.sync_lock_key,
+            total=self.repo.count_storage(source_prefix),
+        )
+
+    def _run_layout(self, job: Job, source_prefix: str | None) -> dict:
+        self.recover_interrupted_operations()
+        counters = {"processed": 0, "moved": 0, "missing": 0, "conflicts": 0}
+        after_id = 0
+        while rows := self.repo.get_storage_batch(after_id, Config.SYNC_BATCH_SIZE, source_prefix):
+            after_id = rows[-1].id
+            moves = []
+            for row in rows:
+                logical = os.path.join(row.path, row.name + row.extension)
+                if source_prefix is None:
+                    new_key = self.storage.object_key()
+                    moves.append((row, new_key, logical, new_key))
+                else:
+                    moves.append((row, None, row.storage_key, logical))
+
+            journal = self.storage.write_journal({
+                "op": "storage_layout",
+                "moves": [[row.id, new_key, source, target] for row, new_key, source, target in moves],
+            })
+            done = []
+            try:
+                for row, new_key, source, target in moves:
+                    counters["processed"] += 1
+                    try:
+                        self.storage.relocate(source, target)
+                    except FileNotFoundError:
+                        counters["missing"] += 1
+                        continue
+                    except ValueError:
+                        counters["conflicts"] += 1
+                        continue
+                    done.append((row, new_key, source, target))
+                self.repo.bulk_set_storage_keys([
+                    {"b_id": row.id, "b_old_key": row.storage_key, "b_new_key": new_key}
+                    for row, new_key, _, _ in done
+                ])
+                self.repo.commit()
+            except BaseException:
+                self.repo.rollback()
+                for _, _, source, target in done:
+                    self.storage.relocate(target, source)
+                self.storage.remove_journal(journal)
+                raise
+            self.storage.remove_journal(journal)
+
+            # Каталоги, которые опустели после переноса, больше ничего не хранят
+            emptied = {os.path.dirname(source) for _, _, source, _ in done}
+            stop_at = self.storage.OBJECTS_DIR if source_prefix else ""
+            for directory in sorted(emptied, reverse=True):
+                self.storage.remove_empty_dirs(directory, stop_at)
+            counters["moved"] += len(done)
+            job.report(**counters)
+        return counters
+
+    def get_tree(self, path: str) -> dict | None:
+        """
+            Возвращает каталог с агрегатами и его непосредственные подкаталоги — O(детей),
+            без обхода файлов поддерева.
+
+            Returns:
+                dict | None: path, name, file_count, total_size, direct_file_count, direct_size,
+                    directories; None, если в каталоге нет файлов.
+        """
+        node = self.dirs.get(path)
+        if node is None and path:
+            return None
+        children = self.dirs.get_children(path)
+        file_count = node.file_count if node else 0
+        total_size = node.total_size if node else 0
+        return {
+            "path": path,
+            "name": self.dirs.split(path)[1],
+            "file_count": file_count,
+            "total_size": total_size,
+            "direct_file_count": file_count - sum(child.file_count for child in children),
+            "direct_size": total_size - sum(child.total_size for child in children),
+            "directories": [child.to_dict() for child in children],
         }
 
-        added = 0
-        removed = 0
-        for f in storage_files:
-            key = (f['name'], f['extension'], f['path'])
-            if key not in db_key_set:
-                self.repo.create(
-                    name=f['name'],
-                    extension=f['extension'],
-                    size=f['size'],
-                    path=f['path'],
-                    created_at=f['created_at']
-                )
-                added += 1
-        for f in db_files:
-            key = (f.name, f.extension, f.path)
-            if key not in storage_key_set:
-                self.repo.delete(f)
-                removed += 1
-
-        return {"added": added, "removed": removed}
+    def ensure_directory_tree(self):
+        """
+            Строит таблицу каталогов по записям о файлах, если она ещё не заполнена
+            (например, база создана до появления таблицы).
+        """
+        if self.dirs.is_empty() and self.repo.count():
+            self.dirs.rebuild()
+            self.repo.commit()
 
     def get_all_files(self):
         """
@@ -102,6 +487,116 @@ class FileService:
         """
         return self.repo.get_all()
 
+    def get_archive_entries(self, ids: list[int] | None = None, path: str | None = None) -> list:
+        """
+            Возвращает файлы для архива: по списку ID и/или всему поддереву пути.
+
+            Returns:
+                list[Row]: Строки с полями id, name, extension, path, storage_key, size, encoding.
+        """
+        return self.repo.get_archive_entries(ids, path)
+
+    def list_files(self, fields: tuple[str, ...], filters: dict, sort: str = "path", descending: bool = False,
+                   limit: int = 100, cursor: str | None = None) -> dict:
+        """
+        Получает страницу списка файлов с фильтрами, сортировкой и выборкой полей.
+
+        Returns:
+            dict: {"items": list[dict], "next_cursor": str | None}
+        Raises:
+            ValueError: Если курсор некорректен или выдан для другой сортировки.
+        """
+        params = (fields, filters, sort, descending, limit, cursor)
+        return self.cache.get_or_set("files", params, lambda: self._list_files(*params))
+
+    def iter_files(self, fields: tuple[str, ...], filters: dict, sort: str = "path",
+                   descending: bool = False) -> Iterator[dict]:
+        """
+        Перебирает все файлы, подходящие под фильтры, без пагинации — для потоковой выдачи.
+        Строки читаются из базы порциями по мере потребления генератора.
+
+        Returns:
+            Iterator[dict]: Строки с запрошенными полями (даты в ISO 8601).
+        """
+        return self.repo.iter_rows(fields, filters, sort, descending)
+
+    def list_files_etag(self, fields: tuple[str, ...], filters: dict, sort: str = "path", descending: bool = False,
+                        limit: int = 100, cursor: str | None = None) -> str | None:
+        """
+        Возвращает слабый ETag страницы списка (None, если кэш выключен).
+        """
+        return self.cache.etag("files", (fields, filters, sort, descending, limit, cursor))
+
+    def _list_files(self, fields: tuple[str, ...], filters: dict, sort: str, descending: bool,
+                    limit: int, cursor: str | None) -> dict:
+        after = None
+        if cursor:
+            key_names = SORT_KEYS[sort]
+            dt_positions = tuple(i for i, name in enumerate(key_names) if name == "created_at")
+            after = decode_cursor(cursor, sort, descending, dt_positions)
+            if len(after) != len(key_names):
+                raise ValueError("Некорректный курсор.")
+
+        items, next_key = self.repo.list_page(fields, filters, sort, descending, limit, after)
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(sort, descending, next_key) if next_key is not None else None,
+        }
+
+    def get_changes(self, cursor: str | None = None, limit: int = 1000) -> dict:
+        """
+        Возвращает изменения файлов после курсора: по одной записи на файл, в порядке seq.
+        Без курсора возвращает только текущий курсор — с него клиент начинает,
+        загрузив перед этим полный список.
+
+        Returns:
+            dict: {"changes": [{"seq", "id", "deleted", "file": dict | None}],
+                "cursor": str, "has_more": bool}
+        Raises:
+            ValueError: Если курсор некорректен.
+        """
+        if not cursor:
+            return {"changes": [], "cursor": encode_cursor("changes", False, [self.changes.last_seq()]),
+                    "has_more": False}
+
+        after = decode_cursor(cursor, "changes", False)
+        if len(after) != 1 or not isinstance(after[0], int):
+            raise ValueError("Некорректный курсор.")
+        rows, has_more = self.changes.since(after[0], limit)
+
+        files = self.repo.get_rows([row.file_id for row in rows if not row.deleted], FileRecord.PUBLIC_FIELDS)
+        changes = []
+        for row in rows:
+            file = files.get(row.file_id)
+            # Запись, исчезнувшая между чтением журнала и файлов, отдаётся как удалённая
+            changes.append({"seq": row.seq, "id": row.file_id, "deleted": file is None, "file": file})
+
+        last_seq = rows[-1].seq if rows else after[0]
+        return {"changes": changes, "cursor": encode_cursor("changes", False, [last_seq]), "has_more": has_more}
+
+    def search_files(self, query: str, fields: tuple[str, ...], limit: int = 100, cursor: str | None = None) -> dict:
+        """
+        Ищет файлы по имени, пути и комментарию и возвращает страницу по убыванию релевантности.
+
+        Returns:
+            dict: {"items": list[dict], "next_cursor": str | None}; у каждого элемента есть поле rank.
+        Raises:
+            ValueError: Если курсор некорректен или выдан для другого запроса.
+        """
+        # Курсор привязан к запросу: ранги разных запросов несравнимы
+        cursor_key = f"search:{query}"
+        after = None
+        if cursor:
+            after = decode_cursor(cursor, cursor_key, True)
+            if len(after) != 2:
+                raise ValueError("Некорректный курсор.")
+
+        items, next_key = SearchIndex.search(query, fields, limit, after)
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(cursor_key, True, next_key) if next_key is not None else None,
+        }
+
     def get_file_detail(self, file_id: int):
         """
         Получает подробности файла по ID.
@@ -111,6 +606,15 @@ class FileService:
         """
         return self.repo.get_by_id(file_id)
 
+    def get_file_info(self, file_id: int) -> dict:
+        """
+        Возвращает данные файла по ID для ответа API, через кэш ответов.
+
+        Returns:
+            dict: Результат FileRecord.to_dict().
+        """
+        return self.cache.get_or_set("file", file_id, lambda: self.repo.get_by_id(file_id).to_dict())
+
     def get_file_path(self, file_id: int) -> Path:
         """
             Возвращает абсолютный путь к файлу в хранилище.
@@ -119,4 +623,4 @@ class FileService:
                 Path: Путь до файла.
         """
         file = self.repo.get_by_id(file_id)
-        return Path(self.storage.base_dir) / file.path / (file.name + file.extension)
+        return self.storage.physical_path(file)
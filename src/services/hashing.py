@@ -0,0 +1,199 @@
+import hashlib
+import mmap
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.compression import CorruptContentError, DECODE_ERRORS, open_reader
+
+
+class Throttle:
+    """
+        Ограничитель скорости чтения, общий для всех потоков: каждый прочитанный блок
+        резервирует интервал времени длиной size / rate, и поток спит до начала своего интервала.
+        Накопления «кредита» нет — после простоя скорость не превышает rate.
+
+        Атрибуты:
+            rate (float): Байт в секунду; 0 — без ограничения.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + size / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+def _advise(fd: int, advice_name: str):
+    # posix_fadvise есть не на всех платформах (например, нет на Windows и macOS)
+    advice = getattr(os, advice_name, None)
+    if advice is not None and hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def hash_file(path: str | os.PathLike, buffer_size: int = 1024 * 1024, use_mmap: bool = False,
+              throttle: Throttle | None = None, drop_cache: bool = False,
+              encoding: str | None = None) -> tuple[int, str]:
+    """
+        Считает SHA-256 файла блоками по buffer_size (hashlib отпускает GIL на больших блоках,
+        поэтому файлы хэшируются параллельно в потоках).
+
+        Args:
+            path: Путь к файлу.
+            buffer_size (int): Размер блока чтения.
+            use_mmap (bool): Читать через mmap вместо readinto (без копирования в буфер процесса).
+            throttle (Throttle | None): Ограничитель скорости чтения.
+            drop_cache (bool): Не оставлять прочитанное в страничном кэше ОС (POSIX_FADV_DONTNEED),
+                чтобы фоновое чтение не вытесняло данные, нужные основным запросам.
+            encoding (str | None): Кодировка сжатого файла: хэшируется распакованное содержимое.
+
+        Returns:
+            tuple[int, str]: (размер в байтах, hex-дайджест SHA-256)
+        Raises:
+            OSError: Если файл не удалось прочитать (FileNotFoundError — если его нет,
+                CorruptContentError — если сжатое содержимое не распаковывается).
+    """
+    if encoding:
+        return _hash_encoded(path, encoding, buffer_size, throttle)
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        _advise(fd, "POSIX_FADV_SEQUENTIAL")
+        length = os.fstat(fd).st_size
+        if use_mmap and length:
+            # Все срезы memoryview должны быть освобождены до закрытия mmap
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for offset in range(0, len(mapped), buffer_size):
+                    with view[offset:offset + buffer_size] as chunk:
+                        if throttle is not None:
+                            throttle.consume(len(chunk))
+                        hasher.update(chunk)
+                        size += len(chunk)
+        else:
+            buffer = bytearray(buffer_size)
+            view = memoryview(buffer)
+            while n := f.readinto(buffer):
+                if throttle is not None:
+                    throttle.consume(n)
+                hasher.update(view[:n])
+                size += n
+        if drop_cache:
+            _advise(fd, "POSIX_FADV_DONTNEED")
+    return size, hasher.hexdigest()
+
+
+def _hash_encoded(path: str | os.PathLike, encoding: str, buffer_size: int,
+                  throttle: Throttle | None) -> tuple[int, str]:
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open_reader(encoding, path) as f:
+            while chunk := f.read(buffer_size):
+                if throttle is not None:
+                    throttle.consume(len(chunk))
+                hasher.update(chunk)
+                size += len(chunk)
+    except DECODE_ERRORS as e:
+        raise CorruptContentError(f"Не удалось распаковать {path}: {e}") from e
+    return size, hasher.hexdigest()
+
+
+def probe_file(path: str, block_size: int = 64 * 1024) -> tuple[int, int, int, float, str, bool]:
+    """
+        Быстрый отпечаток файла для поиска дубликатов: SHA-256 первого и последнего блоков.
+        Функция верхнего уровня, чтобы её можно было выполнять в пуле процессов.
+
+        Returns:
+            tuple: (st_dev, st_ino, st_size, st_mtime, дайджест, complete), где complete — файл
+            не длиннее двух блоков и дайджест посчитан по всему содержимому.
+        Raises:
+            OSError: Если файл не удалось прочитать.
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        file_stat = os.fstat(f.fileno())
+        complete = file_stat.st_size <= 2 * block_size
+        if complete:
+            while chunk := f.read(block_size):
+                hasher.update(chunk)
+        else:
+            hasher.update(f.read(block_size))
+            f.seek(-block_size, os.SEEK_END)
+            hasher.update(f.read(block_size))
+    return file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime, hasher.hexdigest(), complete
+
+
+def full_hash(path: str, buffer_size: int = 1024 * 1024) -> str:
+    """
+        SHA-256 всего файла; функция верхнего уровня для пула процессов.
+    """
+    return hash_file(path, buffer_size)[1]
+
+
+class HashingEngine:
+    """
+        Параллельное хэширование файлов в пуле потоков.
+
+        Атрибуты:
+            workers (int): Количество потоков.
+            buffer_size (int): Размер блока чтения.
+            use_mmap (bool): Читать файлы через mmap.
+            throttle (Throttle | None): Общее ограничение скорости чтения.
+            drop_cache (bool): Сбрасывать прочитанное из страничного кэша ОС.
+    """
+
+    def __init__(self, workers: int = 4, buffer_size: int = 1024 * 1024, use_mmap: bool = False,
+                 throttle: Throttle | None = None, drop_cache: bool = False):
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.use_mmap = use_mmap
+        self.throttle = throttle
+        self.drop_cache = drop_cache
+
+    def hash_one(self, path: str | os.PathLike, encoding: str | None = None) -> tuple[int, str]:
+        """
+            Хэширует один файл с настройками движка.
+        """
+        return hash_file(path, self.buffer_size, self.use_mmap, self.throttle, self.drop_cache, encoding)
+
+    def hash_many(self, items: Iterable[tuple]) -> list[tuple]:
+        """
+            Хэширует пачку файлов параллельно, сохраняя порядок входа.
+
+            Args:
+                items (Iterable[tuple]): Тройки (ключ, путь, кодировка сжатия | None).
+
+            Returns:
+                list[tuple]: (ключ, os.stat_result до чтения | None, дайджест | None, ошибка OSError | None).
+                Если прочитано не st_size байт (файл меняли во время чтения), дайджест — None;
+                у сжатых файлов размер распакованного содержимого с st_size не сравнивается.
+        """
+        def run(item):
+            key, path, encoding = item
+            try:
+                file_stat = os.stat(path)
+                size, digest = self.hash_one(path, encoding)
+            except OSError as e:
+                return key, None, None, e
+            return key, file_stat, digest if encoding or size == file_stat.st_size else None, None
+
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items)), thread_name_prefix="hash") as pool:
+            return list(pool.map(run, items))
@@ -0,0 +1,134 @@
+from datetime import datetime, UTC
+
+from src.services.compression import CorruptContentError
+from src.services.file_service import FileService
+from src.services.hashing import HashingEngine
+from src.services.job_manager import job_manager, Job
+from src.services.storage_manager import StorageManager
+
+
+class IntegrityService:
+    """
+        Хэши содержимого и проверка целостности хранилища.
+
+        - Дозаполнение: считает sha256 для записей, у которых его нет (файлы, добавленные
+          синхронизацией или до появления хэшей).
+        - Проверка (scrub): перечитывает файлы с известным sha256 и сверяет хэш. Файл с прежними
+          размером и mtime, но другим содержимым — повреждение (mismatch); отсутствующий — missing.
+          Файлы, изменённые на диске в обход приложения (другие размер или mtime), не считаются
+          повреждёнными: их обработает синхронизация.
+
+        Обе операции — фоновые задачи: читают файлы в пуле потоков движка с общим ограничением
+        скорости и фиксируют результаты пачками по batch_size.
+
+        Атрибуты:
+            engine (HashingEngine): Движок хэширования.
+            batch_size (int): Сколько записей обрабатывается и фиксируется за раз.
+    """
+    STATUSES = ("ok", "mismatch", "missing")
+
+    def __init__(self, file_service: FileService, engine: HashingEngine, batch_size: int = 500):
+        self.storage = file_service.storage
+        self.repo = file_service.repo
+        self.engine = engine
+        self.batch_size = batch_size
+
+    @property
+    def lock_key(self) -> str:
+        # Одна задача хэширования на хранилище: две параллельные только делили бы диск
+        return f"integrity:{self.storage.base_dir}"
+
+    def start_backfill_job(self) -> Job:
+        """
+            Запускает дозаполнение sha256 фоновой задачей.
+
+            Raises:
+                JobConflictError: Если дозаполнение или проверка этого хранилища уже выполняется.
+        """
+        return job_manager.submit("hash-backfill", self._run_backfill, lock_key=self.lock_key,
+                                  total=self.repo.count_hashed(False))
+
+    def start_scrub_job(self) -> Job:
+        """
+            Запускает проверку целостности фоновой задачей.
+
+            Raises:
+                JobConflictError: Если дозаполнение или проверка этого хранилища уже выполняется.
+        """
+        return job_manager.submit("scrub", self._run_scrub, lock_key=self.lock_key,
+                                  total=self.repo.count_hashed(True))
+
+    def _hash_batch(self, rows: list) -> list[tuple]:
+        return self.engine.hash_many((row, self.storage.physical_path(row), row.encoding) for row in rows)
+
+    @staticmethod
+    def _changed(row, file_stat) -> bool:
+        if file_stat.st_size != (row.stored_size if row.encoding else row.size):
+            return True
+        # У блобов mtime не синхронизируется: содержимое по ключу не меняется
+        return not StorageManager.is_blob_key(row.storage_key) and row.mtime is not None and file_stat.st_mtime != row.mtime
+
+    def _run_backfill(self, job: Job) -> dict:
+        counters = {"processed": 0, "hashed": 0, "skipped": 0, "bytes": 0}
+        after_id = 0
+        while rows := self.repo.get_hash_batch(after_id, self.batch_size, hashed=False):
+            after_id = rows[-1].id
+            now = datetime.now(UTC)
+            updates = []
+            for row, file_stat, digest, error in self._hash_batch(rows):
+                counters["processed"] += 1
+                if error is not None or digest is None or self._changed(row, file_stat):
+                    # Нет на диске или меняется прямо сейчас — дозаполним в следующий раз
+                    counters["skipped"] += 1
+                    continue
+                counters["hashed"] += 1
+                counters["bytes"] += file_stat.st_size
+                updates.append({"b_id": row.id, "b_size": row.size, "b_sha256": digest, "b_verified_at": now})
+            self.repo.bulk_set_hashes(updates)
+            self.repo.commit()
+            job.report(**counters)
+        return counters
+
+    def _run_scrub(self, job: Job) -> dict:
+        counters = {"processed": 0, "ok": 0, "mismatch": 0, "missing": 0, "changed": 0, "errors": 0, "bytes": 0}
+        after_id = 0
+        while rows := self.repo.get_hash_batch(after_id, self.batch_size, hashed=True):
+            after_id = rows[-1].id
+            now = datetime.now(UTC)
+            updates, changed_ids = [], []
+            for row, file_stat, digest, error in self._hash_batch(rows):
+                counters["processed"] += 1
+                if isinstance(error, (FileNotFoundError, NotADirectoryError)):
+                    status = "missing"
+                elif isinstance(error, CorruptContentError):
+                    # Сжатое содержимое не распаковывается — это то же повреждение, что и другой хэш
+                    status = "mismatch"
+                elif error is not None:
+                    counters["errors"] += 1
+                    continue
+                elif digest is None or self._changed(row, file_stat):
+                    counters["changed"] += 1
+                    continue
+                else:
+                    status = "ok" if digest == row.sha256 else "mismatch"
+                    counters["bytes"] += file_stat.st_size
+                counters[status] += 1
+                updates.append({"b_id": row.id, "b_sha256": row.sha256, "b_integrity": status, "b_verified_at": now})
+                if status != row.integrity:
+                    changed_ids.append(row.id)
+            self.repo.bulk_set_integrity(updates, changed_ids)
+            self.repo.commit()
+            job.report(**counters)
+        return counters
+
+    def get_report(self, limit: int = 100) -> dict:
+        """
+            Возвращает сводку по результатам проверок и список повреждённых и отсутствующих файлов.
+
+            Returns:
+                dict: {"summary": {"ok", "mismatch", "missing", "unverified"}, "problems": list[dict]}
+        """
+        counts = self.repo.integrity_summary()
+        summary = {status: counts.get(status, 0) for status in self.STATUSES}
+        summary["unverified"] = sum(count for status, count in counts.items() if status not in self.STATUSES)
+        return {"summary": summary, "problems": self.repo.list_integrity_problems(limit)}
@@ -0,0 +1,442 @@
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, UTC
+
+from sqlalchemy import delete, insert, select, update
+
+from src import db
+from src.models import JobRecord
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировки задач действуют только внутри процесса
+    fcntl = None
+
+
+class JobCancelled(Exception):
+    """
+        Выбрасывается внутри задачи, когда пользователь запросил её отмену.
+    """
+
+
+class JobConflictError(Exception):
+    """
+        Выбрасывается при попытке запустить операцию, пока другая держит ту же блокировку.
+
+        Атрибуты:
+            job_id (str | None): ID задачи, которая держит блокировку (если это фоновая задача).
+    """
+
+    def __init__(self, message: str, job_id: str | None = None):
+        super().__init__(message)
+        self.job_id = job_id
+
+
+class Job:
+    """
+        Фоновая задача с прогрессом.
+
+        Атрибуты:
+            id (str): Уникальный идентификатор задачи.
+            kind (str): Тип операции (например, 'actualize').
+            status (str): pending | running | succeeded | failed | cancelled.
+            counters (dict): Счётчики прогресса (processed, added, removed и т.д.).
+            total (int | None): Ожидаемое количество элементов для расчёта ETA.
+            result (dict | None): Результат успешно завершённой задачи.
+            error (str | None): Текст ошибки упавшей задачи.
+    """
+
+    def __init__(self, kind: str, total: int | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.counters: dict = {}
+        self.total = total
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = datetime.now(UTC)
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_record(cls, record: JobRecord) -> "Job":
+        """
+            Восстанавливает задачу другого процесса из её строки в таблице jobs.
+        """
+        job = cls(record.kind, total=record.total)
+        job.id = record.id
+        job.status = record.status
+        job.counters = dict(record.counters or {})
+        job.result = record.result
+        job.error = record.error
+        # SQLite возвращает даты без часового пояса
+        job.created_at, job.started_at, job.finished_at = (
+            value.replace(tzinfo=UTC) if value is not None and value.tzinfo is None else value
+            for value in (record.created_at, record.started_at, record.finished_at)
+        )
+        if record.cancel_requested:
+            job._cancel_event.set()
+        return job
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def report(self, **counters):
+        """
+            Обновляет счётчики прогресса и прерывает задачу, если запрошена отмена.
+
+            Raises:
+                JobCancelled: Если задачу попросили отменить.
+        """
+        with self._lock:
+            self.counters.update(counters)
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def eta_seconds(self) -> float | None:
+        """
+            Оценивает оставшееся время по скорости обработки и ожидаемому объёму.
+
+            Returns:
+                float | None: Секунды до завершения или None, если оценить нельзя.
+        """
+        processed = self.counters.get("processed", 0)
+        if self.status != "running" or not self.total or not processed or self.started_at is None:
+            return None
+        remaining = max(self.total - processed, 0)
+        elapsed = (datetime.now(UTC) - self.started_at).total_seconds()
+        return round(elapsed / processed * remaining, 1)
+
+    def to_dict(self) -> dict:
+        """
+            Конвертирует состояние задачи в словарь для JSON-сериализации.
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "counters": counters,
+            "total": self.total,
+            "eta_seconds": self.eta_seconds(),
+            "cancel_requested": self.cancel_requested,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """
+        Реестр фоновых задач с пулом потоков.
+
+        Задачи выполняются в контексте Flask-приложения. Именованные блокировки гарантируют,
+        что одновременно выполняется не больше одной операции с одним ключом
+        (например, одна синхронизация на корень хранилища), в том числе среди нескольких
+        процессов сервера: кроме записи в памяти ключ удерживается блокировкой flock файла
+        в JOB_LOCK_DIR. Состояние задач пишется в таблицу jobs, поэтому задачу, запущенную
+        одним процессом, можно запросить и отменить через любой другой.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._futures: dict = {}
+        self._holders: dict[str, str | None] = {}
+        self._lock_files: dict[str, int] = {}
+        self._lock_dir: str | None = None
+        self._history_limit = 100
+        self._state_interval = 1.0
+        self._flusher: threading.Thread | None = None
+        self._host = socket.gethostname()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+            Привязывает менеджер к приложению и создаёт пул потоков.
+        """
+        self.app = app
+        self._history_limit = app.config.get("JOB_HISTORY_LIMIT", 100)
+        self._state_interval = app.config.get("JOB_STATE_INTERVAL", 1)
+        self._lock_dir = app.config.get("JOB_LOCK_DIR") or os.path.join(app.config["STORAGE_PATH"], ".journal")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config.get("JOB_WORKERS", 2),
+                thread_name_prefix="job",
+            )
+
+    def _acquire(self, key: str, holder: str | None):
+        with self._lock:
+            if key in self._holders:
+                raise JobConflictError("Операция уже выполняется.", job_id=self._holders[key])
+            fd = self._lock_file(key, holder)
+            self._holders[key] = holder
+            if fd is not None:
+                self._lock_files[key] = fd
+
+    def _lock_file(self, key: str, holder: str | None) -> int | None:
+        # Блокировка ключа среди процессов: flock файла без ожидания, в файле — ID задачи-владельца
+        if fcntl is None or self._lock_dir is None:
+            return None
+        os.makedirs(self._lock_dir, exist_ok=True)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        fd = os.open(os.path.join(self._lock_dir, f"job-{name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            owner = os.read(fd, 64).decode("ascii", "replace") or None
+            os.close(fd)
+            raise JobConflictError("Операция уже выполняется.", job_id=owner)
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, (holder or "").encode("ascii"), 0)
+        return fd
+
+    def _release(self, key: str):
+        with self._lock:
+            self._holders.pop(key, None)
+            fd = self._lock_files.pop(key, None)
+        if fd is not None:
+            os.ftruncate(fd, 0)
+            os.close(fd)
+
+    @contextmanager
+    def exclusive(self, key: str):
+        """
+            Удерживает блокировку с ключом key на время синхронной операции.
+
+            Raises:
+                JobConflictError: Если блокировку держит другая операция (в том числе в другом процессе).
+        """
+        self._acquire(key, None)
+        try:
+            yield
+        finally:
+            self._release(key)
+
+    def submit(self, kind: str, func: Callable[[Job], dict | None], *, lock_key: str | None = None,
+               total: int | None = None) -> Job:
+        """
+            Ставит задачу в очередь пула.
+
+            Args:
+                kind (str): Тип операции.
+                func (Callable[[Job], dict | None]): Функция задачи; получает Job для отчёта о прогрессе
+                    и возвращает результат.
+                lock_key (str | None): Ключ блокировки, удерживаемой до завершения задачи.
+                total (int | None): Ожидаемое количество элементов для ETA.
+
+            Returns:
+                Job: Созданная задача.
+
+            Raises:
+                JobConflictError: Если блокировку lock_key держит другая операция.
+        """
+        job = Job(kind, total=total)
+        if lock_key is not None:
+            self._acquire(lock_key, job.id)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush, name="job-state", daemon=True)
+                self._flusher.start()
+        # Строка появляется до запуска задачи: ID из ответа сразу можно запрашивать у других процессов
+        self._save(job)
+        self._futures[job.id] = self._executor.submit(self._run, job, func, lock_key)
+        if job.finished:
+            # Задача успела завершиться раньше, чем future попал в реестр
+            self._futures.pop(job.id, None)
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], dict | None], lock_key: str | None):
+        try:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                return
+            job.status = "running"
+            job.started_at = datetime.now(UTC)
+            self._save(job)
+            with self.app.app_context():
+                job.result = func(job)
+            job.status = "succeeded"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            self.app.logger.exception("Фоновая задача %s (%s) завершилась с ошибкой", job.id, job.kind)
+        finally:
+            job.finished_at = datetime.now(UTC)
+            self._futures.pop(job.id, None)
+            if lock_key is not None:
+                self._release(lock_key)
+            self._save(job)
+
+    def _save(self, job: Job, progress: bool = False):
+        # Отдельное соединение, а не db.session: задача держит в сессии свою транзакцию.
+        # Снимок берётся под _save_lock, чтобы запоздавшая запись прогресса не затёрла итог задачи
+        with self._save_lock:
+            values = {
+                "status": job.status,
+                "counters": job.to_dict()["counters"],
+                "total": job.total,
+                "result": None if job.result is None else self.app.json.loads(self.app.json.dumps(job.result)),
+                "error": job.error,
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+            }
+            if job.cancel_requested:
+                values["cancel_requested"] = True
+            table = JobRecord.__table__
+            try:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    if not connection.execute(update(table).where(table.c.id == job.id).values(**values)).rowcount:
+                        connection.execute(insert(table).values(
+                            id=job.id, kind=job.kind, pid=os.getpid(), host=self._host,
+                            created_at=job.created_at, **{"cancel_requested": False, **values},
+                        ))
+                    if job.finished:
+                        # Как и в памяти, хранятся только history_limit последних завершённых задач
+                        keep = (select(table.c.id).where(table.c.finished_at.is_not(None))
+                                .order_by(table.c.created_at.desc()).limit(self._history_limit))
+                        connection.execute(delete(table).where(table.c.finished_at.is_not(None),
+                                                               table.c.id.not_in(keep)))
+            except Exception:
+                # Прогресс допишется следующей записью (в SQLite ей может мешать транзакция самой задачи)
+                self.app.logger.log(logging.DEBUG if progress else logging.WARNING,
+                                    "Не удалось сохранить состояние задачи %s", job.id, exc_info=True)
+
+    def _flush(self):
+        # Пока в процессе есть незавершённые задачи: раз в JOB_STATE_INTERVAL пишет их прогресс
+        # и подхватывает отмену, запрошенную через другие процессы
+        table = JobRecord.__table__
+        while True:
+            time.sleep(self._state_interval)
+            with self._lock:
+                running = [job for job in self._jobs.values() if not job.finished]
+                if not running:
+                    self._flusher = None
+                    return
+            for job in running:
+                self._save(job, progress=True)
+            try:
+                with self.app.app_context(), db.engine.connect() as connection:
+                    cancelled = set(connection.scalars(select(table.c.id).where(
+                        table.c.id.in_([job.id for job in running]), table.c.cancel_requested)))
+            except Exception:
+                self.app.logger.debug("Не удалось прочитать отмены задач", exc_info=True)
+                continue
+            for job in running:
+                if job.id in cancelled and not job.cancel_requested:
+                    self.cancel(job.id)
+
+    def _prune(self):
+        # Вызывается под self._lock: выбрасывает самые старые завершённые задачи сверх лимита
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(self._jobs) - self._history_limit, 0)]:
+            del self._jobs[job_id]
+
+    def _from_record(self, record: JobRecord) -> Job:
+        job = Job.from_record(record)
+        if not job.finished and record.host == self._host and not self._process_alive(record.pid):
+            # Процесс упал, не успев записать итог: задача больше не выполняется
+            job.status = "failed"
+            job.error = "Процесс, выполнявший задачу, завершился."
+        return job
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        if pid == os.getpid():
+            # Задачи этого процесса есть в реестре; строка без задачи осталась от прежнего процесса с тем же PID
+            return False
+        if os.name != "posix":
+            # os.kill(pid, 0) в Windows завершает процесс
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def get(self, job_id: str) -> Job | None:
+        """
+            Возвращает задачу по ID или None. Задачи других процессов читаются из таблицы jobs.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        record = db.session.get(JobRecord, job_id)
+        return self._from_record(record) if record is not None else None
+
+    def list(self) -> list[Job]:
+        """
+            Возвращает задачи всех процессов, от новых к старым.
+        """
+        local = list(self._jobs.values())
+        records = db.session.scalars(
+            select(JobRecord).where(JobRecord.id.not_in([job.id for job in local]))
+            .order_by(JobRecord.created_at.desc()).limit(self._history_limit)
+        )
+        jobs = local + [self._from_record(record) for record in records]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+            Запрашивает отмену задачи. Задача в очереди снимается сразу,
+            выполняющаяся прерывается при следующем отчёте о прогрессе. Отмену задачи
+            другого процесса тот подхватывает в течение JOB_STATE_INTERVAL.
+
+            Returns:
+                Job | None: Задача или None, если она не найдена.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self.get(job_id)
+            if job is not None and not job.finished and not job.cancel_requested:
+                db.session.execute(update(JobRecord).where(JobRecord.id == job_id).values(cancel_requested=True))
+                db.session.commit()
+                job._cancel_event.set()
+            return job
+        if job.finished:
+            return job
+        job._cancel_event.set()
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            # Задача ещё не начиналась: _run не будет вызван, освобождаем её состояние здесь
+            job.status = "cancelled"
+            job.finished_at = datetime.now(UTC)
+            self._futures.pop(job_id, None)
+            with self._lock:
+                keys = [key for key, holder in self._holders.items() if holder == job_id]
+            for key in keys:
+                self._release(key)
+            self._save(job)
+        return job
+
+
+job_manager = JobManager()
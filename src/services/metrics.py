@@ -0,0 +1,324 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, UTC
+
+from flask import Flask, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.wsgi import ClosingIterator, FileWrapper
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм длительности, секунды
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Границы корзин количества SQL-запросов за HTTP-запрос
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+# Ключ статистики текущего запроса в WSGI environ: environ переживает повторный вход
+# в контекст запроса при потоковой отдаче (stream_with_context), в отличие от g
+ENVIRON_KEY = "metrics.request"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+        Монотонный счётчик с метками.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """
+        Гистограмма с фиксированными корзинами и метками. Счётчики корзин хранятся
+        поштучно и накапливаются (le) только при выводе.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [счётчики корзин (последняя — +Inf), сумма, количество]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for label_values, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels(self.labels, label_values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class _Span:
+    """
+        Замер длительности блока with в гистограмму.
+    """
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _RequestStats:
+    """
+        Статистика одного HTTP-запроса: начало, SQL-запросы и профилировщик (если запрос выбран).
+    """
+    __slots__ = ("started", "queries", "query_seconds", "profiler")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.profiler: cProfile.Profile | None = None
+
+
+class Metrics:
+    """
+        Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+        Собирает длительность HTTP-запросов (до отдачи последнего байта тела), количество
+        и время SQL-запросов на HTTP-запрос, длительность файловых операций хранилища
+        (save, rename, unlink, walk, stat) и объём загруженных и отданных байт.
+
+        Медленные запросы (дольше slow_request_ms) пишутся в лог; доля profile_rate запросов
+        выполняется под cProfile, и профили тех из них, что оказались медленными,
+        сохраняются в profile_dir (.prof, смотреть через pstats или snakeviz).
+
+        Метрики хранятся в памяти процесса: при нескольких процессах каждый отдаёт свои.
+
+        Атрибуты:
+            enabled (bool): Сбор включён; выключенный сбор почти ничего не стоит.
+            slow_request_ms (float): Порог медленного запроса, мс (0 — не отслеживать).
+            profile_rate (float): Доля профилируемых запросов, от 0 до 1.
+            profile_dir (str): Каталог профилей медленных запросов.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.slow_request_ms = 0.0
+        self.profile_rate = 0.0
+        self.profile_dir = ""
+        self.requests = Histogram("http_request_duration_seconds", "Длительность HTTP-запросов.",
+                                  ("method", "endpoint", "status"))
+        self.request_queries = Histogram("http_request_db_queries", "SQL-запросов за HTTP-запрос.",
+                                         ("endpoint",), QUERY_COUNT_BUCKETS)
+        self.request_query_seconds = Histogram("http_request_db_seconds", "Время SQL-запросов за HTTP-запрос.",
+                                               ("endpoint",))
+        self.queries = Histogram("db_query_duration_seconds",
+                                 "Длительность SQL-запросов (включая фоновые задачи).")
+        self.storage = Histogram("storage_operation_duration_seconds",
+                                 "Длительность файловых операций хранилища.", ("operation",))
+        self.transfer = Counter("transfer_bytes_total", "Байт загружено (in) и отдано (out) через HTTP.",
+                                ("direction",))
+        self.slow_requests = Counter("http_slow_requests_total", "Запросов дольше порога METRICS_SLOW_REQUEST_MS.",
+                                     ("endpoint",))
+        self._collectors = (self.requests, self.request_queries, self.request_query_seconds, self.queries,
+                            self.storage, self.transfer, self.slow_requests)
+        self._sql_hooks = False
+
+    def init_app(self, app: Flask):
+        """
+            Подключает сбор метрик к приложению по настройкам METRICS_*.
+        """
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.slow_request_ms = app.config.get("METRICS_SLOW_REQUEST_MS", 0.0)
+        self.profile_rate = app.config.get("METRICS_PROFILE_RATE", 0.0)
+        self.profile_dir = app.config.get("METRICS_PROFILE_DIR", "")
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not self._sql_hooks:
+            # На класс Engine: движок Flask-SQLAlchemy создаётся лениво, в контексте приложения
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            self._sql_hooks = True
+
+    def span(self, operation: str):
+        """
+            Контекстный менеджер замера файловой операции хранилища.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.storage, (operation,))
+
+    def count_bytes(self, direction: str, amount: int):
+        """
+            Учитывает переданные байты: direction — in (загрузка) или out (скачивание).
+        """
+        if self.enabled and amount:
+            self.transfer.inc(amount, direction)
+
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+    def _before_request(self):
+        stats = _RequestStats()
+        if self.profile_rate > 0 and random.random() < self.profile_rate:
+            stats.profiler = cProfile.Profile()
+            try:
+                stats.profiler.enable()
+            except (ValueError, RuntimeError):
+                # В потоке уже работает другой профилировщик
+                stats.profiler = None
+        request.environ[ENVIRON_KEY] = stats
+
+    def _after_request(self, response):
+        stats = request.environ.get(ENVIRON_KEY)
+        if stats is None:
+            return response
+        method = request.method
+        endpoint = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        status = response.status_code
+        def finish():
+            self._finish(stats, method, endpoint, status)
+
+        # Замер завершается, когда сервер закрывает ответ, — после отдачи потокового тела
+        if not response.direct_passthrough:
+            response.call_on_close(finish)
+        elif self._is_file_wrapper(response.response):
+            # Тело отдаёт сервер (sendfile); обёртка лишила бы его этой возможности — замер до заголовков
+            finish()
+        else:
+            # werkzeug не вызывает call_on_close для direct_passthrough-ответов
+            response.response = ClosingIterator(response.response, finish)
+        return response
+
+    @staticmethod
+    def _is_file_wrapper(body) -> bool:
+        server_wrapper = request.environ.get("wsgi.file_wrapper")
+        return isinstance(body, FileWrapper) or (isinstance(server_wrapper, type) and isinstance(body, server_wrapper))
+
+    def _finish(self, stats: _RequestStats, method: str, endpoint: str, status: int):
+        elapsed = time.perf_counter() - stats.started
+        if stats.profiler is not None:
+            stats.profiler.disable()
+        self.requests.observe(elapsed, method, endpoint, str(status))
+        self.request_queries.observe(stats.queries, endpoint)
+        self.request_query_seconds.observe(stats.query_seconds, endpoint)
+
+        if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+            self.slow_requests.inc(1, endpoint)
+            logger.warning("Медленный запрос %s %s: %.0f мс, %d SQL-запросов (%.0f мс)", method, endpoint,
+                           elapsed * 1000, stats.queries, stats.query_seconds * 1000)
+            if stats.profiler is not None and self.profile_dir:
+                self._dump_profile(stats.profiler, method, endpoint, elapsed)
+
+    def _dump_profile(self, profiler: cProfile.Profile, method: str, endpoint: str, elapsed: float):
+        slug = "".join(c if c.isalnum() else "_" for c in endpoint).strip("_") or "root"
+        name = f"{datetime.now(UTC):%Y%m%dT%H%M%S%f}-{method}-{slug}-{elapsed * 1000:.0f}ms.prof"
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(self.profile_dir, name))
+        except OSError:
+            logger.warning("Не удалось сохранить профиль медленного запроса", exc_info=True)
+            return
+        logger.warning("Профиль медленного запроса сохранён: %s", name)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics.query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics.query_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        self.queries.observe(elapsed)
+        if has_request_context():
+            stats = request.environ.get(ENVIRON_KEY)
+            if stats is not None:
+                stats.queries += 1
+                stats.query_seconds += elapsed
+
+
+metrics = Metrics()
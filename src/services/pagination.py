@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(sort: str, descending: bool, values: list) -> str:
+    """
+    Упаковывает ключ последней строки страницы в непрозрачный курсор.
+
+    Args:
+        sort (str): Имя сортировки, для которой построен курсор.
+        descending (bool): Направление сортировки.
+        values (list): Значения колонок ключа сортировки (последним всегда идёт id).
+
+    Returns:
+        str: Строка курсора (base64url без паддинга).
+    """
+    payload = {
+        "s": sort,
+        "d": int(descending),
+        "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, datetime_positions: tuple[int, ...] = ()) -> list:
+    """
+    Распаковывает курсор и проверяет, что он выдан для той же сортировки.
+
+    Args:
+        cursor (str): Строка курсора из параметра запроса.
+        sort (str): Текущая сортировка.
+        descending (bool): Текущее направление сортировки.
+        datetime_positions (tuple[int, ...]): Позиции значений, которые нужно вернуть как datetime.
+
+    Returns:
+        list: Значения ключа сортировки.
+
+    Raises:
+        ValueError: Если курсор повреждён или не соответствует сортировке.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = list(payload["k"])
+        for pos in datetime_positions:
+            values[pos] = datetime.fromisoformat(values[pos])
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise ValueError("Некорректный курсор.")
+
+    if payload.get("s") != sort or bool(payload.get("d")) != descending:
+        raise ValueError("Курсор выдан для другой сортировки.")
+    return values
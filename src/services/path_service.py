@@ -1,18 +1,29 @@
 import os
 import re
+from functools import lru_cache
 from unidecode import unidecode
 
 from src.config import Config
 from src.models import FileRecord
 
+# Разделитель компонентов относительного пути, с которым пути хранятся в БД
+PATH_SEP = '\\' if 'win' in Config.OS else '/'
 
+# Всё, кроме латиницы, цифр, _, - и \, заменяется на "_"
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_\-\\]+')
+# Разделители компонентов пути: / и \ (любой ОС), а также точка
+_COMPONENT_SEPARATORS = re.compile(r'[\\/.]')
+
+
+@lru_cache(maxsize=Config.PATH_CACHE_SIZE)
 def sanitize_filename(name: str) -> str:
     """
     Преобразует имя файла в безопасный формат.
 
     Выполняет транслитерацию кириллицы в латиницу, заменяет все символы,
     кроме латинских букв, цифр, подчёркиваний, дефисов и точек, на подчёркивания,
-    а также удаляет ведущие и конечные подчёркивания.
+    а также удаляет ведущие и конечные подчёркивания. ASCII-имена не транслитерируются
+    (unidecode их не меняет), результаты кэшируются (Config.PATH_CACHE_SIZE).
 
     Args:
         name (str): Исходное имя файла.
@@ -20,8 +31,9 @@ def sanitize_filename(name: str) -> str:
     Returns:
         str: Очищенное и транслитерированное имя файла, безопасное для использования.
     """
-    name = unidecode(name)  # Транслитерация кириллицы
-    name = re.sub(r'[^A-Za-z0-9_\-\\]+', '_', name)  # Только латиница, цифры, _, -, .
+    if not name.isascii():
+        name = unidecode(name)  # Транслитерация кириллицы
+    name = _UNSAFE_CHARS.sub('_', name)  # Только латиница, цифры, _, -, .
     return name.strip('_')
 
 
@@ -38,21 +50,21 @@ def sanitize_path_components(path: str) -> str:
     Returns:
         str: Безопасный путь с транслитерированными и очищенными компонентами.
     """
-    normalized = Config.normalize_path(path.strip())
-
-    parts = re.split(r'[\\/.]', normalized)  # разбиваем по / или \
+    # Config.normalize_path не нужен: / и \ оба являются разделителями
+    parts = _COMPONENT_SEPARATORS.split(path.strip())  # разбиваем по / или \
     sanitized_parts = [sanitize_filename(part) for part in parts if part]
 
-    sep = '\\' if 'win' in Config.OS else '/'
-    return sep.join(sanitized_parts)
+    return PATH_SEP.join(sanitized_parts)
 
 
+@lru_cache(maxsize=Config.PATH_CACHE_SIZE)
 def clean_path(path: str) -> str:
     """
     Заглушка для очистки пользовательского пути.
 
     В текущей реализации функция выполняет транслитерацию и очистку компонентов пути
     без изменения структуры, чтобы не нарушать организацию папок.
+    Результаты кэшируются (Config.PATH_CACHE_SIZE).
 
     Args:
         path (str): Исходный пользовательский путь.
@@ -67,6 +79,35 @@ def clean_path(path: str) -> str:
     return sanitize_path_components(path)
 
 
+@lru_cache(maxsize=64)
+def _absolute_base(base_dir: str) -> tuple[str, str]:
+    # Нормализованная база и префикс вложенных путей (с разделителем на конце)
+    base = os.path.abspath(base_dir)
+    return base, base if base.endswith(os.sep) else base + os.sep
+
+
+def _contains(base_dir: str, absolute_path: str) -> bool:
+    base, prefix = _absolute_base(base_dir)
+    return absolute_path == base or absolute_path.startswith(prefix)
+
+
+def is_within(base_dir: str, path: str) -> bool:
+    """
+    Проверяет, что путь лежит внутри базовой директории (или совпадает с ней).
+
+    Оба пути нормализуются, и база сравнивается с началом пути вместе с разделителем,
+    то есть по целым компонентам: для базы /data/storage путь /data/storage2/file.txt снаружи.
+
+    Args:
+        base_dir (str): Базовая директория.
+        path (str): Проверяемый путь (абсолютный или относительно текущего каталога).
+
+    Returns:
+        bool: True, если путь не выходит за пределы базовой директории.
+    """
+    return _contains(base_dir, os.path.abspath(path))
+
+
 def sanitize_and_resolve_path(base_dir: str, user_path: str, filename: str) -> str:
     """
     Формирует безопасный абсолютный путь к файлу, предотвращая выход за пределы базовой директории.
@@ -90,9 +131,9 @@ def sanitize_and_resolve_path(base_dir: str, user_path: str, filename: str) -> s
     cleaned_path = clean_path(user_path)   # теперь включает транслит папок
     cleaned_filename = sanitize_filename(filename)
 
-    full_path = os.path.abspath(os.path.join(base_dir, cleaned_path, cleaned_filename))
+    full_path = os.path.normpath(os.path.join(_absolute_base(base_dir)[0], cleaned_path, cleaned_filename))
 
-    if not full_path.startswith(os.path.abspath(base_dir)):
+    if not _contains(base_dir, full_path):
         raise ValueError("Недопустимый путь: выход за пределы базовой директории")
 
     return full_path
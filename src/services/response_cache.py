@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.services.change_repository import FILES_CHANGED
+from src.services.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+        LRU-кэш в памяти процесса с ограничением числа записей и временем жизни.
+        Поколение — счётчик процесса с уникальным префиксом, поэтому ETag разных процессов не совпадают.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        self._generation = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self) -> str:
+        return f"{self._token}.{self._generation}"
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+            # Записи прошлых поколений больше не читаются — освобождаем память сразу
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+        Кэш в Redis (или совместимом сервере), общий для всех процессов приложения.
+        Поколение хранится там же и увеличивается INCR; записи старых поколений истекают по TTL.
+        Недоступность сервера не ломает запросы: чтение считается промахом, запись пропускается.
+    """
+
+    def __init__(self, url: str, ttl: float = 30.0, prefix: str = "files-cache:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any | None:
+        try:
+            raw = self._redis.get(self.prefix + key)
+        except self._errors:
+            logger.warning("Кэш Redis недоступен", exc_info=True)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        raw = dumps(value)
+        try:
+            self._redis.set(self.prefix + key, raw, px=int(self.ttl * 1000))
+        except self._errors:
+            logger.warning("Кэш Redis недоступен", exc_info=True)
+
+    def generation(self) -> str:
+        try:
+            return (self._redis.get(self.prefix + "generation") or b"0").decode()
+        except self._errors:
+            logger.warning("Кэш Redis недоступен", exc_info=True)
+            return ""
+
+    def bump(self):
+        try:
+            self._redis.incr(self.prefix + "generation")
+        except self._errors:
+            logger.warning("Не удалось сбросить кэш Redis", exc_info=True)
+
+
+class ResponseCache:
+    """
+        Кэш ответов чтения (страницы списка, карточки файлов) с инвалидацией по поколениям.
+
+        Ключ записи включает текущее поколение. Поколение увеличивается после фиксации любой
+        транзакции, изменившей записи о файлах (флаг FILES_CHANGED ставит журнал изменений,
+        через который проходят все изменения FileRepository, включая синхронизацию), — старые
+        записи просто перестают читаться. Увеличение строго после фиксации: иначе параллельный
+        запрос мог бы положить ещё не изменённые данные под новым поколением.
+
+        Атрибуты:
+            backend (MemoryBackend | RedisBackend | None): Хранилище; None — кэш выключен.
+    """
+
+    def __init__(self, backend: MemoryBackend | RedisBackend | None):
+        self.backend = backend
+        if backend is not None:
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+
+    def _after_commit(self, session: Session):
+        if session.info.pop(FILES_CHANGED, False):
+            self.backend.bump()
+
+    @staticmethod
+    def _after_rollback(session: Session):
+        session.info.pop(FILES_CHANGED, None)
+
+    @staticmethod
+    def _key(namespace: str, params: Any) -> str:
+        return namespace + ":" + hashlib.sha1(repr(params).encode()).hexdigest()
+
+    def get_or_set(self, namespace: str, params: Any, loader: Callable[[], Any]) -> Any:
+        """
+            Возвращает значение из кэша или вычисляет его через loader и сохраняет.
+
+            Args:
+                namespace (str): Вид данных (files, file, ...).
+                params (Any): Параметры запроса; ключ строится по их repr.
+                loader (Callable): Загрузка значения при промахе.
+        """
+        if self.backend is None:
+            return loader()
+        key = f"{self.backend.generation()}:{self._key(namespace, params)}"
+        value = self.backend.get(key)
+        if value is None:
+            value = loader()
+            self.backend.set(key, value)
+        return value
+
+    def etag(self, namespace: str, params: Any) -> str | None:
+        """
+            Возвращает слабый ETag ответа: он меняется вместе с поколением, поэтому совпадение
+            означает, что с момента выдачи ответа записи о файлах не менялись.
+        """
+        if self.backend is None:
+            return None
+        generation = self.backend.generation()
+        if not generation:
+            return None
+        return hashlib.sha1(f"{generation}:{self._key(namespace, params)}".encode()).hexdigest()
+
+
+def create_response_cache(backend: str, redis_url: str, ttl: float, max_entries: int) -> ResponseCache:
+    """
+        Создаёт кэш ответов по настройке CACHE_BACKEND (memory | redis | off).
+        Если пакет redis не установлен, используется кэш в памяти.
+    """
+    if backend == "off":
+        return ResponseCache(None)
+    if backend == "redis":
+        try:
+            return ResponseCache(RedisBackend(redis_url, ttl))
+        except ImportError:
+            logger.warning("Пакет redis не установлен, кэш ответов хранится в памяти процесса")
+    return ResponseCache(MemoryBackend(max_entries, ttl))
@@ -0,0 +1,235 @@
+import os
+import queue
+import re
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import translate
+
+from src.services.metrics import metrics
+from src.services.path_service import PATH_SEP
+from src.services.storage_manager import StorageManager
+
+# Строка обхода: (name, extension, path, size, mtime) — как у StorageManager.iter_storage
+ScanRow = tuple[str, str, str, int, float]
+
+
+def compile_patterns(patterns: str | list[str] | tuple[str, ...]) -> re.Pattern | None:
+    """
+        Собирает glob-шаблоны (fnmatch, с учётом регистра) в одно регулярное выражение.
+        Шаблон сравнивается с путём относительно корня хранилища; "*" захватывает и "/",
+        поэтому "*.log" находит файлы на любой глубине.
+
+        Args:
+            patterns (str | list[str]): Шаблоны списком или строкой через запятую.
+
+        Returns:
+            re.Pattern | None: Выражение или None, если шаблонов нет.
+    """
+    if isinstance(patterns, str):
+        patterns = patterns.split(",")
+    patterns = [pattern.strip().strip("/") for pattern in patterns if pattern.strip()]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{translate(pattern)})" for pattern in patterns))
+
+
+class StorageScanner:
+    """
+        Параллельный обход хранилища.
+
+        Верхние уровни дерева читаются в вызывающем потоке, пока подкаталогов меньше, чем
+        потоков; каждый найденный подкаталог становится отдельной задачей пула, которая обходит
+        своё поддерево через os.scandir (тип записи берётся из DirEntry без stat, stat файла
+        кэшируется в DirEntry). Результаты приходят пачками через ограниченную очередь,
+        поэтому память не растёт с размером хранилища, а медленный потребитель
+        притормаживает обход. Порядок строк не определён.
+
+        Файлы, не прошедшие фильтры (include/exclude/max_depth), для синхронизации не существуют:
+        covers() сообщает, попадает ли путь в область обхода, чтобы записи о пропущенных файлах
+        не считались удалёнными.
+
+        Атрибуты:
+            storage (StorageManager): Менеджер обходимого хранилища.
+            workers (int): Потоков обхода (1 — последовательный обход в вызывающем потоке).
+            include (re.Pattern | None): Если задан, в обход попадают только подходящие файлы.
+            exclude (re.Pattern | None): Пропускаемые файлы и каталоги (каталог — вместе с поддеревом).
+            max_depth (int | None): Максимальная глубина каталогов от корня хранилища (0 — только корень).
+            batch_size (int): Строк в пачке.
+    """
+
+    def __init__(self, storage: StorageManager, workers: int = 4, include: str | list[str] = (),
+                 exclude: str | list[str] = (), max_depth: int | None = None, batch_size: int = 1000):
+        self.storage = storage
+        self.workers = max(1, workers)
+        self.include = compile_patterns(include)
+        self.exclude = compile_patterns(exclude)
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _depth(relative_dir: str) -> int:
+        return relative_dir.count(PATH_SEP) + 1 if relative_dir else 0
+
+    @staticmethod
+    def _join(relative_dir: str, name: str) -> str:
+        return f"{relative_dir}{PATH_SEP}{name}" if relative_dir else name
+
+    def _dir_allowed(self, relative_dir: str, depth: int) -> bool:
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        return self.exclude is None or not self.exclude.fullmatch(relative_dir)
+
+    def _file_allowed(self, relative_path: str) -> bool:
+        if self.exclude is not None and self.exclude.fullmatch(relative_path):
+            return False
+        return self.include is None or self.include.fullmatch(relative_path) is not None
+
+    def _dir_covered(self, path: str) -> bool:
+        # Каталог в области обхода, если он не глубже max_depth и ни он, ни его предки не исключены
+        if not path:
+            return True
+        parts = path.split(PATH_SEP)
+        if self.max_depth is not None and len(parts) > self.max_depth:
+            return False
+        return self.exclude is None or not any(self.exclude.fullmatch(PATH_SEP.join(parts[:i]))
+                                               for i in range(1, len(parts) + 1))
+
+    def covers(self, path: str, filename: str) -> bool:
+        """
+            Проверяет, что файл filename в каталоге path входит в область обхода.
+        """
+        return self._dir_covered(path) and self._file_allowed(self._join(path, filename))
+
+    def _list_dir(self, relative_dir: str, abs_dir: str) -> tuple[list[ScanRow], list[tuple[str, str]]]:
+        """
+            Читает один каталог: файлы, прошедшие фильтры, и подкаталоги для дальнейшего обхода.
+        """
+        rows: list[ScanRow] = []
+        subdirs: list[tuple[str, str]] = []
+        child_depth = self._depth(relative_dir) + 1
+        try:
+            with metrics.span("walk"), os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not relative_dir and entry.name in self.storage.RESERVED_DIRS:
+                            continue
+                        child = self._join(relative_dir, entry.name)
+                        if self._dir_allowed(child, child_depth):
+                            subdirs.append((child, entry.path))
+                    elif entry.is_file() and not entry.name.startswith(self.storage.TEMP_PREFIX):
+                        if not self._file_allowed(self._join(relative_dir, entry.name)):
+                            continue
+                        entry_stat = entry.stat()
+                        name, extension = os.path.splitext(entry.name)
+                        rows.append((name, extension, relative_dir, entry_stat.st_size, entry_stat.st_mtime))
+        except (FileNotFoundError, NotADirectoryError):
+            # Каталог удалён во время обхода
+            pass
+        return rows, subdirs
+
+    def _walk(self, roots: list[tuple[str, str]], stopped: threading.Event | None = None) -> Iterator[list[ScanRow]]:
+        """
+            Обходит поддеревья roots в глубину и выдаёт строки пачками.
+        """
+        stack = list(roots)
+        batch: list[ScanRow] = []
+        while stack:
+            if stopped is not None and stopped.is_set():
+                return
+            rows, subdirs = self._list_dir(*stack.pop())
+            stack.extend(subdirs)
+            batch.extend(rows)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def scan(self, relative_dir: str = "") -> Iterator[list[ScanRow]]:
+        """
+            Обходит хранилище или поддерево и выдаёт найденные файлы пачками.
+
+            Args:
+                relative_dir (str): Поддерево для обхода ("" — всё хранилище).
+
+            Yields:
+                list[tuple]: Пачка строк (name, extension, path, size, mtime).
+        """
+        if not self._dir_covered(relative_dir):
+            return
+        roots = [(relative_dir, str(self.storage.base_dir / relative_dir))]
+        if self.workers == 1:
+            yield from self._walk(roots)
+            return
+
+        # Верхние уровни — в вызывающем потоке, пока поддеревьев меньше, чем потоков
+        batch: list[ScanRow] = []
+        while roots and len(roots) < self.workers:
+            next_level = []
+            for root in roots:
+                rows, subdirs = self._list_dir(*root)
+                batch.extend(rows)
+                next_level.extend(subdirs)
+            roots = next_level
+        for start in range(0, len(batch), self.batch_size):
+            yield batch[start:start + self.batch_size]
+        if roots:
+            yield from self._scan_parallel(roots)
+
+    def _scan_parallel(self, roots: list[tuple[str, str]]) -> Iterator[list[ScanRow]]:
+        results: queue.Queue = queue.Queue(maxsize=self.workers * 4)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            # Очередь ограничена: поток ждёт потребителя, но выходит, если обход прерван
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def walk(root: tuple[str, str]):
+            try:
+                for batch in self._walk([root], stopped):
+                    if not put(("rows", batch)):
+                        return
+                put(("done", None))
+            except BaseException as e:
+                put(("error", e))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan")
+        try:
+            for root in roots:
+                executor.submit(walk, root)
+            remaining = len(roots)
+            while remaining:
+                kind, payload = results.get()
+                if kind == "rows":
+                    yield payload
+                elif kind == "done":
+                    remaining -= 1
+                else:
+                    raise payload
+        finally:
+            # Потребитель остановился раньше (ошибка, отмена задачи): прекращаем обход
+            stopped.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_files(self, relative_dir: str = "") -> Iterator[ScanRow]:
+        """
+            То же, что scan, но по одной строке.
+        """
+        for batch in self.scan(relative_dir):
+            yield from batch
+
+
+def create_scanner(storage: StorageManager, workers: int, include: str, exclude: str, max_depth: int,
+                   batch_size: int = 1000) -> StorageScanner:
+    """
+        Создаёт сканер по настройкам SCAN_* (max_depth 0 — без ограничения глубины).
+    """
+    return StorageScanner(storage, workers=workers, include=include, exclude=exclude,
+                          max_depth=max_depth or None, batch_size=batch_size)
@@ -0,0 +1,83 @@
+import logging
+
+from sqlalchemy import inspect, text, BigInteger
+
+from src import db
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaUpgrade:
+    """
+        Доводит схему уже существующей базы до моделей.
+
+        db.create_all() создаёт только отсутствующие таблицы (вместе с их индексами) и не меняет
+        существующие, поэтому база, созданная предыдущей версией приложения, остаётся без новых
+        колонок и индексов. При запуске недостающие колонки добавляются через ALTER TABLE ... ADD COLUMN
+        (все колонки, появившиеся после первой версии, допускают NULL и заполняются синхронизацией
+        и фоновыми задачами), недостающие индексы создаются, а в PostgreSQL колонки, ставшие
+        BigInteger, расширяются с INTEGER до BIGINT (в SQLite INTEGER и так 64-битный).
+        Таблицы SQLite, которым модель задаёт sqlite_autoincrement, а база создана без AUTOINCREMENT,
+        пересоздаются с переносом строк (ALTER TABLE не меняет первичный ключ).
+    """
+    @staticmethod
+    def ensure():
+        """
+            Добавляет недостающие колонки и индексы существующих таблиц. Вызывается после
+            db.create_all(). Фиксирует транзакцию.
+        """
+        engine = db.engine
+        inspector = inspect(engine)
+        quote = engine.dialect.identifier_preparer.quote
+        with engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                if engine.dialect.name == "sqlite" and table.dialect_options["sqlite"]["autoincrement"]:
+                    SchemaUpgrade._ensure_sqlite_autoincrement(connection, table)
+                existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    current = existing.get(column.name)
+                    if current is None:
+                        if not column.nullable:
+                            # NOT NULL без значения по умолчанию к непустой таблице не добавить
+                            logger.error("Колонку %s.%s нужно добавить вручную", table.name, column.name)
+                            continue
+                        logger.info("Добавление колонки %s.%s", table.name, column.name)
+                        connection.execute(text(
+                            f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                            f"{column.type.compile(dialect=engine.dialect)}"
+                        ))
+                    elif (engine.dialect.name == "postgresql" and isinstance(column.type, BigInteger)
+                          and not isinstance(current["type"], BigInteger)):
+                        logger.info("Расширение колонки %s.%s до BIGINT", table.name, column.name)
+                        connection.execute(text(
+                            f"ALTER TABLE {quote(table.name)} ALTER COLUMN {quote(column.name)} TYPE BIGINT"
+                        ))
+                indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in indexes:
+                        logger.info("Создание индекса %s", index.name)
+                        index.create(connection)
+
+    @staticmethod
+    def _ensure_sqlite_autoincrement(connection, table):
+        """
+            Пересоздаёт таблицу SQLite с AUTOINCREMENT, если она была создана без него.
+        """
+        ddl = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+        ).scalar_one()
+        if "AUTOINCREMENT" in ddl.upper():
+            return
+        logger.info("Пересоздание таблицы %s с AUTOINCREMENT", table.name)
+        old_name = f"{table.name}_old"
+        columns = ", ".join(f'"{column.name}"' for column in table.columns)
+        connection.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old_name}"'))
+        for (index_name,) in connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+                {"name": old_name}).all():
+            connection.execute(text(f'DROP INDEX "{index_name}"'))
+        table.create(connection)
+        connection.execute(text(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{old_name}"'))
+        connection.execute(text(f'DROP TABLE "{old_name}"'))
@@ -0,0 +1,191 @@
+import logging
+
+from sqlalchemy import select, text, func, or_, and_, case, literal_column, cast, Float, table, column
+from unidecode import unidecode
+
+from src import db
+from src.models import FileRecord
+from src.services.serialization import format_row
+
+logger = logging.getLogger(__name__)
+
+# Документ поиска в PostgreSQL. Выражение должно совпадать с выражением GIN-индекса буква в букву,
+# иначе планировщик индекс не использует; все функции в нём IMMUTABLE
+PG_TSV = ("to_tsvector('simple'::regconfig, translate(name, '_-', '  ') || ' ' "
+          "|| translate(path, '/\\_-', '    ') || ' ' || coalesce(comment, ''))")
+
+PG_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_files_search_tsv ON files USING GIN (({PG_TSV}))",
+    "CREATE INDEX IF NOT EXISTS ix_files_name_trgm ON files USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_files_path_trgm ON files USING GIN (path gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_files_comment_trgm ON files USING GIN (comment gin_trgm_ops)",
+)
+
+# Внешний FTS5-индекс SQLite над таблицей files; триггеры держат его в согласии с любыми
+# записями в files, включая пакетные Core-запросы синхронизации
+SQLITE_FTS_TABLE = "files_fts"
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    "name, path, comment, content='files', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, path, comment) VALUES (new.id, new.name, new.path, new.comment); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, path, comment) "
+    "VALUES ('delete', old.id, old.name, old.path, old.comment); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE OF name, path, comment ON files BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, name, path, comment) "
+    "VALUES ('delete', old.id, old.name, old.path, old.comment); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, name, path, comment) VALUES (new.id, new.name, new.path, new.comment); "
+    "END",
+)
+
+# Триграммный токенизатор FTS5 не находит подстроки короче трёх символов
+SQLITE_MIN_TERM = 3
+
+
+class SearchIndex:
+    """
+        Полнотекстовый и нечёткий поиск по имени, пути и комментарию файлов.
+
+        PostgreSQL: tsvector (конфигурация simple) и триграммы pg_trgm, оба под GIN-индексами;
+        индексы по выражениям обновляются самой СУБД при любой записи в files.
+        SQLite: внешняя таблица FTS5 с триграммным токенизатором, которую поддерживают триггеры.
+        Остальные СУБД — поиск подстроки через ILIKE без индекса.
+
+        Запрос дополняется транслитерацией (имена файлов хранятся латиницей), результаты
+        ранжируются и отдаются страницами по ключу (rank, id).
+    """
+    @staticmethod
+    def ensure():
+        """
+            Создаёт структуры индекса, если их ещё нет. Для SQLite при первом создании
+            индекс заполняется по уже существующим записям. Фиксирует транзакцию.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            for statement in PG_DDL:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(text(statement))
+                except Exception:
+                    # Например, нет прав на CREATE EXTENSION: поиск работает, но без части индексов
+                    logger.warning("Не удалось создать поисковый индекс: %s", statement, exc_info=True)
+        elif dialect == "sqlite":
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": SQLITE_FTS_TABLE},
+            ).first()
+            for statement in SQLITE_DDL:
+                db.session.execute(text(statement))
+            if not exists:
+                db.session.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+
+    @staticmethod
+    def _variants(query: str) -> list[str]:
+        query = " ".join(query.split())
+        variants = [query]
+        transliterated = unidecode(query)
+        if transliterated and transliterated != query:
+            variants.append(transliterated)
+        return variants
+
+    @staticmethod
+    def _postgresql_match(variants: list[str]):
+        tsv = literal_column(PG_TSV)
+        tsquery = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), " or ".join(variants))
+        conditions = [tsv.op("@@")(tsquery)]
+        similarities = [func.ts_rank(tsv, tsquery)]
+        for variant in variants:
+            pattern = f"%{variant}%"
+            conditions += [
+                FileRecord.name.op("%")(variant),
+                FileRecord.name.ilike(pattern),
+                FileRecord.path.ilike(pattern),
+                FileRecord.comment.ilike(pattern),
+            ]
+            similarities += [
+                func.similarity(FileRecord.name, variant),
+                func.similarity(FileRecord.path, variant) * 0.5,
+                func.similarity(func.coalesce(FileRecord.comment, ""), variant) * 0.5,
+            ]
+        return or_(*conditions), cast(func.greatest(*similarities), Float(53)), None
+
+    @staticmethod
+    def _sqlite_match(variants: list[str]):
+        groups = []
+        for variant in variants:
+            terms = [term for term in variant.split() if len(term) >= SQLITE_MIN_TERM]
+            if terms:
+                groups.append(" ".join('"' + term.replace('"', '""') + '"' for term in terms))
+        if not groups:
+            return None
+        fts = literal_column(SQLITE_FTS_TABLE)
+        match = fts.op("MATCH")(" OR ".join(f"({group})" for group in groups))
+        # bm25: меньше — лучше; имя весит больше пути, путь — больше комментария
+        rank = -func.bm25(fts, 10.0, 2.0, 1.0)
+        return match, rank, table(SQLITE_FTS_TABLE, column("rowid"))
+
+    @staticmethod
+    def _like_match(variants: list[str]):
+        conditions = []
+        name_hits = []
+        for variant in variants:
+            pattern = f"%{variant}%"
+            conditions += [FileRecord.name.ilike(pattern), FileRecord.path.ilike(pattern),
+                           FileRecord.comment.ilike(pattern)]
+            name_hits.append(FileRecord.name.ilike(pattern))
+        return or_(*conditions), case((or_(*name_hits), 1.0), else_=0.5), None
+
+    @staticmethod
+    def search(query: str, fields: tuple[str, ...], limit: int = 100,
+               after: list | None = None) -> tuple[list[dict], list | None]:
+        """
+            Ищет файлы и возвращает страницу, упорядоченную по убыванию релевантности.
+
+            Args:
+                query (str): Поисковая строка.
+                fields (tuple[str, ...]): Колонки FileRecord, которые попадут в ответ.
+                limit (int): Размер страницы.
+                after (list | None): Ключ (rank, id) последней строки предыдущей страницы.
+
+            Returns:
+                tuple[list[dict], list | None]: Строки страницы (с полем rank) и ключ следующей страницы.
+        """
+        variants = SearchIndex._variants(query)
+        dialect = db.session.get_bind().dialect.name
+        matched = None
+        if dialect == "postgresql":
+            matched = SearchIndex._postgresql_match(variants)
+        elif dialect == "sqlite":
+            matched = SearchIndex._sqlite_match(variants)
+        condition, rank, fts = matched or SearchIndex._like_match(variants)
+
+        ranked = select(FileRecord.id.label("id"), rank.label("rank"))
+        if fts is not None:
+            ranked = ranked.select_from(fts).join(FileRecord, fts.c.rowid == FileRecord.id)
+        ranked = ranked.where(condition).subquery()
+
+        columns = [getattr(FileRecord, name) for name in fields if name != "id"]
+        stmt = select(*columns, ranked.c.id, ranked.c.rank).join(ranked, ranked.c.id == FileRecord.id)
+        if after is not None:
+            after_rank, after_id = after
+            stmt = stmt.where(or_(ranked.c.rank < after_rank,
+                                  and_(ranked.c.rank == after_rank, ranked.c.id > after_id)))
+        stmt = stmt.order_by(ranked.c.rank.desc(), ranked.c.id.asc()).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = [rows[-1].rank, rows[-1].id]
+        items = []
+        for row in rows:
+            mapping = row._mapping
+            item = format_row(mapping, fields)
+            item["rank"] = mapping["rank"]
+            items.append(item)
+        return items, next_key
@@ -0,0 +1,96 @@
+import json
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Необязательная зависимость: без неё используется стандартный json
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """
+        Кодирует объект в компактный JSON (UTF-8). Даты — в ISO 8601.
+        Использует orjson, если он установлен.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def format_row(row: Mapping, fields: Iterable[str]) -> dict:
+    """
+        Собирает словарь из строки Core-запроса (row._mapping), приводя даты к ISO 8601 —
+        так же, как FileRecord.to_dict().
+    """
+    item = {}
+    for name in fields:
+        value = row[name]
+        item[name] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+
+def iter_ndjson(items: Iterable, batch_size: int = 256) -> Iterator[bytes]:
+    """
+        Генератор NDJSON: один объект на строку. Строки отдаются пачками по batch_size,
+        чтобы не создавать по фрагменту ответа на каждую запись.
+    """
+    batch = []
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= batch_size:
+            yield b"\n".join(batch) + b"\n"
+            batch.clear()
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def iter_json_array(items: Iterable, key: str = "items", batch_size: int = 256) -> Iterator[bytes]:
+    """
+        Генератор JSON-документа {"<key>": [...]}: открывающая часть уходит клиенту сразу,
+        элементы — пачками по мере чтения из базы.
+    """
+    yield b'{"' + key.encode() + b'":['
+    first = True
+    batch = []
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= batch_size:
+            yield (b"" if first else b",") + b",".join(batch)
+            first = False
+            batch.clear()
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]}\n"
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+        JSON-провайдер Flask: даты в ISO 8601 (а не в формате HTTP-даты, как по умолчанию)
+        и кодирование через orjson, если он установлен. Используется всеми jsonify().
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs:
+            return dumps(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
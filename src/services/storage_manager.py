@@ -1,9 +1,194 @@
 from pathlib import Path
+import hashlib
+import json
 import os
+import stat
+import tempfile
+import uuid
+from collections.abc import Iterator
 from datetime import datetime, timezone
-from src.services.path_service import sanitize_and_resolve_path, clean_path, sanitize_filename
+from src.services.path_service import sanitize_and_resolve_path, clean_path, sanitize_filename, is_within, PATH_SEP
+from src.services.compression import CompressionPolicy, SUFFIXES, open_writer
+from src.services.metrics import metrics
 from src.models import FileRecord
 
+try:
+    import fcntl
+except ImportError:
+    # Windows: записи журнала не блокируются, восстановление должно выполняться до запуска других процессов
+    fcntl = None
+
+
+class PartialWriteError(Exception):
+    """
+        Выбрасывается, когда чтение входного потока прервалось посреди записи части.
+        Исходная ошибка доступна через __cause__.
+
+        Атрибуты:
+            written (int): Сколько байт успели записать до обрыва.
+    """
+
+    def __init__(self, written: int):
+        super().__init__(f"Запись прервана после {written} байт.")
+        self.written = written
+
+
+class _NullWriter:
+    """
+        Приёмник для _copy_stream, когда нужен только хэш и размер.
+    """
+
+    @staticmethod
+    def write(data) -> int:
+        return len(data)
+
+
+class _HeadStream:
+    """
+        Поток, который сначала отдаёт уже прочитанное начало, затем — остаток исходного потока.
+    """
+
+    def __init__(self, head: bytes, stream):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            data = self._head if size < 0 else self._head[:size]
+            self._head = self._head[len(data):]
+            return data
+        return self._stream.read(size)
+
+
+class StagedWriter:
+    """
+        Загрузка, которая пишется во временный файл по мере приёма блоков (StorageManager.open_stage),
+        а не чтением потока, как в stage_stream: каталог, сжатие и SHA-256 — те же, что у stage_stream.
+
+        Блоки передаются в write, конец тела — close(); если приём прервался, close(error) удаляет
+        временный файл. Итог (результат stage_stream) возвращает result.
+    """
+
+    def __init__(self, storage: "StorageManager", meta: dict, fsync: bool = False):
+        self.storage = storage
+        self.meta = meta
+        self.fsync = fsync
+        self.size = 0
+        self.error: BaseException | None = None
+        self._hasher = hashlib.sha256()
+        self._head = bytearray()
+        self._out = None
+        self._writer = None
+        self._tmp_path: str | None = None
+        self._encoding: str | None = None
+        self._storage_key: str | None = None
+        self._staged: dict | None = None
+
+    def write(self, data: bytes):
+        self._hasher.update(data)
+        self.size += len(data)
+        if self._out is None:
+            compression = self.storage.compression
+            self._head += data
+            if compression is not None and len(self._head) < compression.sample_size:
+                # Кодировка выбирается по началу файла, как в stage_stream
+                return
+            self._open(complete=False)
+            data, self._head = bytes(self._head), bytearray()
+        self._write(data)
+
+    def _write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[self._writer.write(view):]
+
+    def _open(self, complete: bool):
+        compression = self.storage.compression
+        if compression is not None:
+            self._encoding = compression.choose(self.meta["extension"], bytes(self._head[:compression.sample_size]),
+                                                complete)
+        save_dir, self._storage_key = self.storage._stage_dir(self.meta, self._encoding)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=self.storage.TEMP_PREFIX, dir=save_dir)
+        self._out = os.fdopen(fd, "wb", buffering=0 if self._encoding is None else -1)
+        self._writer = self._out if self._encoding is None else \
+            open_writer(self._encoding, self._out, self.storage.compression.level)
+
+    def close(self, error: BaseException | None = None):
+        """
+            Завершает запись: без error файл дописывается и готов к публикации, иначе удаляется.
+        """
+        self.error = error
+        try:
+            if error is None and self._out is None:
+                self._open(complete=True)
+                self._write(bytes(self._head))
+            if self._out is not None:
+                with metrics.span("save"):
+                    if self._writer is not self._out:
+                        self._writer.close()
+                    self._out.flush()
+                    stored_size = self._out.tell()
+                    if self.fsync and error is None:
+                        os.fsync(self._out.fileno())
+        except BaseException as e:
+            self.error = self.error or e
+        finally:
+            if self._out is not None:
+                self._out.close()
+        if self.error is not None:
+            if self._tmp_path is not None:
+                os.unlink(self._tmp_path)
+            return
+        self._staged = self.storage._staged(self.meta, self._tmp_path, self.size, self._hasher.hexdigest(),
+                                            self._storage_key, self._encoding, stored_size)
+
+    def result(self) -> dict:
+        """
+            Returns:
+                dict: То же, что возвращает stage_stream.
+            Raises:
+                Ошибку, с которой был прерван приём (close(error)).
+        """
+        if self.error is not None:
+            raise self.error
+        return self._staged
+
+
+class SessionPartWriter:
+    """
+        Часть сессии возобновляемой загрузки, которая пишется через pwrite с заданного смещения
+        по мере приёма блоков (StorageManager.open_session_part).
+
+        Атрибуты:
+            written (int): Сколько байт записано.
+            error (BaseException | None): Ошибка, с которой был прерван приём (close(error)).
+    """
+
+    def __init__(self, session_id: str, path: Path, offset: int, limit: int):
+        self.session_id = session_id
+        self.offset = offset
+        self.limit = limit
+        self.written = 0
+        self.error: BaseException | None = None
+        self._fd = os.open(path, os.O_WRONLY)
+
+    def write(self, data: bytes):
+        """
+            Raises:
+                ValueError: Если в части больше данных, чем помещается в файл.
+        """
+        if self.written + len(data) > self.limit:
+            raise ValueError("Часть выходит за пределы заявленного размера файла.")
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(self._fd, view, self.offset + self.written)
+            view = view[n:]
+            self.written += n
+
+    def close(self, error: BaseException | None = None):
+        self.error = error
+        os.close(self._fd)
+
 
 class StorageManager:
     """
@@ -12,12 +197,415 @@ class StorageManager:
 
         Атрибуты:
             base_dir (Path): Абсолютный путь к корневой директории хранилища.
+            mode (str): Режим хранения новых файлов (plain | cas | sharded).
+            compression (CompressionPolicy | None): Политика сжатия новых файлов (None — не сжимать).
         """
+    # Префикс временных файлов незавершённых загрузок; такие файлы не попадают в сканирование
+    TEMP_PREFIX = ".upload-"
+    # Служебные каталоги в корне хранилища, которые не являются пользовательскими файлами
+    UPLOAD_SESSIONS_DIR = ".uploads"
+    BLOBS_DIR = ".blobs"
+    OBJECTS_DIR = ".objects"
+    JOURNAL_DIR = ".journal"
+    RESERVED_DIRS = frozenset({UPLOAD_SESSIONS_DIR, BLOBS_DIR, OBJECTS_DIR, JOURNAL_DIR})
+    # Режимы хранения: plain — файл лежит по своему пути; cas — содержимое хранится один раз
+    # в каталоге .blobs по SHA-256, а запись ссылается на него через storage_key; sharded — каждый
+    # файл лежит отдельным объектом в .objects/ab/cd/ (два уровня по 256 каталогов), чтобы тысячи
+    # файлов одного логического каталога не собирались в одном каталоге на диске
+    MODES = ("plain", "cas", "sharded")
 
-    def __init__(self, base_dir: str | Path):
+    def __init__(self, base_dir: str | Path, mode: str = "plain", compression: CompressionPolicy | None = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим хранения: {mode}")
         self.base_dir = Path(base_dir).resolve()
+        self.mode = mode
+        self.compression = compression
+        # Дескрипторы записей журнала и ролей процесса, заблокированных этим процессом
+        self._journal_locks: dict[Path, int] = {}
+        self._role_locks: dict[str, int] = {}
         os.makedirs(self.base_dir, exist_ok=True)
 
+    def physical_path(self, file: FileRecord) -> Path:
+        """
+            Возвращает абсолютный путь к содержимому файла на диске.
+
+            Для записей со storage_key содержимое лежит в служебном каталоге хранилища,
+            для остальных — по логическому пути записи. Сжатое содержимое (encoding) всегда
+            хранится под storage_key.
+        """
+        if file.storage_key:
+            return self.base_dir / file.storage_key
+        return self.base_dir / file.path / (file.name + file.extension)
+
+    @staticmethod
+    def blob_key(digest: str, encoding: str | None = None) -> str:
+        """
+            Возвращает storage_key блоба по SHA-256: .blobs/ab/cd/<digest>; у сжатых блобов —
+            с суффиксом кодировки, чтобы записи с одинаковым содержимым, но разной кодировкой
+            не ссылались на один блоб.
+        """
+        return f"{StorageManager.BLOBS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{SUFFIXES.get(encoding, '')}"
+
+    @classmethod
+    def is_blob_key(cls, storage_key: str | None) -> bool:
+        """
+            Проверяет, указывает ли storage_key на общий блоб дедуплицированного хранилища.
+        """
+        return bool(storage_key) and storage_key.startswith(cls.BLOBS_DIR + "/")
+
+    @staticmethod
+    def object_key(encoding: str | None = None) -> str:
+        """
+            Возвращает новый storage_key объекта шардированной раскладки: .objects/ab/cd/<uuid>
+            (у сжатых — с суффиксом кодировки). Каталоги выбираются по случайному имени,
+            поэтому файлы распределяются по ним равномерно.
+        """
+        name = uuid.uuid4().hex
+        return f"{StorageManager.OBJECTS_DIR}/{name[:2]}/{name[2:4]}/{name}{SUFFIXES.get(encoding, '')}"
+
+    @classmethod
+    def is_object_key(cls, storage_key: str | None) -> bool:
+        """
+            Проверяет, указывает ли storage_key на объект шардированной раскладки (содержимое
+            принадлежит одной записи).
+        """
+        return bool(storage_key) and storage_key.startswith(cls.OBJECTS_DIR + "/")
+
+    def remove_blob(self, storage_key: str):
+        """
+            Удаляет содержимое по storage_key: блоб, на который больше не ссылается ни одна запись,
+            или объект шардированной раскладки.
+        """
+        with metrics.span("unlink"):
+            (self.base_dir / storage_key).unlink(missing_ok=True)
+
+    @property
+    def sync_lock_key(self) -> str:
+        """
+            Ключ блокировки синхронизации: одна синхронизация на корень хранилища.
+        """
+        return f"sync:{self.base_dir}"
+
+    def prepare_upload(self, original_filename: str, name_input: str, user_path: str) -> dict:
+        """
+            Вычисляет очищенные имя, расширение и относительный путь будущего файла, ничего не записывая.
+
+            Args:
+                original_filename (str): исходное имя файла клиента.
+                name_input (str): имя файла, введённое пользователем (может содержать расширение).
+                user_path (str): относительный путь в хранилище (например, '/docs').
+
+            Returns:
+                dict: {"name": str, "extension": str, "path": str}
+        """
+        original_name, original_ext = os.path.splitext(os.path.basename(original_filename.strip()))
+        users_filename, users_file_ext = os.path.splitext(name_input.strip())
+        raw_name = users_filename or original_name
+        return {
+            "name": sanitize_filename(raw_name),
+            "extension": users_file_ext or original_ext,
+            "path": clean_path(user_path),
+        }
+
+    def save_stream(self, stream, meta: dict, chunk_size: int = 1 << 20, fsync: bool = False) -> dict:
+        """
+            Потоково записывает содержимое в хранилище за один проход (stage_stream + place).
+
+            Returns:
+                dict: meta, дополненный ключами "size" (int), "sha256" (str), "mtime" (float),
+                "storage_key" (str | None), "encoding" (str | None), "stored_size" (int | None).
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        staged = self.stage_stream(stream, meta, chunk_size, fsync)
+        try:
+            return self.place(staged)
+        except BaseException:
+            self.discard(staged)
+            raise
+
+    def stage_stream(self, stream, meta: dict, chunk_size: int = 1 << 20, fsync: bool = False) -> dict:
+        """
+            Записывает поток во временный файл, не публикуя его в хранилище.
+
+            Данные читаются блоками фиксированного размера в заранее выделенный буфер,
+            пишутся во временный файл (в целевом каталоге, в .blobs для режима cas или в каталоге
+            будущего объекта для режима sharded) и одновременно хэшируются (SHA-256).
+
+            Если задана политика сжатия, по началу потока выбирается кодировка; сжатый файл
+            записывается в объект (или блоб в режиме cas), хэш и размер считаются по исходным байтам.
+
+            Args:
+                stream: бинарный поток с методом read (или readinto).
+                meta (dict): результат prepare_upload.
+                chunk_size (int): размер блока чтения в байтах.
+                fsync (bool): сбрасывать данные на диск перед публикацией.
+
+            Returns:
+                dict: meta, дополненный ключами "size", "sha256", "storage_key" (ключ блоба в режиме cas,
+                ключ объекта в режиме sharded или для сжатого файла, иначе None), "encoding",
+                "stored_size" (для сжатого файла, иначе None) и "tmp_path".
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        encoding = None
+        if self.compression is not None:
+            head = self._read_head(stream, self.compression.sample_size)
+            encoding = self.compression.choose(meta["extension"], head, len(head) < self.compression.sample_size)
+            stream = _HeadStream(head, stream)
+
+        save_dir, storage_key = self._stage_dir(meta, encoding)
+        fd, tmp_path = tempfile.mkstemp(prefix=self.TEMP_PREFIX, dir=save_dir)
+        try:
+            # Сжимающий поток пишет мелкими порциями — через буфер; несжатые блоки пишутся как есть
+            with metrics.span("save"), os.fdopen(fd, "wb", buffering=0 if encoding is None else -1) as out:
+                if encoding is None:
+                    size, digest = self._copy_stream(stream, out, chunk_size)
+                else:
+                    with open_writer(encoding, out, self.compression.level) as writer:
+                        size, digest = self._copy_stream(stream, writer, chunk_size)
+                out.flush()
+                stored_size = out.tell()
+                if fsync:
+                    os.fsync(out.fileno())
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self._staged(meta, tmp_path, size, digest, storage_key, encoding, stored_size)
+
+    def open_stage(self, meta: dict, fsync: bool = False) -> StagedWriter:
+        """
+            Открывает загрузку, блоки которой передаются по мере приёма (вместо потока для stage_stream).
+
+            Args:
+                meta (dict): результат prepare_upload.
+                fsync (bool): сбрасывать данные на диск перед публикацией.
+        """
+        return StagedWriter(self, meta, fsync)
+
+    def _stage_dir(self, meta: dict, encoding: str | None) -> tuple[Path, str | None]:
+        """
+            Возвращает каталог временного файла загрузки (тот, где файл будет опубликован)
+            и storage_key объекта, если файл хранится не по логическому пути.
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        storage_key = None
+        if self.mode == "cas":
+            save_dir = self.base_dir / self.BLOBS_DIR
+        elif self.mode == "sharded" or encoding:
+            if self.mode == "plain":
+                self._target_path(meta)
+            storage_key = self.object_key(encoding)
+            save_dir = (self.base_dir / storage_key).parent
+        else:
+            save_dir = self._target_path(meta).parent
+        save_dir.mkdir(parents=True, exist_ok=True)
+        return save_dir, storage_key
+
+    @staticmethod
+    def _read_head(stream, size: int) -> bytes:
+        chunks = []
+        while size > 0 and (data := stream.read(size)):
+            chunks.append(data)
+            size -= len(data)
+        return b"".join(chunks)
+
+    def _target_path(self, meta: dict) -> Path:
+        """
+            Возвращает логический путь будущего файла и проверяет, что он свободен.
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        full_path = self.base_dir / meta["path"] / f"{meta['name']}{meta['extension']}"
+        if full_path.exists():
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+        return full_path
+
+    def _staged(self, meta: dict, tmp_path: str, size: int, digest: str, storage_key: str | None = None,
+                encoding: str | None = None, stored_size: int | None = None) -> dict:
+        return {
+            **meta,
+            "size": size,
+            "sha256": digest,
+            "storage_key": self.blob_key(digest, encoding) if self.mode == "cas" else storage_key,
+            "encoding": encoding,
+            "stored_size": stored_size if encoding else None,
+            "tmp_path": tmp_path,
+        }
+
+    def place(self, staged: dict) -> dict:
+        """
+            Публикует подготовленный файл атомарным переименованием: в блоб (cas), в объект
+            (sharded) или по логическому пути (plain). Если блоб с таким хэшем уже есть,
+            временный файл удаляется — содержимое хранится один раз.
+
+            В режиме cas вызывающий код должен удерживать блокировку строки блоба
+            (BlobRepository.acquire), чтобы параллельное удаление не стёрло блоб.
+
+            Returns:
+                dict: staged без "tmp_path", дополненный ключом "mtime".
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        saved = {k: v for k, v in staged.items() if k != "tmp_path"}
+        if staged["storage_key"]:
+            target = self.base_dir / staged["storage_key"]
+            if target.exists():
+                with metrics.span("unlink"):
+                    os.unlink(staged["tmp_path"])
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with metrics.span("rename"):
+                    os.replace(staged["tmp_path"], target)
+        else:
+            target = self._target_path(staged)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with metrics.span("rename"):
+                os.replace(staged["tmp_path"], target)
+        with metrics.span("stat"):
+            saved["mtime"] = target.stat().st_mtime
+        return saved
+
+    @staticmethod
+    def discard(staged: dict):
+        """
+            Удаляет временный файл неопубликованной загрузки.
+        """
+        if os.path.exists(staged["tmp_path"]):
+            with metrics.span("unlink"):
+                os.unlink(staged["tmp_path"])
+
+    @staticmethod
+    def _copy_stream(stream, out, chunk_size: int) -> tuple[int, str]:
+        """
+            Копирует поток в файл, считая размер и SHA-256 в том же проходе.
+
+            Returns:
+                tuple[int, str]: (количество байт, hex-дайджест SHA-256)
+        """
+        hasher = hashlib.sha256()
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        readinto = getattr(stream, "readinto", None)
+        size = 0
+        while True:
+            if readinto is not None:
+                n = readinto(buffer)
+                chunk = view[:n] if n else None
+            else:
+                data = stream.read(chunk_size)
+                n = len(data)
+                chunk = data
+            if not n:
+                break
+            hasher.update(chunk)
+            written = 0
+            while written < n:
+                written += out.write(chunk[written:])
+            size += n
+        return size, hasher.hexdigest()
+
+    def _session_file(self, session_id: str) -> Path:
+        return self.base_dir / self.UPLOAD_SESSIONS_DIR / f"{session_id}.part"
+
+    def create_session_file(self, session_id: str, length: int):
+        """
+            Создаёт файл данных сессии возобновляемой загрузки заданной длины (разреженный, где поддерживается).
+        """
+        part_path = self._session_file(session_id)
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(part_path, "wb") as f:
+            f.truncate(length)
+
+    def write_session_part(self, session_id: str, offset: int, stream, limit: int,
+                           chunk_size: int = 1 << 20) -> int:
+        """
+            Записывает часть сессии с указанного смещения через pwrite, не затрагивая остальные
+            диапазоны, поэтому части одной сессии можно принимать параллельно.
+
+            Args:
+                session_id (str): Идентификатор сессии.
+                offset (int): Смещение начала части в файле.
+                stream: Бинарный поток с данными части.
+                limit (int): Максимум байт, которые можно записать (до конца файла).
+                chunk_size (int): Размер блока чтения.
+
+            Returns:
+                int: Количество записанных байт.
+
+            Raises:
+                ValueError: Если в потоке больше данных, чем помещается в файл.
+                PartialWriteError: Если чтение потока прервалось (например, обрыв соединения).
+        """
+        part = self.open_session_part(session_id, offset, limit)
+        try:
+            with metrics.span("save"):
+                while True:
+                    try:
+                        chunk = stream.read(chunk_size)
+                    except Exception as e:
+                        raise PartialWriteError(part.written) from e
+                    if not chunk:
+                        break
+                    part.write(chunk)
+        finally:
+            part.close()
+        return part.written
+
+    def open_session_part(self, session_id: str, offset: int, limit: int) -> SessionPartWriter:
+        """
+            Открывает часть сессии, блоки которой передаются по мере приёма (вместо потока
+            для write_session_part); limit — максимум байт до конца файла.
+        """
+        return SessionPartWriter(session_id, self._session_file(session_id), offset, limit)
+
+    def stage_session_file(self, session_id: str, meta: dict, chunk_size: int = 1 << 20,
+                           fsync: bool = False) -> dict:
+        """
+            Хэширует собранный файл сессии и готовит его к публикации через place.
+
+            Если политика сжатия выбирает для файла кодировку, публикуется сжатая копия,
+            а сам файл сессии остаётся — его удаляет вызывающий код (discard_session_file).
+
+            Args:
+                session_id (str): Идентификатор сессии.
+                meta (dict): {"name", "extension", "path"} будущего файла.
+
+            Returns:
+                dict: meta, дополненный ключами "size", "sha256", "storage_key", "encoding",
+                "stored_size", "tmp_path".
+
+            Raises:
+                ValueError: Если файл с таким именем уже лежит в каталоге.
+        """
+        part_path = self._session_file(session_id)
+        if self.compression is not None:
+            with open(part_path, "rb") as f:
+                head = self._read_head(f, self.compression.sample_size)
+                if self.compression.choose(meta["extension"], head, len(head) < self.compression.sample_size):
+                    f.seek(0)
+                    return self.stage_stream(f, meta, chunk_size, fsync)
+        with open(part_path, "rb") as f:
+            size, digest = self._copy_stream(f, _NullWriter(), chunk_size)
+            if fsync:
+                os.fsync(f.fileno())
+        if self.mode == "plain":
+            self._target_path(meta)
+        storage_key = self.object_key() if self.mode == "sharded" else None
+        return self._staged(meta, str(part_path), size, digest, storage_key)
+
+    def discard_session_file(self, session_id: str):
+        """
+            Удаляет файл данных сессии, если он есть.
+        """
+        self._session_file(session_id).unlink(missing_ok=True)
+
     def save_uploaded_file(self, uploaded_file, name_input: str, user_path: str) -> dict:
         """
             Сохраняет загруженный файл в файловое хранилище и возвращает метаданные.
@@ -32,29 +620,31 @@ class StorageManager:
                     - "name" (str): очищенное имя файла без расширения,
                     - "extension" (str): расширение с точкой,
                     - "size" (int): размер файла в байтах,
-                    - "path" (str): относительный путь к каталогу хранения.
+                    - "path" (str): относительный путь к каталогу хранения,
+                    - "sha256" (str): хэш содержимого,
+                    - "mtime" (float): время модификации сохранённого файла,
+                    - "storage_key" (str | None): ключ блоба в режиме cas или объекта в режиме sharded.
             """
-        original_filename = uploaded_file.filename.strip()
-        original_name, original_ext = os.path.splitext(original_filename)
-        users_filename, users_file_ext = os.path.splitext(name_input.strip())
-        raw_name = users_filename or original_name
-        name = sanitize_filename(raw_name)
-        extension = users_file_ext or original_ext
-        relative_path = clean_path(user_path)
-        save_dir = self.base_dir / relative_path
-        save_dir.mkdir(parents=True, exist_ok=True)
-        full_filename = f"{name}{extension}"
-        full_path = save_dir / full_filename
-        uploaded_file.save(str(full_path))
-        size = os.path.getsize(full_path)
-        return {
-            "name": name,
-            "extension": extension,
-            "size": size,
-            "path": relative_path
-        }
+        meta = self.prepare_upload(uploaded_file.filename, name_input, user_path)
+        return self.save_stream(uploaded_file.stream, meta)
+
+    def resolve_move(self, new_name: str, new_user_path: str) -> tuple[str, str]:
+        """
+            Вычисляет очищенные имя и относительный путь для перемещения, ничего не меняя на диске.
+
+            Returns:
+                tuple[str, str]: (name, path)
+            Raises:
+                ValueError: Если имя пустое после очистки или путь выходит за пределы хранилища.
+        """
+        name = sanitize_filename(new_name or "")
+        if not name:
+            raise ValueError("Некорректное имя файла.")
+        path = clean_path(new_user_path or "")
+        sanitize_and_resolve_path(str(self.base_dir), path, name)
+        return name, path
 
-    def move_file(self, file: FileRecord, new_name: str, new_user_path: str) -> str:
+    def move_file(self, file: FileRecord, new_name: str, new_user_path: str) -> tuple[str, str]:
         """
             Перемещает файл на новое место, включая переименование.
 
@@ -64,23 +654,250 @@ class StorageManager:
                 new_user_path (str): Новый относительный путь внутри хранилища.
 
             Returns:
-                str: Новый относительный путь к файлу.
+                tuple[str, str]: Очищенные новое имя и относительный путь к файлу.
+            Raises:
+                ValueError: Если имя некорректно или по новому пути уже лежит файл.
             """
-        old_filename = file.name + file.extension
-        new_filename = new_name + file.extension
-        old_relative_path = file.path
-        new_relative_path = clean_path(new_user_path)
-        old_abs_path = self.base_dir / old_relative_path / old_filename
-        if new_relative_path == old_relative_path and new_name == file.name:
-            return old_relative_path
-        new_abs_path = Path(sanitize_and_resolve_path(str(self.base_dir), new_relative_path, new_filename))
+        name, path = self.resolve_move(new_name, new_user_path)
+        if not file.storage_key:
+            # Для записей со storage_key содержимое лежит отдельно: перемещение — только смена метаданных
+            self.rename_file(file.path, file.name + file.extension, path, name + file.extension)
+        return name, path
+
+    def rename_file(self, old_path: str, old_filename: str, new_path: str, new_filename: str):
+        """
+            Переименовывает файл внутри хранилища, не затирая существующий.
+
+            Raises:
+                ValueError: Если по новому пути уже лежит файл.
+        """
+        old_abs_path = self.base_dir / old_path / old_filename
+        new_abs_path = self.base_dir / new_path / new_filename
+        if old_abs_path == new_abs_path:
+            return
+        if new_abs_path.exists():
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+        new_abs_path.parent.mkdir(parents=True, exist_ok=True)
+        with metrics.span("rename"):
+            os.rename(old_abs_path, new_abs_path)
+
+    def relocate(self, source: str, target: str):
+        """
+            Переносит содержимое файла между двумя местами хранилища (логическим путём и объектом
+            шардированной раскладки) одним os.rename, не затирая существующий файл.
+
+            Args:
+                source (str): Исходный путь относительно корня хранилища.
+                target (str): Целевой путь относительно корня хранилища.
+
+            Raises:
+                ValueError: Если по целевому пути уже лежит файл.
+                FileNotFoundError: Если исходного файла нет.
+        """
+        target_path = self.base_dir / target
+        if target_path.exists():
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        with metrics.span("rename"):
+            os.rename(self.base_dir / source, target_path)
+
+    def stash_file(self, file_path: Path) -> Path | None:
+        """
+            Обратимо убирает файл file_path (см. physical_path) перед удалением записи:
+            переименовывает его во временное имя в том же каталоге (такие файлы не видны
+            сканированию). Окончательно файл удаляется drop_stash после фиксации транзакции,
+            при откате возвращается restore_stash.
+
+            Returns:
+                Path | None: Путь временного файла или None, если файла на диске уже нет.
+        """
+        stash_path = file_path.with_name(f"{self.TEMP_PREFIX}deleted-{uuid.uuid4().hex}")
+        try:
+            with metrics.span("rename"):
+                os.rename(file_path, stash_path)
+        except FileNotFoundError:
+            return None
+        return stash_path
+
+    @staticmethod
+    def restore_stash(stash_path: Path | None, file_path: Path):
+        """
+            Возвращает файл, убранный stash_file, на прежнее место file_path.
+        """
+        if stash_path is not None:
+            with metrics.span("rename"):
+                os.rename(stash_path, file_path)
+
+    @staticmethod
+    def drop_stash(stash_path: Path | None):
+        """
+            Окончательно удаляет файл, убранный stash_file.
+        """
+        if stash_path is not None:
+            with metrics.span("unlink"):
+                stash_path.unlink(missing_ok=True)
+
+    def resolve_directory(self, user_path: str) -> str:
+        """
+            Очищает путь каталога и проверяет, что он лежит внутри хранилища.
+
+            Returns:
+                str: Относительный путь каталога ("" — корень хранилища).
+            Raises:
+                ValueError: Если путь выходит за пределы хранилища.
+        """
+        path = clean_path(user_path or "")
+        if not is_within(str(self.base_dir), str(self.base_dir / path)):
+            raise ValueError("Недопустимый путь: выход за пределы базовой директории")
+        return path
+
+    def is_directory(self, relative_path: str) -> bool:
+        """
+            Проверяет, что по относительному пути лежит каталог.
+        """
+        return (self.base_dir / relative_path).is_dir()
+
+    def move_directory(self, old_path: str, new_path: str):
+        """
+            Переименовывает каталог целиком одним os.rename.
+
+            Raises:
+                ValueError: Если каталог назначения уже существует.
+        """
+        new_abs_path = self.base_dir / new_path
+        if new_abs_path.exists():
+            raise ValueError("Каталог назначения уже существует.")
         new_abs_path.parent.mkdir(parents=True, exist_ok=True)
-        os.rename(old_abs_path, new_abs_path)
-        return new_relative_path
+        with metrics.span("rename"):
+            os.rename(self.base_dir / old_path, new_abs_path)
+
+    def write_journal(self, entry: dict) -> Path:
+        """
+            Записывает на диск намерение многошаговой операции до её начала, чтобы после сбоя
+            её можно было довести до конца (см. read_journals). Запись атомарна: временный файл,
+            fsync и переименование.
+
+            До remove_journal запись удерживает эксклюзивную блокировку flock: пока операция
+            выполняется, другие процессы (воркеры uvicorn) не считают её прерванной. Блокировку
+            снимает ядро, если процесс-владелец завершился.
+
+            Returns:
+                Path: Путь записи журнала.
+        """
+        journal_dir = self.base_dir / self.JOURNAL_DIR
+        journal_dir.mkdir(exist_ok=True)
+        journal_path = journal_dir / f"{uuid.uuid4().hex}.json"
+        tmp_path = journal_dir / f"{self.TEMP_PREFIX}{journal_path.name}"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+            os.fsync(fd)
+            # Блокировка принадлежит файлу, а не имени, и переживает переименование
+            os.replace(tmp_path, journal_path)
+        except BaseException:
+            os.close(fd)
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self._journal_locks[journal_path] = fd
+        return journal_path
+
+    def read_journals(self) -> list[tuple[Path, dict]]:
+        """
+            Возвращает записи журнала операций, прерванных сбоем, в порядке их создания.
+
+            Записи, заблокированные выполняющейся операцией (в этом или другом процессе),
+            пропускаются. Возвращённые записи остаются заблокированными этим процессом
+            до remove_journal или release_journal, поэтому одну запись не восстановят дважды.
+
+            Returns:
+                list[tuple[Path, dict]]: (путь записи, содержимое).
+        """
+        journal_dir = self.base_dir / self.JOURNAL_DIR
+        if not journal_dir.is_dir():
+            return []
+        candidates = []
+        for journal_path in journal_dir.glob("*.json"):
+            try:
+                candidates.append((journal_path.stat().st_mtime, journal_path))
+            except FileNotFoundError:
+                continue
+        entries = []
+        for _, journal_path in sorted(candidates):
+            if journal_path in self._journal_locks:
+                continue
+            try:
+                fd = os.open(journal_path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # Запись могли восстановить и удалить, пока файл открывался
+                    if os.fstat(fd).st_ino != os.stat(journal_path).st_ino:
+                        raise FileNotFoundError(journal_path)
+                with os.fdopen(os.dup(fd), encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                # BlockingIOError — операция ещё выполняется
+                os.close(fd)
+                continue
+            self._journal_locks[journal_path] = fd
+            entries.append((journal_path, entry))
+        return entries
+
+    def remove_journal(self, journal_path: Path):
+        """
+            Удаляет запись журнала завершённой операции и снимает её блокировку.
+        """
+        journal_path.unlink(missing_ok=True)
+        self.release_journal(journal_path)
+
+    def release_journal(self, journal_path: Path):
+        """
+            Снимает блокировку записи журнала, не удаляя её (запись останется для восстановления).
+        """
+        fd = self._journal_locks.pop(journal_path, None)
+        if fd is not None:
+            os.close(fd)
+
+    def claim_role(self, role: str) -> bool:
+        """
+            Закрепляет за процессом роль, которую среди процессов одного хранилища должен
+            выполнять только один (например, наблюдатель): эксклюзивная блокировка flock файла
+            .journal/<role>.lock без ожидания. Роль освобождается release_role или завершением
+            процесса. Без fcntl (Windows) роль выдаётся всегда.
+
+            Returns:
+                bool: True, если роль закреплена за этим процессом.
+        """
+        if role in self._role_locks:
+            return True
+        journal_dir = self.base_dir / self.JOURNAL_DIR
+        journal_dir.mkdir(exist_ok=True)
+        fd = os.open(journal_dir / f"{role}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._role_locks[role] = fd
+        return True
+
+    def release_role(self, role: str):
+        """
+            Освобождает роль, закреплённую claim_role.
+        """
+        fd = self._role_locks.pop(role, None)
+        if fd is not None:
+            os.close(fd)
 
     def delete_file(self, file: FileRecord, *, silent_if_missing: bool = True) -> bool:
         """
-            Удаляет физический файл с диска.
+            Удаляет физический файл с диска (для записей со storage_key — их содержимое;
+            решение, можно ли удалять общий блоб, принимает вызывающий код).
 
                 Args:
                     file (FileRecord): Объект файла.
@@ -89,11 +906,11 @@ class StorageManager:
                 Returns:
                     bool: True если файл удалён или отсутствует, иначе False.
         """
-        filename = file.name + file.extension
-        file_path = self.base_dir / file.path / filename
+        file_path = self.physical_path(file)
         if file_path.is_file():
             try:
-                file_path.unlink()
+                with metrics.span("unlink"):
+                    file_path.unlink()
                 return True
             except Exception as e:
                 raise e
@@ -102,6 +919,86 @@ class StorageManager:
         else:
             raise FileNotFoundError(f"Файл {file_path} не найден.")
 
+    def is_internal(self, relative_path: str) -> bool:
+        """
+            Проверяет, относится ли путь к служебным данным хранилища
+            (служебный каталог в корне или временный файл загрузки).
+        """
+        parts = relative_path.replace("\\", "/").split("/")
+        return parts[0] in self.RESERVED_DIRS or parts[-1].startswith(self.TEMP_PREFIX)
+
+    def remove_path(self, relative_dir: str, filename: str):
+        """
+            Удаляет файл по относительному каталогу и имени, если он существует.
+        """
+        with metrics.span("unlink"):
+            (self.base_dir / relative_dir / filename).unlink(missing_ok=True)
+
+    def remove_empty_dirs(self, relative_dir: str, stop_at: str = ""):
+        """
+            Удаляет каталог relative_dir и его опустевших предков вплоть до stop_at (не включая его).
+            Непустые и отсутствующие каталоги оставляются как есть.
+        """
+        path, stop = Path(relative_dir), Path(stop_at)
+        while path != stop and path != Path():
+            try:
+                os.rmdir(self.base_dir / path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return
+            path = path.parent
+
+    def iter_storage(self, relative_dir: str = "") -> Iterator[tuple[str, str, str, int, float]]:
+        """
+            Потоково обходит хранилище через os.scandir, используя закэшированные данные stat
+            из DirEntry и собирая относительный путь из имён каталогов без Path.relative_to.
+
+            Args:
+                relative_dir (str): Поддерево для обхода (по умолчанию всё хранилище).
+
+            Yields:
+                tuple: (name, extension, path, size, mtime) для каждого файла.
+        """
+        stack = [(relative_dir, str(self.base_dir / relative_dir))]
+        while stack:
+            relative_dir, abs_dir = stack.pop()
+            # Каталог читается целиком до выдачи строк: замер walk не включает время потребителя
+            files = []
+            try:
+                with metrics.span("walk"), os.scandir(abs_dir) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not relative_dir and entry.name in self.RESERVED_DIRS:
+                                continue
+                            child = f"{relative_dir}{PATH_SEP}{entry.name}" if relative_dir else entry.name
+                            stack.append((child, entry.path))
+                        elif entry.is_file() and not entry.name.startswith(self.TEMP_PREFIX):
+                            files.append((entry.name, entry.stat()))
+            except (FileNotFoundError, NotADirectoryError):
+                # Каталог удалён во время обхода
+                continue
+            for filename, entry_stat in files:
+                name, extension = os.path.splitext(filename)
+                yield name, extension, relative_dir, entry_stat.st_size, entry_stat.st_mtime
+
+    def stat_file(self, relative_path: str) -> os.stat_result | None:
+        """
+            Возвращает stat обычного файла по относительному пути.
+
+            Returns:
+                os.stat_result | None: Результат stat или None, если файла нет
+                (или это каталог либо служебный файл хранилища).
+        """
+        if self.is_internal(relative_path):
+            return None
+        try:
+            with metrics.span("stat"):
+                result = os.stat(self.base_dir / relative_path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return result if stat.S_ISREG(result.st_mode) else None
+
     def scan_storage(self) -> list[dict]:
         """
             Сканирует файловую систему и возвращает список метаданных всех файлов в хранилище.
@@ -109,22 +1006,13 @@ class StorageManager:
             Returns:
                 list[dict]: Каждый словарь содержит name, extension, size, path, created_at.
         """
-        file_list = []
-        for dirpath, _, filenames in os.walk(self.base_dir):
-            for filename in filenames:
-                full_path = Path(dirpath) / filename
-                relative_dir = full_path.parent.relative_to(self.base_dir)
-                if str(relative_dir) in (".", '/', '\\'):
-                    relative_dir = ""
-                stat = full_path.stat()
-                size = stat.st_size
-                created_at = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
-                name, extension = os.path.splitext(filename)
-                file_list.append({
-                    "name": name,
-                    "extension": extension,
-                    "size": size,
-                    "path": str(relative_dir),
-                    "created_at": created_at,
-                })
-        return file_list
+        return [
+            {
+                "name": name,
+                "extension": extension,
+                "size": size,
+                "path": path,
+                "created_at": datetime.fromtimestamp(mtime, tz=timezone.utc),
+            }
+            for name, extension, path, size, mtime in self.iter_storage()
+        ]
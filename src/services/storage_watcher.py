@@ -0,0 +1,307 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from src.services.file_repository import FileRepository
+from src.services.job_manager import job_manager, JobConflictError
+from src.services.path_service import PATH_SEP
+from src.services.scanner import StorageScanner, create_scanner
+from src.services.storage_manager import StorageManager
+from src.services.sync_engine import StorageSyncEngine
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """
+        Источник событий на inotify (Linux). Рекурсивно ставит наблюдение на каждый каталог
+        хранилища и переводит события ядра в пары (kind, relative_path), где kind — 'file' или 'dir'.
+    """
+
+    def __init__(self, storage: StorageManager):
+        self.storage = storage
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+        self._watch_tree("")
+
+    @staticmethod
+    def is_supported() -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        libc_name = ctypes.util.find_library("c")
+        return libc_name is not None and hasattr(ctypes.CDLL(libc_name), "inotify_init1")
+
+    def _join(self, parent: str, name: str) -> str:
+        return f"{parent}{PATH_SEP}{name}" if parent else name
+
+    def _watch_tree(self, relative_dir: str):
+        stack = [relative_dir]
+        while stack:
+            current = stack.pop()
+            if current and self.storage.is_internal(current):
+                continue
+            abs_dir = str(self.storage.base_dir / current)
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(abs_dir), WATCH_MASK)
+            if wd < 0:
+                # Каталог успел исчезнуть — событие об этом придёт от родителя
+                continue
+            self._dirs[wd] = current
+            try:
+                with os.scandir(abs_dir) as entries:
+                    stack.extend(self._join(current, e.name) for e in entries if e.is_dir(follow_symlinks=False))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+    def _unwatch_tree(self, relative_dir: str):
+        prefix = relative_dir + PATH_SEP
+        for wd, path in list(self._dirs.items()):
+            if path == relative_dir or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    def read_events(self, timeout: float) -> list[tuple[str, str]]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # Очередь ядра переполнена — события потеряны, сверяем всё хранилище
+                events.append(("dir", ""))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+
+            path = self._join(parent, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path)
+                elif mask & IN_MOVED_FROM:
+                    self._unwatch_tree(path)
+                events.append(("dir", path))
+            else:
+                events.append(("file", path))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """
+        Резервный источник событий: периодически обходит хранилище и сравнивает
+        (size, mtime) файлов с предыдущим снимком. Работы с БД нет, пока нет изменений.
+    """
+
+    def __init__(self, storage: StorageManager, interval: float):
+        self.storage = storage
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _take_snapshot(self) -> dict[str, tuple[int, float]]:
+        return {
+            self._relative(name, extension, path): (size, mtime)
+            for name, extension, path, size, mtime in self.storage.iter_storage()
+        }
+
+    @staticmethod
+    def _relative(name: str, extension: str, path: str) -> str:
+        filename = name + extension
+        return f"{path}{PATH_SEP}{filename}" if path else filename
+
+    def read_events(self, timeout: float) -> list[tuple[str, str]]:
+        delay = self._next_poll - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+            if time.monotonic() < self._next_poll:
+                return []
+        self._next_poll = time.monotonic() + self.interval
+
+        previous, current = self._snapshot, self._take_snapshot()
+        self._snapshot = current
+        changed = [path for path, state in current.items() if previous.get(path) != state]
+        removed = [path for path in previous if path not in current]
+        return [("file", path) for path in changed + removed]
+
+    def close(self):
+        pass
+
+
+# Роль процесса, в котором работает наблюдатель (StorageManager.claim_role)
+WATCHER_ROLE = "watcher"
+
+
+class StorageWatcher:
+    """
+        Наблюдатель за хранилищем: собирает события файловой системы, схлопывает их
+        с задержкой (debounce) и передаёт пачкой в StorageSyncEngine.apply_changes,
+        так что таблица files обновляется за O(изменений), а полная синхронизация
+        нужна только как редкая сверка.
+
+        Атрибуты:
+            storage (StorageManager): Менеджер наблюдаемого хранилища.
+            debounce (float): Тишина в секундах, после которой накопленная пачка применяется.
+            max_delay (float): Максимальная задержка применения при непрерывном потоке событий.
+    """
+
+    def __init__(self, app, storage: StorageManager, backend: str = "auto", debounce: float = 1.0,
+                 poll_interval: float = 5.0, batch_size: int = 1000, scanner: StorageScanner | None = None):
+        self.app = app
+        self.storage = storage
+        self.debounce = debounce
+        self.max_delay = debounce * 10
+        self.engine = StorageSyncEngine(storage, FileRepository(), batch_size=batch_size, scanner=scanner)
+        self._backend_name = backend
+        self._poll_interval = poll_interval
+        self._backend = None
+        self._files: set[str] = set()
+        self._dirs: set[str] = set()
+        self._first_event: float | None = None
+        self._last_event: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _create_backend(self):
+        if self._backend_name in ("auto", "inotify") and InotifyBackend.is_supported():
+            return InotifyBackend(self.storage)
+        if self._backend_name == "inotify":
+            self.app.logger.warning("inotify недоступен, наблюдатель использует опрос")
+        return PollingBackend(self.storage, self._poll_interval)
+
+    def start(self):
+        """
+            Запускает наблюдение в фоновом потоке.
+        """
+        self._backend = self._create_backend()
+        self._thread = threading.Thread(target=self._loop, name="storage-watcher", daemon=True)
+        self._thread.start()
+        self.app.logger.info("Наблюдатель за хранилищем запущен (%s)", type(self._backend).__name__)
+
+    def stop(self):
+        """
+            Останавливает наблюдение и применяет накопленные изменения.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.storage.release_role(WATCHER_ROLE)
+
+    def _loop(self):
+        try:
+            while not self._stop.is_set():
+                for kind, path in self._backend.read_events(timeout=self.debounce / 2):
+                    self._add(kind, path)
+                if self._is_due():
+                    self._flush()
+            self._flush()
+        finally:
+            self._backend.close()
+
+    def _add(self, kind: str, path: str):
+        now = time.monotonic()
+        (self._dirs if kind == "dir" else self._files).add(path)
+        if self._first_event is None:
+            self._first_event = now
+        self._last_event = now
+
+    def _is_due(self) -> bool:
+        if self._first_event is None:
+            return False
+        now = time.monotonic()
+        return now - self._last_event >= self.debounce or now - self._first_event >= self.max_delay
+
+    def _flush(self):
+        if not self._files and not self._dirs:
+            return
+        try:
+            # Не пересекаемся с полной синхронизацией того же хранилища: отложим пачку
+            with job_manager.exclusive(self.storage.sync_lock_key):
+                with self.app.app_context():
+                    result = self.engine.apply_changes(self._files, self._dirs)
+        except JobConflictError:
+            self._first_event = self._last_event = time.monotonic()
+            return
+        except Exception:
+            self.app.logger.exception("Не удалось применить изменения хранилища")
+            self._first_event = self._last_event = time.monotonic()
+            return
+
+        self.app.logger.debug("Наблюдатель применил изменения: %s", result)
+        self._files, self._dirs = set(), set()
+        self._first_event = self._last_event = None
+
+
+def start_watcher(app) -> StorageWatcher | None:
+    """
+        Создаёт и запускает наблюдатель за хранилищем по настройкам приложения.
+
+        Наблюдатель работает в одном процессе на хранилище: при нескольких воркерах uvicorn
+        (SERVER_WORKERS) его запускает тот, кто первым закрепил роль; если этот воркер
+        перезапускается, роль достаётся процессу, стартовавшему следом.
+
+        Returns:
+            StorageWatcher | None: Запущенный наблюдатель или None, если он уже работает в другом процессе.
+    """
+    storage = StorageManager(app.config["STORAGE_PATH"])
+    if not storage.claim_role(WATCHER_ROLE):
+        app.logger.info("Наблюдатель за хранилищем уже запущен другим процессом")
+        return None
+    scanner = create_scanner(storage, app.config["SCAN_WORKERS"], app.config["SCAN_INCLUDE"],
+                             app.config["SCAN_EXCLUDE"], app.config["SCAN_MAX_DEPTH"],
+                             batch_size=app.config["SYNC_BATCH_SIZE"])
+    watcher = StorageWatcher(
+        app,
+        storage,
+        backend=app.config["WATCHER_BACKEND"],
+        debounce=app.config["WATCHER_DEBOUNCE"],
+        poll_interval=app.config["WATCHER_POLL_INTERVAL"],
+        batch_size=app.config["SYNC_BATCH_SIZE"],
+        scanner=scanner,
+    )
+    watcher.start()
+    return watcher
@@ -0,0 +1,201 @@
+import os
+from collections.abc import Callable, Iterable
+from datetime import datetime, UTC, timezone
+
+from src.services.storage_manager import StorageManager
+from src.services.file_repository import FileRepository
+from src.services.path_service import PATH_SEP
+from src.services.scanner import StorageScanner
+
+
+class StorageSyncEngine:
+    """
+        Инкрементальная синхронизация файлового хранилища с базой данных.
+
+        Потоково обходит хранилище (StorageScanner, параллельно по поддеревьям), сравнивает
+        каждый файл с лёгкой проекцией таблицы (name, extension, path) -> (id, size, mtime)
+        и накапливает изменения в пакеты, которые применяются executemany-запросами в одной транзакции.
+        Файлы вне области сканера (фильтры include/exclude/max_depth) не добавляются и не удаляются.
+
+        Атрибуты:
+            storage (StorageManager): Менеджер файлового хранилища.
+            repo (FileRepository): Репозиторий записей о файлах.
+            batch_size (int): Размер пакета вставок/обновлений.
+            scanner (StorageScanner): Обход хранилища (по умолчанию — последовательный, без фильтров).
+    """
+
+    def __init__(self, storage: StorageManager, repo: FileRepository, batch_size: int = 1000,
+                 scanner: StorageScanner | None = None):
+        self.storage = storage
+        self.repo = repo
+        self.batch_size = batch_size
+        self.scanner = scanner or StorageScanner(storage, workers=1, batch_size=batch_size)
+
+    def run(self, on_progress: Callable[..., None] | None = None, prefix: str = "") -> dict:
+        """
+            Выполняет синхронизацию всего хранилища или поддерева.
+
+            Args:
+                on_progress (Callable | None): Вызывается после каждого пакета со счётчиками
+                    processed, added, updated (и removed в конце). Исключение из колбэка
+                    (например, отмена задачи) откатывает транзакцию.
+                prefix (str): Относительный путь поддерева ("" — всё хранилище).
+
+            Returns:
+                dict: {"added": int, "removed": int, "updated": int}
+        """
+        try:
+            result = self._reconcile(prefix, on_progress)
+            self.repo.commit()
+        except Exception:
+            self.repo.rollback()
+            raise
+        return result
+
+    def apply_changes(self, files: Iterable[str], dirs: Iterable[str]) -> dict:
+        """
+            Применяет пакет изменений, накопленных наблюдателем за хранилищем, в одной транзакции.
+
+            Для каждого файла сверяет запись в БД с текущим состоянием на диске,
+            каждый каталог сверяется целиком (как поддерево). Файлы внутри изменённых
+            каталогов отдельно не обрабатываются. Служебные пути хранилища пропускаются.
+
+            Args:
+                files (Iterable[str]): Относительные пути изменённых файлов.
+                dirs (Iterable[str]): Относительные пути изменённых каталогов.
+
+            Returns:
+                dict: {"added": int, "removed": int, "updated": int}
+        """
+        roots = self._collapse_dirs(d for d in dirs if not self.storage.is_internal(d))
+        files = [
+            f for f in set(files)
+            if not self.storage.is_internal(f) and not any(self._is_within(f, root) for root in roots)
+        ]
+        totals = {"added": 0, "removed": 0, "updated": 0}
+        try:
+            for root in roots:
+                self._accumulate(totals, self._reconcile(root))
+            self._accumulate(totals, self._reconcile_files(files))
+            self.repo.commit()
+        except Exception:
+            self.repo.rollback()
+            raise
+        return totals
+
+    def _reconcile(self, prefix: str, on_progress: Callable[..., None] | None = None) -> dict:
+        index = self.repo.get_sync_index(prefix)
+        processed = 0
+        added = 0
+        updated = 0
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        now = datetime.now(UTC)
+
+        for name, extension, path, size, mtime in self.scanner.iter_files(prefix):
+            processed += 1
+            known = index.pop((name, extension, path), None)
+            if known is None:
+                inserts.append(self._insert_row(name, extension, path, size, mtime))
+                added += 1
+            elif self._is_changed(known, size, mtime):
+                if self._counts_as_update(known, size):
+                    updated += 1
+                updates.append({"b_id": known[0], "b_size": size, "b_mtime": mtime, "b_updated_at": now})
+
+            if len(inserts) >= self.batch_size:
+                self.repo.bulk_insert(inserts)
+                inserts = []
+            if len(updates) >= self.batch_size:
+                self.repo.bulk_update_stats(updates)
+                updates = []
+            if on_progress is not None and processed % self.batch_size == 0:
+                on_progress(processed=processed, added=added, updated=updated)
+
+        self.repo.bulk_insert(inserts)
+        self.repo.bulk_update_stats(updates)
+        # Всё, что осталось в проекции и входит в область сканера, на диске не найдено
+        removed_ids = [
+            file_id for (name, extension, path), (file_id, _, _) in index.items()
+            if self.scanner.covers(path, name + extension)
+        ]
+        self.repo.bulk_delete(removed_ids)
+        if on_progress is not None:
+            on_progress(processed=processed, added=added, updated=updated, removed=len(removed_ids))
+
+        return {"added": added, "removed": len(removed_ids), "updated": updated}
+
+    def _reconcile_files(self, files: list[str]) -> dict:
+        keys = {}
+        for relative_path in files:
+            directory, filename = os.path.split(relative_path)
+            if not self.scanner.covers(directory, filename):
+                continue
+            name, extension = os.path.splitext(filename)
+            keys[(name, extension, directory)] = relative_path
+
+        known_entries = self.repo.get_sync_entries(list(keys))
+        inserts: list[dict] = []
+        updates: list[dict] = []
+        removed_ids: list[int] = []
+        updated = 0
+        now = datetime.now(UTC)
+
+        for key, relative_path in keys.items():
+            file_stat = self.storage.stat_file(relative_path)
+            known = known_entries.get(key)
+            if file_stat is None:
+                if known is not None:
+                    removed_ids.append(known[0])
+            elif known is None:
+                inserts.append(self._insert_row(*key, file_stat.st_size, file_stat.st_mtime))
+            elif self._is_changed(known, file_stat.st_size, file_stat.st_mtime):
+                if self._counts_as_update(known, file_stat.st_size):
+                    updated += 1
+                updates.append({"b_id": known[0], "b_size": file_stat.st_size,
+                                "b_mtime": file_stat.st_mtime, "b_updated_at": now})
+
+        self.repo.bulk_insert(inserts)
+        self.repo.bulk_update_stats(updates)
+        self.repo.bulk_delete(removed_ids)
+        return {"added": len(inserts), "removed": len(removed_ids), "updated": updated}
+
+    @staticmethod
+    def _insert_row(name: str, extension: str, path: str, size: int, mtime: float) -> dict:
+        return {
+            "name": name,
+            "extension": extension,
+            "size": size,
+            "path": path,
+            "created_at": datetime.fromtimestamp(mtime, tz=timezone.utc),
+            "mtime": mtime,
+        }
+
+    @staticmethod
+    def _is_changed(known: tuple, size: int, mtime: float) -> bool:
+        _, known_size, known_mtime = known
+        return known_size != size or known_mtime != mtime
+
+    @staticmethod
+    def _counts_as_update(known: tuple, size: int) -> bool:
+        # Записи без mtime (загруженные до его появления) дозаполняются молча
+        _, known_size, known_mtime = known
+        return known_size != size or known_mtime is not None
+
+    @staticmethod
+    def _is_within(path: str, root: str) -> bool:
+        return root == "" or path == root or path.startswith(root + PATH_SEP)
+
+    @classmethod
+    def _collapse_dirs(cls, dirs: Iterable[str]) -> list[str]:
+        # Оставляет только самые верхние каталоги: вложенные сверяются вместе с родителем
+        roots: list[str] = []
+        for directory in sorted(set(dirs), key=len):
+            if not any(cls._is_within(directory, root) for root in roots):
+                roots.append(directory)
+        return roots
+
+    @staticmethod
+    def _accumulate(totals: dict, result: dict):
+        for key, value in result.items():
+            totals[key] += value
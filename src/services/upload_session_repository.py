@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from sqlalchemy import select, delete
+
+from src import db
+from src.models import UploadSession, UploadPart
+
+
+class UploadSessionRepository:
+    """
+        Репозиторий сессий возобновляемой загрузки и принятых частей.
+    """
+    @staticmethod
+    def create(session_id: str, name: str, extension: str, path: str, comment: str | None, length: int,
+               expires_at: datetime) -> UploadSession:
+        """
+            Создаёт сессию загрузки.
+
+            Returns:
+                UploadSession: Созданная сессия.
+        """
+        session = UploadSession(id=session_id, name=name, extension=extension, path=path, comment=comment,
+                                length=length, expires_at=expires_at)
+        db.session.add(session)
+        db.session.commit()
+        return session
+
+    @staticmethod
+    def get_or_404(session_id: str) -> UploadSession:
+        """
+            Возвращает сессию по ID или выбрасывает 404.
+        """
+        return db.get_or_404(UploadSession, session_id)
+
+    @staticmethod
+    def add_part(session_id: str, start: int, end: int):
+        """
+            Фиксирует принятый диапазон байт [start, end). Только вставка — без гонок между частями.
+        """
+        db.session.add(UploadPart(session_id=session_id, start=start, end=end))
+        db.session.commit()
+
+    @staticmethod
+    def get_ranges(session_id: str) -> list[tuple[int, int]]:
+        """
+            Возвращает принятые диапазоны сессии, слитые в непересекающиеся отрезки по возрастанию.
+        """
+        stmt = select(UploadPart.start, UploadPart.end).where(UploadPart.session_id == session_id) \
+            .order_by(UploadPart.start)
+        merged: list[tuple[int, int]] = []
+        for start, end in db.session.execute(stmt):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def delete(session: UploadSession):
+        """
+            Удаляет сессию вместе с её частями.
+        """
+        db.session.execute(delete(UploadPart).where(UploadPart.session_id == session.id))
+        db.session.delete(session)
+        db.session.commit()
+
+    @staticmethod
+    def get_expired(now: datetime) -> list[UploadSession]:
+        """
+            Возвращает сессии, срок жизни которых истёк.
+        """
+        return list(db.session.scalars(select(UploadSession).where(UploadSession.expires_at < now)))
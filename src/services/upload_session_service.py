@@ -0,0 +1,212 @@
+import uuid
+from datetime import datetime, UTC, timedelta
+
+from src.config import Config
+from src.models import FileRecord, UploadSession
+from src.services.file_service import FileService
+from src.services.metrics import metrics
+from src.services.storage_manager import PartialWriteError, SessionPartWriter
+from src.services.upload_session_repository import UploadSessionRepository
+
+
+class UploadIncompleteError(ValueError):
+    """
+        Выбрасывается при попытке завершить сессию, в которой получены не все байты.
+
+        Атрибуты:
+            missing (list[tuple[int, int]]): Недостающие диапазоны [start, end).
+    """
+
+    def __init__(self, missing: list[tuple[int, int]]):
+        super().__init__("Получены не все части файла.")
+        self.missing = missing
+
+
+class UploadSessionService:
+    """
+        Возобновляемая загрузка файлов по частям (в стиле tus).
+
+        Данные сессии пишутся в служебный каталог хранилища, принятые диапазоны сохраняются в БД,
+        поэтому загрузку можно продолжить после обрыва соединения или перезапуска сервера.
+        Части могут приходить параллельно и в любом порядке. Завершение сессии создаёт обычную
+        запись FileRecord с той же проверкой дубликатов и очисткой имени/пути, что и upload_file.
+    """
+
+    def __init__(self, file_service: FileService):
+        self.file_service = file_service
+        self.storage = file_service.storage
+        self.repo = file_service.repo
+        self.sessions = UploadSessionRepository()
+
+    def create_session(self, filename: str, path: str, length: int, comment: str = "") -> UploadSession:
+        """
+            Открывает сессию загрузки.
+
+            Returns:
+                UploadSession: Новая сессия.
+            Raises:
+                ValueError: Если данные некорректны или файл с таким именем уже есть.
+        """
+        if length < 0:
+            raise ValueError("Размер файла не может быть отрицательным.")
+        meta = self.storage.prepare_upload(filename, filename, path)
+        if not meta["name"]:
+            raise ValueError("Некорректное имя файла.")
+        if self.repo.exists(meta["name"], meta["extension"], meta["path"]):
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+
+        self.purge_expired()
+        session_id = uuid.uuid4().hex
+        self.storage.create_session_file(session_id, length)
+        expires_at = datetime.now(UTC) + timedelta(seconds=Config.UPLOAD_SESSION_TTL)
+        return self.sessions.create(session_id, comment=comment, length=length, expires_at=expires_at, **meta)
+
+    def write_part(self, session_id: str, offset: int, stream) -> int:
+        """
+            Принимает часть файла, начиная со смещения offset.
+
+            Если соединение оборвалось посреди части, принятый префикс всё равно фиксируется,
+            и клиент может продолжить с него.
+
+            Returns:
+                int: Непрерывно принятый от начала файла объём (Upload-Offset).
+            Raises:
+                ValueError: Если смещение или объём данных выходят за пределы файла.
+        """
+        session = self._part_session(session_id, offset)
+        try:
+            written = self.storage.write_session_part(session.id, offset, stream, session.length - offset,
+                                                      chunk_size=Config.UPLOAD_CHUNK_SIZE)
+        except PartialWriteError as e:
+            # Соединение оборвалось посреди части: принятый префикс сохраняется для возобновления
+            metrics.count_bytes("in", e.written)
+            if e.written:
+                self.sessions.add_part(session.id, offset, offset + e.written)
+            raise e.__cause__ or e
+        metrics.count_bytes("in", written)
+        if written:
+            self.sessions.add_part(session.id, offset, offset + written)
+        return self.contiguous_offset(session.id)
+
+    def open_part(self, session_id: str, offset: int) -> SessionPartWriter:
+        """
+            Открывает часть файла, тело которой передаётся блоками по мере приёма (асинхронный
+            сервер, см. views.open_upload_sink), а не потоком, как в write_part. Часть фиксирует store_part.
+
+            Raises:
+                ValueError: Если смещение выходит за пределы файла.
+        """
+        session = self._part_session(session_id, offset)
+        return self.storage.open_session_part(session.id, offset, session.length - offset)
+
+    def store_part(self, part: SessionPartWriter) -> int:
+        """
+            Фиксирует часть, открытую open_part. Как и в write_part, если соединение оборвалось
+            посреди части, принятый префикс сохраняется.
+
+            Returns:
+                int: Непрерывно принятый от начала файла объём (Upload-Offset).
+            Raises:
+                ValueError: Если объём данных вышел за пределы файла.
+                ClientDisconnected: Если клиент отключился посреди части.
+        """
+        if isinstance(part.error, ValueError):
+            raise part.error
+        metrics.count_bytes("in", part.written)
+        if part.written:
+            self.sessions.add_part(part.session_id, part.offset, part.offset + part.written)
+        if part.error is not None:
+            raise part.error
+        return self.contiguous_offset(part.session_id)
+
+    def _part_session(self, session_id: str, offset: int) -> UploadSession:
+        session = self.sessions.get_or_404(session_id)
+        if offset < 0 or offset > session.length:
+            raise ValueError("Смещение выходит за пределы файла.")
+        return session
+
+    def contiguous_offset(self, session_id: str) -> int:
+        """
+            Возвращает длину непрерывно принятого от начала файла участка.
+        """
+        return self._offset(self.sessions.get_ranges(session_id))
+
+    def get_status(self, session_id: str) -> dict:
+        """
+            Возвращает состояние сессии для JSON-сериализации.
+
+            Returns:
+                dict: id, name, extension, path, length, offset, received, missing, expires_at.
+        """
+        session = self.sessions.get_or_404(session_id)
+        ranges = self.sessions.get_ranges(session.id)
+        return {
+            "id": session.id,
+            "name": session.name,
+            "extension": session.extension,
+            "path": session.path,
+            "comment": session.comment,
+            "length": session.length,
+            "offset": self._offset(ranges),
+            "received": sum(end - start for start, end in ranges),
+            "missing": self._missing(ranges, session.length),
+            "expires_at": session.expires_at.isoformat(),
+        }
+
+    def finalize(self, session_id: str) -> FileRecord:
+        """
+            Собирает файл сессии в хранилище и создаёт запись о нём.
+
+            Returns:
+                FileRecord: Созданная запись.
+            Raises:
+                UploadIncompleteError: Если получены не все байты.
+                ValueError: Если файл с таким именем уже существует.
+        """
+        session = self.sessions.get_or_404(session_id)
+        missing = self._missing(self.sessions.get_ranges(session.id), session.length)
+        if missing:
+            raise UploadIncompleteError(missing)
+        if self.repo.exists(session.name, session.extension, session.path):
+            raise ValueError("Файл с таким именем уже существует по данному пути.")
+
+        meta = {"name": session.name, "extension": session.extension, "path": session.path}
+        staged = self.storage.stage_session_file(session.id, meta, chunk_size=Config.UPLOAD_CHUNK_SIZE,
+                                                 fsync=Config.UPLOAD_FSYNC)
+        file = self.file_service.store_staged(staged, session.comment)
+        # Файл сессии уже переименован в хранилище, если только не была опубликована его сжатая копия
+        self.storage.discard_session_file(session.id)
+        self.sessions.delete(session)
+        return file
+
+    def abort(self, session_id: str):
+        """
+            Отменяет сессию: удаляет её данные и записи.
+        """
+        session = self.sessions.get_or_404(session_id)
+        self.storage.discard_session_file(session.id)
+        self.sessions.delete(session)
+
+    def purge_expired(self):
+        """
+            Удаляет просроченные незавершённые сессии вместе с их данными.
+        """
+        for session in self.sessions.get_expired(datetime.now(UTC)):
+            self.storage.discard_session_file(session.id)
+            self.sessions.delete(session)
+
+    @staticmethod
+    def _offset(ranges: list[tuple[int, int]]) -> int:
+        return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+    @staticmethod
+    def _missing(ranges: list[tuple[int, int]], length: int) -> list[tuple[int, int]]:
+        missing = []
+        position = 0
+        for start, end in ranges:
+            if start > position:
+                missing.append((position, start))
+            position = max(position, end)
+        if position < length:
+            missing.append((position, length))
+        return missing
@@ -1,13 +1,13 @@
 import {
-fetchFiles,
 fetchFileDetail,
 updateFile,
-deleteFile as apiDeleteFile,
-actualizeFiles,
+batchFiles,
+startActualizeJob,
+waitForJob,
 uploadFile
 } from "./api.js";
 
-import { renderTable } from "./render.js";
+import { refreshFiles } from "./store.js";
 
 /**
 * let currentFileId = null;
@@ -40,6 +40,17 @@ export async function openFileDetails(fileId) {
     }
 }
 
+/**
+ * Удаляет файлы одним пакетным запросом.
+ * @param {Array<number|string>} fileIds - ID файлов
+ * @returns {Promise<Array<Object>>} Операции, которые не удалось выполнить
+ */
+export async function deleteFiles(fileIds) {
+    const data = await batchFiles(fileIds.map(id => ({ op: "delete", id: Number(id) })));
+    await refreshFiles();
+    return data.results.filter(r => r.status !== "ok");
+}
+
 /**
  * Удаляет файл с подтверждением.
  * @param {number} fileId - ID файла
@@ -49,9 +60,10 @@ export async function deleteFile(fileId) {
     if (!confirm("Удалить файл?")) return;
 
     try {
-        await apiDeleteFile(fileId);
-        const files = await fetchFiles();
-        renderTable(files, handlers);
+        const failed = await deleteFiles([fileId]);
+        if (failed.length) {
+            throw new Error(failed[0].message);
+        }
 
         // Закрываем модальное окно, если оно открыто
         const modalElement = document.getElementById("fileDetailModal");
@@ -82,9 +94,7 @@ export async function saveFileChanges() {
         }
 
         await updateFile(currentFileId, { name, path, comment });
-
-        const files = await fetchFiles();
-        renderTable(files, handlers);
+        await refreshFiles();
 
         bootstrap.Modal.getInstance(document.getElementById("fileDetailModal")).hide();
     } catch (error) {
@@ -99,12 +109,16 @@ export async function saveFileChanges() {
  */
 export async function actualize() {
     try {
-        const data = await actualizeFiles();
+        const started = await startActualizeJob();
+        const job = await waitForJob(started.id);
+        if (job.status !== "succeeded") {
+            throw new Error(job.error || `задача завершилась со статусом ${job.status}`);
+        }
+        const data = job.result;
 
-        alert(`Добавлено: ${data.added}, Удалено: ${data.removed}`);
-        if (data.added > 0 || data.removed > 0) {
-            const files = await fetchFiles();
-            renderTable(files, handlers);
+        alert(`Добавлено: ${data.added}, Удалено: ${data.removed}, Обновлено: ${data.updated}`);
+        if (data.added > 0 || data.removed > 0 || data.updated > 0) {
+            await refreshFiles();
         }
     } catch (error) {
         console.error("Ошибка при актуализации:", error);
@@ -134,10 +148,8 @@ uploadForm.addEventListener("submit", async (e) => {
         bootstrap.Modal.getInstance(uploadModal).hide();
         // Сбрасываем форму, очищая все поля
         uploadForm.reset();
-        // Получаем обновленный список файлов с сервера
-        const files = await fetchFiles();
-        // Перерисовываем таблицу с обновленными данными
-        renderTable(files, handlers);
+        // Получаем с сервера только изменения и перерисовываем таблицу
+        await refreshFiles();
     } catch (error) {
         // Логируем ошибку в консоль и показываем пользователю
         console.error(error);
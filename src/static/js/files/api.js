@@ -1,10 +1,52 @@
 /**
- * Получает список всех файлов с сервера.
+ * Максимальный размер страницы, который запрашивает клиент.
+ * @type {number}
+ */
+const PAGE_SIZE = 1000;
+
+/**
+ * Получает одну страницу списка файлов.
+ * @param {Object} [params] - Query-параметры (limit, cursor, fields, sort, path, ...)
+ * @returns {Promise<{items: Array<Object>, next_cursor: (string|null)}>} Страница файлов
+ */
+export async function fetchFilesPage(params = {}) {
+    const query = new URLSearchParams(params);
+    const response = await fetch(`/files?${query}`);
+    return await response.json();
+}
+
+/**
+ * Получает список всех файлов с сервера, проходя по страницам курсором.
  * @returns {Promise<Array<Object>>} Список файлов в формате JSON
  */
 export async function fetchFiles() {
-    const response = await fetch(`/files`);
-    return await response.json();
+    const files = [];
+    let cursor = null;
+    do {
+        const params = { limit: PAGE_SIZE };
+        if (cursor) params.cursor = cursor;
+        const page = await fetchFilesPage(params);
+        files.push(...page.items);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return files;
+}
+
+/**
+ * Получает изменения файлов после курсора.
+ * @param {string|null} [since] - Курсор из предыдущего ответа; без него сервер вернёт только текущий курсор
+ * @returns {Promise<{changes: Array<{seq: number, id: number, deleted: boolean, file: (Object|null)}>, cursor: string, has_more: boolean}>}
+ * @throws {Error} Если курсор отклонён сервером
+ */
+export async function fetchChanges(since = null) {
+    const query = new URLSearchParams({ limit: PAGE_SIZE });
+    if (since) query.set("since", since);
+    const response = await fetch(`/files/changes?${query}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.message || "Не удалось получить изменения");
+    }
+    return data;
 }
 
 /**
@@ -16,6 +58,25 @@ export async function deleteFile(id) {
     return await fetch(`/files/${id}/delete`, { method: 'DELETE' });
 }
 
+/**
+ * Выполняет пакет операций над файлами одним запросом.
+ * @param {Array<Object>} operations - Операции вида {op: "move"|"rename"|"delete"|"comment", id, ...}
+ * @returns {Promise<{results: Array<Object>, succeeded: number, failed: number}>} Результат по каждой операции
+ * @throws {Error} Если запрос отклонён целиком
+ */
+export async function batchFiles(operations) {
+    const response = await fetch(`/files/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ operations }),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.message || "Не удалось выполнить пакет операций");
+    }
+    return data;
+}
+
 /**
  * Получает подробную информацию о файле по ID.
  * @param {number} id - ID файла
@@ -52,6 +113,45 @@ export async function actualizeFiles() {
     return await response.json();
 }
 
+/**
+ * Запускает актуализацию фоновой задачей.
+ * @returns {Promise<Object>} Состояние созданной задачи
+ * @throws {Error} Если задача не запущена (например, синхронизация уже идёт)
+ */
+export async function startActualizeJob() {
+    const response = await fetch(`/jobs/actualize`, { method: "POST" });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.message || "Не удалось запустить актуализацию");
+    }
+    return data;
+}
+
+/**
+ * Получает состояние фоновой задачи.
+ * @param {string} id - ID задачи
+ * @returns {Promise<Object>} Статус, счётчики и результат задачи
+ */
+export async function fetchJob(id) {
+    const response = await fetch(`/jobs/${id}`);
+    return await response.json();
+}
+
+/**
+ * Ожидает завершения фоновой задачи, периодически опрашивая сервер.
+ * @param {string} id - ID задачи
+ * @param {number} [intervalMs=1000] - Интервал опроса
+ * @returns {Promise<Object>} Итоговое состояние задачи
+ */
+export async function waitForJob(id, intervalMs = 1000) {
+    let job = await fetchJob(id);
+    while (job.status === "pending" || job.status === "running") {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        job = await fetchJob(id);
+    }
+    return job;
+}
+
 /**
  * Загружает файл на сервер через форму.
  * @param {HTMLFormElement} formElement - Элемент формы с данными файла
@@ -1,5 +1,5 @@
-import { fetchFiles } from "./api.js";
 import { renderTable } from "./render.js";
+import { loadFiles, getFiles, onFilesChanged } from "./store.js";
 import { actualize, saveFileChanges, handlers } from "./actions.js";
 
 /**
@@ -15,10 +15,6 @@ document.addEventListener("DOMContentLoaded", async () => {
     const deleteBtn = document.getElementById("modal-delete-btn");
     const downloadBtn = document.getElementById("modal-download-btn");
 
-    // Загружаем все файлы и отрисовываем таблицу
-    let allFiles = await fetchFiles();
-    renderTable(allFiles, handlers);
-
     /**
      * Функция фильтрации и обновления таблицы по значениям поиска.
      * Выполняется при вводе в поля поиска имени и пути.
@@ -26,7 +22,7 @@ document.addEventListener("DOMContentLoaded", async () => {
     function applySearch() {
         const nameQuery = searchNameInput.value.toLowerCase();
         const pathQuery = searchPathInput.value.toLowerCase();
-        const filtered = allFiles.filter(file =>
+        const filtered = getFiles().filter(file =>
         file.name.toLowerCase().includes(nameQuery) &&
         file.path.toLowerCase().includes(pathQuery)
         );
@@ -36,11 +32,14 @@ document.addEventListener("DOMContentLoaded", async () => {
     searchNameInput.addEventListener("input", applySearch);
     searchPathInput.addEventListener("input", applySearch);
 
+    // Таблица перерисовывается после загрузки и каждого применённого обновления списка
+    onFilesChanged(applySearch);
+    await loadFiles();
+
     // Кнопка актуализации файлов (синхронизация с сервером)
     if (actualizeBtn) {
         actualizeBtn.addEventListener("click", async () => {
             await actualize();
-            allFiles = await fetchFiles(); // обновляем для поиска
         });
     }
 
@@ -48,7 +47,6 @@ document.addEventListener("DOMContentLoaded", async () => {
     if (saveBtn) {
         saveBtn.addEventListener("click", async () => {
             await saveFileChanges();
-            allFiles = await fetchFiles(); // чтобы после сохранения поиск по новым данным работал
         });
     }
 
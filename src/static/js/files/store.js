@@ -0,0 +1,89 @@
+import { fetchFiles, fetchChanges } from "./api.js";
+
+/**
+ * Локальная копия списка файлов: ID -> файл.
+ * @type {Map<number, Object>}
+ */
+const files = new Map();
+
+/**
+ * Курсор журнала изменений, до которого применена локальная копия.
+ * @type {string|null}
+ */
+let cursor = null;
+
+/**
+ * Подписчики, которые вызываются после изменения локальной копии.
+ * @type {Array<function(): void>}
+ */
+const listeners = [];
+
+/**
+ * Подписывает функцию на изменения списка файлов.
+ * @param {function(): void} listener - Вызывается после загрузки и каждого применённого обновления
+ */
+export function onFilesChanged(listener) {
+    listeners.push(listener);
+}
+
+function notify() {
+    listeners.forEach(listener => listener());
+}
+
+/**
+ * Возвращает файлы локальной копии в порядке сервера (путь, имя, ID).
+ * @returns {Array<Object>} Список файлов
+ */
+export function getFiles() {
+    return [...files.values()].sort((a, b) =>
+        a.path < b.path ? -1 : a.path > b.path ? 1 :
+        a.name < b.name ? -1 : a.name > b.name ? 1 :
+        a.id - b.id
+    );
+}
+
+/**
+ * Загружает полный список файлов. Курсор запрашивается до списка, поэтому изменения,
+ * случившиеся во время загрузки, будут получены следующим обновлением.
+ * @returns {Promise<void>}
+ */
+export async function loadFiles() {
+    cursor = (await fetchChanges()).cursor;
+    const items = await fetchFiles();
+    files.clear();
+    items.forEach(file => files.set(file.id, file));
+    notify();
+}
+
+/**
+ * Применяет к локальной копии только изменения с последнего курсора.
+ * Если курсор отклонён сервером, список загружается заново.
+ * @returns {Promise<void>}
+ */
+export async function refreshFiles() {
+    if (!cursor) {
+        await loadFiles();
+        return;
+    }
+    let changed = false;
+    let page;
+    try {
+        do {
+            page = await fetchChanges(cursor);
+            page.changes.forEach(change => {
+                if (change.deleted) {
+                    files.delete(change.id);
+                } else {
+                    files.set(change.id, change.file);
+                }
+            });
+            changed = changed || page.changes.length > 0;
+            cursor = page.cursor;
+        } while (page.has_more);
+    } catch (error) {
+        console.error("Ошибка при получении изменений, загружаем список заново:", error);
+        await loadFiles();
+        return;
+    }
+    if (changed) notify();
+}
@@ -1,13 +1,43 @@
+import os
 from datetime import datetime, UTC
 
-from flask import Blueprint, request, jsonify, render_template, send_file, abort
+from flask import Blueprint, request, jsonify, render_template, current_app, Response, stream_with_context
 from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
 
 from src.services.file_service import FileService
+from src.services.download_service import DownloadService, set_attachment_disposition
+from src.services.archive_service import ArchiveService
+from src.services.batch_service import BatchService
+from src.services.hashing import HashingEngine, Throttle
+from src.services.integrity_service import IntegrityService
+from src.services.duplicate_service import DuplicateService
+from src.services.response_cache import create_response_cache
+from src.services.serialization import iter_ndjson, iter_json_array
+from src.services.file_repository import SORT_KEYS
+from src.services.job_manager import job_manager, JobConflictError
+from src.services.asgi_adapter import UPLOAD_SINK
+from src.services.metrics import metrics
+from src.services.upload_session_service import UploadSessionService, UploadIncompleteError
+from src.services.path_service import clean_path
+from src.models import FileRecord
 from src.config import Config
 
 file_routes = Blueprint("file_routes", __name__)
-file_service = FileService(Config.STORAGE_PATH)
+response_cache = create_response_cache(Config.CACHE_BACKEND, Config.CACHE_REDIS_URL, Config.CACHE_TTL,
+                                       Config.CACHE_MAX_ENTRIES)
+file_service = FileService(Config.STORAGE_PATH, cache=response_cache)
+upload_session_service = UploadSessionService(file_service)
+download_service = DownloadService(file_service.storage, accel=Config.DOWNLOAD_ACCEL,
+                                   accel_prefix=Config.DOWNLOAD_ACCEL_PREFIX, chunk_size=Config.DOWNLOAD_CHUNK_SIZE)
+batch_service = BatchService(file_service, workers=Config.BATCH_WORKERS)
+archive_service = ArchiveService(file_service.storage, chunk_size=Config.ARCHIVE_CHUNK_SIZE)
+integrity_service = IntegrityService(file_service, HashingEngine(
+    workers=Config.HASH_WORKERS, buffer_size=Config.HASH_BUFFER_SIZE, use_mmap=Config.HASH_USE_MMAP,
+    throttle=Throttle(Config.SCRUB_RATE_LIMIT), drop_cache=True,
+))
+duplicate_service = DuplicateService(file_service, workers=Config.DUPLICATES_WORKERS,
+                                     block_size=Config.DUPLICATES_BLOCK_SIZE, buffer_size=Config.HASH_BUFFER_SIZE)
 
 
 @file_routes.route('/')
@@ -33,16 +63,186 @@ def ping():
     return jsonify({"status": "ok"})
 
 
+def _parse_datetime_arg(name: str) -> datetime | None:
+    """
+        Читает из query-параметров дату в формате ISO 8601.
+
+        Raises:
+            ValueError: Если дата указана в неверном формате.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть датой в формате ISO 8601.")
+
+
+def _parse_list_args() -> dict:
+    """
+        Разбирает и валидирует параметры запроса списка файлов.
+
+        Returns:
+            dict: аргументы для FileService.list_files.
+        Raises:
+            ValueError: Если параметры некорректны.
+    """
+    args = request.args
+
+    fields = tuple(f.strip() for f in args.get("fields", "").split(",") if f.strip()) or FileRecord.PUBLIC_FIELDS
+    unknown = set(fields) - set(FileRecord.PUBLIC_FIELDS)
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+
+    sort = args.get("sort", "path")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Недопустимая сортировка. Доступны: {', '.join(SORT_KEYS)}")
+    order = args.get("order", "asc").lower()
+    if order not in ("asc", "desc"):
+        raise ValueError("Параметр order должен быть asc или desc.")
+
+    try:
+        limit = int(args.get("limit", Config.FILES_PAGE_SIZE))
+        min_size = int(args["min_size"]) if args.get("min_size") else None
+        max_size = int(args["max_size"]) if args.get("max_size") else None
+    except ValueError:
+        raise ValueError("Параметры limit, min_size и max_size должны быть целыми числами.")
+    if limit < 1:
+        raise ValueError("Параметр limit должен быть положительным.")
+
+    extensions = [
+        ext if ext.startswith(".") else f".{ext}"
+        for ext in (e.strip() for e in args.get("extension", "").split(","))
+        if ext
+    ]
+
+    filters = {
+        "path": clean_path(args["path"]) if "path" in args else None,
+        "recursive": args.get("recursive", "true").lower() not in ("false", "0", "no", "off"),
+        "extensions": extensions,
+        "min_size": min_size,
+        "max_size": max_size,
+        "created_after": _parse_datetime_arg("created_after"),
+        "created_before": _parse_datetime_arg("created_before"),
+        "updated_after": _parse_datetime_arg("updated_after"),
+        "updated_before": _parse_datetime_arg("updated_before"),
+    }
+
+    return {
+        "fields": fields,
+        "filters": filters,
+        "sort": sort,
+        "descending": order == "desc",
+        "limit": min(limit, Config.FILES_PAGE_SIZE_MAX),
+        "cursor": args.get("cursor") or None,
+    }
+
+
 @file_routes.route("/files", methods=["GET"])
 def list_files():
     """
-        Возвращает список всех файлов, зарегистрированных в базе данных.
+        Возвращает страницу списка файлов, зарегистрированных в базе данных.
+
+        Query-параметры:
+        - limit (int): размер страницы (не больше FILES_PAGE_SIZE_MAX)
+        - cursor (str): курсор следующей страницы из предыдущего ответа
+        - fields (str): список полей через запятую (по умолчанию все)
+        - sort (str): path | name | size | created_at; order (str): asc | desc
+        - path (str): префикс пути; recursive (bool): включать вложенные директории
+        - extension (str): расширения через запятую
+        - min_size, max_size (int): диапазон размера в байтах
+        - created_after, created_before, updated_after, updated_before (ISO 8601): окно по датам
+        - stream (str, optional): ndjson | json — отдать все подходящие файлы одним потоковым
+          ответом без пагинации (limit и cursor игнорируются); ответ начинает уходить клиенту
+          до того, как запрос к базе дочитан до конца
+
+        Returns:
+            JSON: {"items": список словарей с информацией о файлах, "next_cursor": str | null}
+            NDJSON: по одному файлу на строку (stream=ndjson)
+            304: если слабый ETag из If-None-Match ещё актуален (записи не менялись)
+    """
+    try:
+        args = _parse_list_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    stream = request.args.get("stream")
+    if stream:
+        if stream not in ("ndjson", "json"):
+            return jsonify({"message": "Параметр stream должен быть ndjson или json."}), 400
+        rows = file_service.iter_files(args["fields"], args["filters"], args["sort"], args["descending"])
+        if stream == "ndjson":
+            return Response(stream_with_context(iter_ndjson(rows)), mimetype="application/x-ndjson")
+        return Response(stream_with_context(iter_json_array(rows)), mimetype="application/json")
+
+    etag = file_service.list_files_etag(**args)
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    try:
+        page = file_service.list_files(**args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    response = jsonify(page)
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@file_routes.route("/files/changes", methods=["GET"])
+def list_file_changes():
+    """
+        Возвращает изменения файлов после курсора (добавленные, изменённые и удалённые),
+        чтобы клиент обновлял свою копию списка за O(изменений), а не перечитывал его целиком.
+
+        Query-параметры:
+        - since (str, optional): курсор из предыдущего ответа; без него возвращается только
+          текущий курсор (запросить его до загрузки полного списка)
+        - limit (int): максимум изменений в ответе (не больше FILES_PAGE_SIZE_MAX)
+
+        Returns:
+            JSON: {"changes": [{"seq", "id", "deleted", "file"}], "cursor": str, "has_more": bool}
+    """
+    try:
+        limit = int(request.args.get("limit", Config.FILES_PAGE_SIZE_MAX))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"message": "Параметр limit должен быть положительным целым числом."}), 400
+    try:
+        page = file_service.get_changes(request.args.get("since"), min(limit, Config.FILES_PAGE_SIZE_MAX))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(page)
+
+
+@file_routes.route("/files/search", methods=["GET"])
+def search_files():
+    """
+        Ищет файлы по имени, пути и комментарию (полнотекстово и по подстроке)
+        и возвращает страницу результатов по убыванию релевантности.
+
+        Query-параметры:
+        - q (str): поисковая строка
+        - limit (int): размер страницы (не больше FILES_PAGE_SIZE_MAX)
+        - cursor (str): курсор следующей страницы из предыдущего ответа
+        - fields (str): список полей через запятую (по умолчанию все)
 
         Returns:
-            JSON: список словарей с информацией о файлах.
+            JSON: {"items": список файлов с полем rank, "next_cursor": str | null}
     """
-    files = file_service.get_all_files()
-    return jsonify([file.to_dict() for file in files])
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "Параметр q обязателен."}), 400
+    try:
+        args = _parse_list_args()
+        page = file_service.search_files(query, args["fields"], args["limit"], args["cursor"])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify(page)
 
 
 @file_routes.route("/files/<int:file_id>", methods=["GET"])
@@ -56,8 +256,7 @@ def get_file_detail(file_id: int):
         Returns:
             JSON: словарь с информацией о файле.
     """
-    file = file_service.get_file_detail(file_id)
-    return jsonify(file.to_dict())
+    return jsonify(file_service.get_file_info(file_id))
 
 
 @file_routes.route("/files/upload", methods=["POST"])
@@ -97,6 +296,199 @@ def upload_file():
         return jsonify({"message": "Ошибка при загрузке", "error": str(e)}), 500
 
 
+@file_routes.route("/files/upload/stream", methods=["POST", "PUT"])
+def upload_file_stream():
+    """
+        Потоковая загрузка файла: тело запроса — сырое содержимое файла.
+
+        Тело читается из request.stream блоками фиксированного размера без промежуточного
+        временного файла Werkzeug, SHA-256 и размер считаются в том же проходе.
+
+        Query-параметры:
+        - filename (str): имя файла (с расширением)
+        - path (str): относительный путь внутри хранилища
+        - comment (str, optional): комментарий к файлу
+
+        Returns:
+            JSON:
+                - 201: данные созданного файла
+                - 400: если файл уже существует или введены некорректные данные
+                - 500: внутренняя ошибка сервера
+    """
+    name_input = request.args.get("filename", "").strip()
+    path = request.args.get("path", "/").strip()
+    comment = request.args.get("comment", "").strip()
+
+    if not name_input:
+        return jsonify({"message": "Имя файла обязательно"}), 400
+
+    try:
+        upload = request.environ.get(UPLOAD_SINK)
+        if upload is not None:
+            # Асинхронный сервер уже записал тело по мере приёма (open_upload_sink)
+            file = file_service.store_upload(upload, comment, expected_size=request.content_length)
+        else:
+            file = file_service.upload_stream(request.stream, name_input, name_input, path, comment,
+                                              expected_size=request.content_length)
+        return jsonify(file.to_dict()), 201
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except IntegrityError:
+        return jsonify({"message": "Файл уже существует (на уровне базы)."}), 400
+    except Exception as e:
+        return jsonify({"message": "Ошибка при загрузке", "error": str(e)}), 500
+
+
+@file_routes.route("/uploads", methods=["POST"])
+def create_upload_session():
+    """
+        Открывает сессию возобновляемой загрузки.
+
+        Ожидает JSON с полями:
+        - filename (str): имя файла (с расширением)
+        - path (str): относительный путь внутри хранилища
+        - length (int): полный размер файла в байтах
+        - comment (str, optional): комментарий к файлу
+
+        Returns:
+            JSON:
+                - 201: состояние сессии (заголовки Location и Upload-Offset)
+                - 400: если данные некорректны или файл уже существует
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get("filename", "")).strip()
+    if not filename:
+        return jsonify({"message": "Имя файла обязательно"}), 400
+    try:
+        length = int(data.get("length"))
+    except (TypeError, ValueError):
+        return jsonify({"message": "Поле length должно быть целым числом"}), 400
+
+    try:
+        session = upload_session_service.create_session(
+            filename, str(data.get("path", "/")).strip(), length, str(data.get("comment", "")).strip()
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    response = jsonify(upload_session_service.get_status(session.id))
+    response.status_code = 201
+    response.headers["Location"] = f"/uploads/{session.id}"
+    response.headers["Upload-Offset"] = "0"
+    response.headers["Upload-Length"] = str(session.length)
+    return response
+
+
+@file_routes.route("/uploads/<session_id>", methods=["HEAD", "GET"])
+def get_upload_session(session_id: str):
+    """
+        Возвращает состояние сессии загрузки.
+
+        HEAD отдаёт только заголовки Upload-Offset (непрерывно принятый объём) и Upload-Length,
+        GET — JSON с принятыми и недостающими диапазонами.
+
+        Returns:
+            JSON: состояние сессии или 404
+    """
+    status = upload_session_service.get_status(session_id)
+    response = jsonify(status) if request.method == "GET" else current_app.response_class(status=200)
+    response.headers["Upload-Offset"] = str(status["offset"])
+    response.headers["Upload-Length"] = str(status["length"])
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@file_routes.route("/uploads/<session_id>", methods=["PATCH"])
+def upload_session_part(session_id: str):
+    """
+        Принимает часть файла. Тело запроса — сырые байты части.
+
+        Заголовки:
+        - Upload-Offset (int): смещение начала части в файле
+
+        Части одной сессии можно отправлять параллельно и в любом порядке.
+
+        Returns:
+                - 204: часть принята (заголовок Upload-Offset — непрерывно принятый объём)
+                - 400: если смещение некорректно или часть выходит за пределы файла
+    """
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return jsonify({"message": "Заголовок Upload-Offset обязателен"}), 400
+
+    try:
+        part = request.environ.get(UPLOAD_SINK)
+        if part is not None:
+            new_offset = upload_session_service.store_part(part)
+        else:
+            new_offset = upload_session_service.write_part(session_id, offset, request.stream)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    response = current_app.response_class(status=204)
+    response.headers["Upload-Offset"] = str(new_offset)
+    return response
+
+
+def open_upload_sink(app, environ: dict):
+    """
+        Приёмник тела для AsyncWSGIAdapter (upload_sink): тело POST/PUT /files/upload/stream
+        и PATCH /uploads/<id> пишется в файл хранилища (или сессии) блоками по мере приёма,
+        без промежуточного временного файла, а маршрут получает приёмник в environ[UPLOAD_SINK].
+
+        Returns:
+            StagedWriter | SessionPartWriter | None: None — для остальных маршрутов и запросов,
+            которые маршрут всё равно отклонит (их тело принимается целиком, ошибку возвращает маршрут).
+    """
+    with app.request_context(dict(environ)):
+        try:
+            if request.endpoint == "file_routes.upload_file_stream":
+                name_input = request.args.get("filename", "").strip()
+                if name_input:
+                    return file_service.open_upload(name_input, name_input, request.args.get("path", "/").strip())
+            elif request.endpoint == "file_routes.upload_session_part":
+                offset = int(request.headers.get("Upload-Offset", ""))
+                return upload_session_service.open_part(request.view_args["session_id"], offset)
+        except (ValueError, HTTPException):
+            pass
+    return None
+
+
+@file_routes.route("/uploads/<session_id>/finalize", methods=["POST"])
+def finalize_upload_session(session_id: str):
+    """
+        Завершает сессию: переносит собранный файл в хранилище и создаёт запись в базе.
+
+        Returns:
+            JSON:
+                - 201: данные созданного файла
+                - 400: если файл уже существует
+                - 409: если получены не все части (с перечнем недостающих диапазонов)
+    """
+    try:
+        file = upload_session_service.finalize(session_id)
+    except UploadIncompleteError as e:
+        return jsonify({"message": str(e), "missing": e.missing}), 409
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except IntegrityError:
+        return jsonify({"message": "Файл уже существует (на уровне базы)."}), 400
+    return jsonify(file.to_dict()), 201
+
+
+@file_routes.route("/uploads/<session_id>", methods=["DELETE"])
+def abort_upload_session(session_id: str):
+    """
+        Отменяет сессию загрузки и удаляет принятые данные.
+
+        Returns:
+            204 или 404
+    """
+    upload_session_service.abort(session_id)
+    return current_app.response_class(status=204)
+
+
 @file_routes.route("/files/<int:file_id>/update", methods=["PUT"])
 def update_file(file_id: int):
     """
@@ -122,6 +514,8 @@ def update_file(file_id: int):
             new_comment=data.get("comment")
         )
         return jsonify(updated.to_dict())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -149,35 +543,330 @@ def delete_file(file_id: int):
         return jsonify({"error": "Ошибка при удалении файла."}), 500
 
 
+@file_routes.route("/files/batch", methods=["POST"])
+def batch_files():
+    """
+        Выполняет пакет операций над файлами за один запрос и одну транзакцию.
+
+        Ожидает JSON {"operations": [...]}, где каждая операция — одна из:
+        - {"op": "move", "id": int, "path": str, "name": str (опц.), "comment": str (опц.)}
+        - {"op": "rename", "id": int, "name": str}
+        - {"op": "delete", "id": int}
+        - {"op": "comment", "id": int, "comment": str}
+
+        Returns:
+            JSON:
+                - 200: {"results": [...], "succeeded": int, "failed": int} — результат по каждой операции
+                - 400: если тело запроса некорректно
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "Ожидается непустой список operations."}), 400
+    if len(operations) > Config.BATCH_MAX_OPERATIONS:
+        return jsonify({"message": f"Не больше {Config.BATCH_MAX_OPERATIONS} операций за запрос."}), 400
+    return jsonify(batch_service.execute(operations))
+
+
+@file_routes.route("/tree", methods=["GET"])
+def get_tree():
+    """
+        Возвращает каталог хранилища с агрегатами и его непосредственные подкаталоги.
+
+        Query-параметры:
+        - path (str): путь каталога (по умолчанию корень хранилища)
+
+        Returns:
+            JSON:
+                - 200: {"path", "name", "file_count", "total_size", "direct_file_count", "direct_size",
+                  "directories": [{"path", "name", "file_count", "total_size"}]}
+                - 404: если в каталоге нет файлов
+    """
+    tree = file_service.get_tree(clean_path(request.args.get("path", "")))
+    if tree is None:
+        return jsonify({"message": "Каталог не найден."}), 404
+    return jsonify(tree)
+
+
+@file_routes.route("/directories/move", methods=["POST"])
+def move_directory():
+    """
+        Перемещает или переименовывает каталог со всем содержимым.
+
+        Ожидает JSON с полями:
+        - path (str): текущий путь каталога
+        - new_path (str): новый путь каталога
+
+        Returns:
+            JSON:
+                - 200: {"path": str, "moved": int}
+                - 400: если пути некорректны, каталог не найден или назначение занято
+                - 409: если выполняется синхронизация хранилища
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get("path") or not data.get("new_path"):
+        return jsonify({"message": "Поля path и new_path обязательны."}), 400
+    try:
+        return jsonify(file_service.move_directory(data["path"], data["new_path"]))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+
+
 @file_routes.route("/actualize", methods=["POST"])
 def actualize_storage():
     """
         Синхронизирует файловую систему с базой данных.
 
-        Добавляет недостающие записи о файлах в базе, удаляет записи об отсутствующих файлах.
+        Добавляет недостающие записи о файлах в базе, удаляет записи об отсутствующих файлах
+        и обновляет размер изменившихся.
 
         Returns:
-            JSON: {"added": int, "removed": int}
+            JSON: {"added": int, "removed": int, "updated": int}; 409, если синхронизация уже идёт
     """
-    result = file_service.sync_storage_to_db()
+    try:
+        result = file_service.sync_storage_to_db()
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
     return jsonify(result)
 
 
+@file_routes.route("/jobs/actualize", methods=["POST"])
+def start_actualize_job():
+    """
+        Запускает синхронизацию файловой системы с базой данных фоновой задачей.
+
+        Returns:
+            JSON:
+                - 202: состояние созданной задачи (id для опроса через /jobs/<id>)
+                - 409: если синхронизация этого хранилища уже выполняется
+    """
+    try:
+        job = file_service.start_sync_job()
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/jobs/hash-backfill", methods=["POST"])
+def start_hash_backfill_job():
+    """
+        Запускает фоновое дозаполнение sha256 для файлов, у которых хэша ещё нет.
+
+        Returns:
+            JSON:
+                - 202: состояние созданной задачи
+                - 409: если дозаполнение или проверка целостности уже выполняется
+    """
+    try:
+        job = integrity_service.start_backfill_job()
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/jobs/scrub", methods=["POST"])
+def start_scrub_job():
+    """
+        Запускает фоновую проверку целостности: содержимое файлов сверяется с сохранённым sha256
+        с ограничением скорости чтения (SCRUB_RATE_LIMIT).
+
+        Returns:
+            JSON:
+                - 202: состояние созданной задачи (счётчики ok, mismatch, missing, changed)
+                - 409: если дозаполнение или проверка целостности уже выполняется
+    """
+    try:
+        job = integrity_service.start_scrub_job()
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/jobs/duplicates", methods=["POST"])
+def start_duplicates_job():
+    """
+        Запускает поиск дубликатов фоновой задачей; отчёт — в поле result задачи.
+
+        Ожидает JSON (все поля необязательны):
+        - hardlink (bool): заменить копии жёсткими ссылками на одну из них
+        - min_size (int): минимальный размер файла, байт (по умолчанию 1)
+        - limit (int): сколько групп вернуть в отчёте (по умолчанию 1000)
+
+        Returns:
+            JSON:
+                - 202: состояние созданной задачи
+                - 400: если параметры некорректны
+                - 409: если поиск дубликатов (или, для hardlink, синхронизация) уже выполняется
+    """
+    data = request.get_json(silent=True) or {}
+    hardlink = data.get("hardlink", False)
+    min_size = data.get("min_size", 1)
+    limit = data.get("limit", 1000)
+    if not isinstance(hardlink, bool):
+        return jsonify({"message": "Поле hardlink должно быть логическим значением."}), 400
+    if any(not isinstance(value, int) or isinstance(value, bool) or value < 0 for value in (min_size, limit)):
+        return jsonify({"message": "Поля min_size и limit должны быть неотрицательными целыми числами."}), 400
+    try:
+        job = duplicate_service.start_job(hardlink=hardlink, min_size=min_size, limit=limit)
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/integrity", methods=["GET"])
+def get_integrity_report():
+    """
+        Возвращает результаты проверок целостности.
+
+        Query-параметры:
+        - limit (int): максимум файлов в списке problems (не больше FILES_PAGE_SIZE_MAX)
+
+        Returns:
+            JSON: {"summary": {"ok", "mismatch", "missing", "unverified"},
+                   "problems": файлы с integrity mismatch или missing}
+    """
+    try:
+        limit = int(request.args.get("limit", Config.FILES_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"message": "Параметр limit должен быть положительным целым числом."}), 400
+    return jsonify(integrity_service.get_report(min(limit, Config.FILES_PAGE_SIZE_MAX)))
+
+
+@file_routes.route("/jobs", methods=["GET"])
+def list_jobs():
+    """
+        Возвращает список фоновых задач всех процессов сервера, от новых к старым.
+
+        Returns:
+            JSON: список состояний задач.
+    """
+    return jsonify([job.to_dict() for job in job_manager.list()])
+
+
+@file_routes.route("/jobs/storage-layout", methods=["POST"])
+def start_storage_layout_job():
+    """
+        Запускает фоновый перевод уже сохранённых файлов в другую раскладку на диске.
+
+        Ожидает JSON:
+        - layout (str): sharded (файлы переезжают в .objects/ab/cd/) | plain (обратно на логические пути)
+
+        Returns:
+            JSON:
+                - 202: состояние созданной задачи (счётчики moved, missing, conflicts)
+                - 400: если раскладка неизвестна
+                - 409: если синхронизация этого хранилища уже выполняется
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        job = file_service.start_layout_job(data.get("layout"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except JobConflictError as e:
+        return jsonify({"message": str(e), "job_id": e.job_id}), 409
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """
+        Возвращает состояние фоновой задачи: статус, счётчики, ETA, результат.
+
+        Returns:
+            JSON: состояние задачи или 404
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"message": "Задача не найдена."}), 404
+    return jsonify(job.to_dict())
+
+
+@file_routes.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id: str):
+    """
+        Запрашивает отмену фоновой задачи. Изменения отменённой синхронизации откатываются.
+
+        Returns:
+            JSON: 202 и состояние задачи или 404
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"message": "Задача не найдена."}), 404
+    return jsonify(job.to_dict()), 202
+
+
+@file_routes.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+        Отдаёт метрики процесса в текстовом формате Prometheus: гистограммы длительности
+        HTTP-запросов, SQL-запросов на запрос и файловых операций, счётчики переданных байт.
+
+        Returns:
+            text/plain: метрики или 404, если сбор выключен (METRICS_ENABLED)
+    """
+    if not metrics.enabled:
+        return jsonify({"message": "Сбор метрик выключен."}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @file_routes.route("/files/<int:file_id>/download", methods=["GET"])
 def download_file(file_id):
     """
         Отдаёт файл пользователю для скачивания.
+        Поддерживает условные запросы (If-None-Match, If-Modified-Since) и Range,
+        включая несколько диапазонов.
 
         Args:
             file_id (int): Идентификатор файла
 
         Returns:
-            File: потоковое содержимое файла, либо 404 при отсутствии
+            File: потоковое содержимое файла (200/206), 304 при совпадении валидаторов,
+                либо 404 при отсутствии
+    """
+    rv = download_service.send(file_service.get_file_detail(file_id))
+    if request.method != "HEAD" and rv.status_code in (200, 206):
+        # Для X-Accel-Redirect/X-Sendfile тело отдаёт прокси, и длины ответа у приложения нет
+        metrics.count_bytes("out", rv.content_length or 0)
+    return rv
+
+
+@file_routes.route("/files/archive", methods=["GET"])
+def download_archive():
     """
-    file = file_service.get_file_detail(file_id)
-    abs_path = file_service.get_file_path(file_id)
+        Отдаёт архив с выбранными файлами, собираемый на лету.
 
-    if not abs_path.exists():
-        abort(404, description="Файл не найден")
+        Query-параметры:
+        - path (str): поддерево хранилища, все файлы которого попадут в архив
+        - ids (str): ID файлов через запятую (можно вместе с path)
+        - format (str): zip (по умолчанию) | tar
+        - compress (bool): сжимать ZIP (deflate), по умолчанию файлы сохраняются без сжатия
 
-    return send_file(abs_path, as_attachment=True)
+        Returns:
+            Response: потоковый архив, 400 при некорректных параметрах, 404 если файлов нет
+    """
+    archive_format = request.args.get("format", "zip").lower()
+    if archive_format not in ArchiveService.FORMATS:
+        formats = ", ".join(ArchiveService.FORMATS)
+        return jsonify({"message": f"Неподдерживаемый формат архива. Доступны: {formats}"}), 400
+    try:
+        ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"message": "Параметр ids должен быть списком целых чисел через запятую."}), 400
+    path = clean_path(request.args["path"]) if "path" in request.args else None
+    if path is None and not ids:
+        return jsonify({"message": "Укажите path или ids."}), 400
+
+    entries = file_service.get_archive_entries(ids, path)
+    if not entries:
+        return jsonify({"message": "Файлы для архива не найдены."}), 404
+
+    compress = request.args.get("compress", "false").lower() in ("true", "1", "yes", "on")
+    mimetype, suffix = ArchiveService.FORMATS[archive_format]
+    rv = Response(archive_service.stream(entries, archive_format, base_path=path or "", compress=compress),
+                  mimetype=mimetype, direct_passthrough=True)
+    set_attachment_disposition(rv, (os.path.basename(path or "") or "files") + suffix)
+    return rv